@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
 from django.utils.html import format_html
-from .models import Cluster, Project, Indicator, IndicatorValue, UserProfile
+from .models import Cluster, Project, Indicator, IndicatorValue, UserProfile, SyncReceipt, Job, UploadSession, OutlierFlag
 
 
 class UserProfileInline(admin.StackedInline):
@@ -34,12 +34,12 @@ class ClusterAdmin(admin.ModelAdmin):
 
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
-    list_display = ('name', 'code', 'cluster', 'status', 'start_date', 'end_date', 'is_overdue', 'is_active')
-    list_filter = ('status', 'cluster', 'is_active', 'start_date', 'end_date')
+    list_display = ('name', 'code', 'cluster', 'status', 'start_date', 'end_date', 'health_status', 'is_active')
+    list_filter = ('status', 'health', 'cluster', 'is_active', 'start_date', 'end_date')
     search_fields = ('name', 'code', 'description')
     filter_horizontal = ('assigned_users',)
     ordering = ('name',)
-    readonly_fields = ('created_at', 'updated_at', 'is_overdue')
+    readonly_fields = ('created_at', 'updated_at', 'health_status')
 
     fieldsets = (
         ('Basic Information', {
@@ -60,11 +60,13 @@ class ProjectAdmin(admin.ModelAdmin):
         }),
     )
 
-    def is_overdue(self, obj):
-        if obj.is_overdue:
-            return format_html('<span style="color: red;">Overdue</span>')
-        return 'On Track'
-    is_overdue.short_description = 'Status'
+    def health_status(self, obj):
+        colors = {Project.HEALTH_OVERDUE: 'red', Project.HEALTH_AT_RISK: 'orange'}
+        if obj.health in colors:
+            return format_html('<span style="color: {};">{}</span>', colors[obj.health], obj.get_health_display())
+        return obj.get_health_display()
+    health_status.short_description = 'Health'
+    health_status.admin_order_field = 'health'
 
 
 @admin.register(Indicator)
@@ -144,6 +146,38 @@ class UserProfileAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
 
 
+@admin.register(SyncReceipt)
+class SyncReceiptAdmin(admin.ModelAdmin):
+    list_display = ('key', 'user', 'status', 'indicator_value', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('key', 'user__username')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'priority', 'attempts', 'progress', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'name', 'created_at')
+    search_fields = ('name', 'created_by__username')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'heartbeat_at', 'locked_by')
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'indicator_value', 'status', 'received', 'size', 'updated_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('filename', 'user__username', 'sha256')
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(OutlierFlag)
+class OutlierFlagAdmin(admin.ModelAdmin):
+    list_display = ('value', 'score', 'expected_value', 'status', 'reviewed_by', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('value__indicator__name', 'value__project__name')
+    readonly_fields = ('created_at', 'updated_at')
+
+
 # Re-register UserAdmin
 admin.site.unregister(User)
-admin.site.register(User, CustomUserAdmin)
\ No newline at end of file
+admin.site.register(User, CustomUserAdmin)
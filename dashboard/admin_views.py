@@ -1,40 +1,28 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.auth.decorators import login_required
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Count, Q
-from django.http import JsonResponse
+from django.db.models.functions import TruncMonth
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.utils import timezone
-from datetime import datetime, timedelta
-import json
+from django.utils.http import url_has_allowed_host_and_scheme
+from datetime import datetime
 
-from .models import Cluster, Project, Indicator, IndicatorValue, UserProfile
-from .forms import ClusterForm, ProjectForm, IndicatorForm, IndicatorValueForm
-from .decorators import admin_required
+from .models import Cluster, Project, Indicator, IndicatorValue, OutlierFlag
+from .decorators import admin_required, api_admin_required
+from .conditional import conditional_page
+from .async_utils import run_concurrently, stream_response
+from .changefeed import FeedCursor, iter_ndjson
+from .cube import DIMENSIONS, MEASURES, PERIOD_GRAINS, get_cube
 
 
 @admin_required
 def admin_dashboard(request):
     """Admin dashboard focused on data review and reporting only"""
-    # Get basic statistics for submitted data only
-    stats = {
-        'total_submissions': IndicatorValue.objects.count(),
-        'recent_submissions': IndicatorValue.objects.select_related(
-            'indicator', 'project', 'reported_by'
-        ).order_by('-created_at')[:10],
-        'submissions_this_month': IndicatorValue.objects.filter(
-            created_at__month=timezone.now().month,
-            created_at__year=timezone.now().year
-        ).count(),
-        'submissions_this_year': IndicatorValue.objects.filter(
-            created_at__year=timezone.now().year
-        ).count(),
-    }
-    
+    # Statistics and recent submissions are loaded from the widget endpoints
     context = {
         'title': 'Admin Dashboard - Data Review',
-        'stats': stats,
     }
     
     return render(request, 'dashboard/admin/admin_dashboard.html', context)
@@ -50,8 +38,12 @@ def submitted_data_list(request):
     search_query = request.GET.get('search', '')
     project_filter = request.GET.get('project', '')
     indicator_filter = request.GET.get('indicator', '')
+    flagged_filter = request.GET.get('flagged', '')
     
-    values = IndicatorValue.objects.select_related('indicator', 'project', 'reported_by').all()
+    values = IndicatorValue.objects.visible_to(request.user).select_related(
+        'indicator', 'project', 'reported_by', 'outlier_flag'
+    )
+    open_flags = values.filter(outlier_flag__status='open')
     
     if search_query:
         values = values.filter(
@@ -66,13 +58,19 @@ def submitted_data_list(request):
     if indicator_filter:
         values = values.filter(indicator_id=indicator_filter)
     
-    paginator = Paginator(values.order_by('-created_at'), 20)
+    if flagged_filter:
+        # Review queue: open outlier flags, most suspicious first
+        values = values.filter(outlier_flag__status='open').order_by('-outlier_flag__score')
+    else:
+        values = values.order_by('-created_at')
+    
+    paginator = Paginator(values, 20)
     page_number = request.GET.get('page')
     values = paginator.get_page(page_number)
     
     # Get filter options
-    projects = Project.objects.filter(is_active=True)
-    indicators = Indicator.objects.filter(is_active=True)
+    projects = Project.objects.visible_to(request.user).filter(is_active=True)
+    indicators = Indicator.objects.visible_to(request.user).filter(is_active=True)
     
     context = {
         'title': 'Submitted Data Review',
@@ -80,6 +78,8 @@ def submitted_data_list(request):
         'search_query': search_query,
         'project_filter': project_filter,
         'indicator_filter': indicator_filter,
+        'flagged_filter': flagged_filter,
+        'open_flag_count': open_flags.count(),
         'projects': projects,
         'indicators': indicators,
     }
@@ -87,10 +87,32 @@ def submitted_data_list(request):
     return render(request, 'dashboard/admin/submitted_data_list.html', context)
 
 
+@admin_required
+@require_POST
+def review_outlier_flag(request, value_id):
+    """Confirm or dismiss the outlier flag on a submitted value"""
+    flag = get_object_or_404(
+        OutlierFlag.objects.filter(value__in=IndicatorValue.objects.visible_to(request.user)), value_id=value_id
+    )
+    status = request.POST.get('status')
+    if status not in ('confirmed', 'dismissed'):
+        messages.error(request, 'Choose whether to confirm or dismiss the flag.')
+    else:
+        flag.status = status
+        flag.reviewed_by = request.user
+        flag.reviewed_at = timezone.now()
+        flag.save(update_fields=['status', 'reviewed_by', 'reviewed_at', 'updated_at'])
+        messages.success(request, f'Outlier flag {flag.get_status_display().lower()}.')
+    next_url = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = 'dashboard:submitted_data_list'
+    return redirect(next_url)
+
+
 @admin_required
 def submitted_data_view(request, value_id):
     """View submitted data - READ ONLY for admins"""
-    value = get_object_or_404(IndicatorValue, id=value_id)
+    value = get_object_or_404(IndicatorValue.objects.visible_to(request.user), id=value_id)
     
     context = {
         'title': f'Data Submission: {value.indicator.name}',
@@ -103,22 +125,29 @@ def submitted_data_view(request, value_id):
 
 # Reporting Tools - Admin can generate reports
 @admin_required
-def data_analytics(request):
+async def data_analytics(request):
     """Data analytics and insights for submitted data"""
-    # Get analytics data
-    analytics = {
-        'submissions_by_month': IndicatorValue.objects.extra(
-            select={'month': 'strftime("%Y-%m", created_at)'}
-        ).values('month').annotate(count=Count('id')).order_by('month'),
-        'submissions_by_project': IndicatorValue.objects.values('project__name').annotate(
+    values = IndicatorValue.objects.visible_to(await request.auser())
+    # The aggregates are independent, so they are run concurrently
+    by_month, by_project, by_indicator, recent_activity = await run_concurrently(
+        lambda: list(values.annotate(
+            month=TruncMonth('created_at')
+        ).values('month').annotate(count=Count('id')).order_by('month')),
+        lambda: list(values.values('project__name').annotate(
             count=Count('id')
-        ).order_by('-count')[:10],
-        'submissions_by_indicator': IndicatorValue.objects.values('indicator__name').annotate(
+        ).order_by('-count')[:10]),
+        lambda: list(values.values('indicator__name').annotate(
             count=Count('id')
-        ).order_by('-count')[:10],
-        'recent_activity': IndicatorValue.objects.select_related(
+        ).order_by('-count')[:10]),
+        lambda: list(values.select_related(
             'indicator', 'project', 'reported_by'
-        ).order_by('-created_at')[:20],
+        ).order_by('-created_at')[:20]),
+    )
+    analytics = {
+        'submissions_by_month': by_month,
+        'submissions_by_project': by_project,
+        'submissions_by_indicator': by_indicator,
+        'recent_activity': recent_activity,
     }
     
     context = {
@@ -129,11 +158,80 @@ def data_analytics(request):
     return render(request, 'dashboard/admin/data_analytics.html', context)
 
 
+@admin_required
+def cube_pivot(request):
+    """
+    Pivot of reported values from the in-memory cube.
+
+    ``rows`` and ``columns`` pick the dimensions, ``measure`` and ``grain``
+    the aggregate and period size; ``cluster``, ``project``, ``indicator``
+    and ``indicator_type`` slice the cube and ``start_date``/``end_date``
+    bound the periods. ``format=json`` returns the pivot as JSON.
+    """
+    params = request.GET
+    rows = params.get('rows') or 'cluster'
+    columns = params.get('columns') or None
+    if 'columns' not in params:
+        columns = 'period'
+    measure = params.get('measure') or 'sum'
+    grain = params.get('grain') or 'quarter'
+
+    error = None
+    pivot = None
+    try:
+        selection = get_cube().select()
+        for dimension in ('cluster', 'project', 'indicator'):
+            if params.get(dimension):
+                selection = selection.slice(dimension, int(params[dimension]))
+        if params.get('indicator_type'):
+            selection = selection.slice('indicator_type', params['indicator_type'])
+        start = datetime.strptime(params['start_date'], '%Y-%m-%d').date() if params.get('start_date') else None
+        end = datetime.strptime(params['end_date'], '%Y-%m-%d').date() if params.get('end_date') else None
+        pivot = selection.between(start, end).roll_up(rows, columns, measure=measure, grain=grain)
+    except ValueError as e:
+        error = str(e)
+
+    if params.get('format') == 'json':
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        return JsonResponse(pivot._asdict())
+
+    context = {
+        'title': 'Pivot Analysis',
+        'pivot': pivot,
+        'pivot_rows': zip(pivot.row_labels, pivot.cells, pivot.row_totals) if pivot else [],
+        'error': error,
+        'selected': params,
+        'dimensions': [(dimension, dimension.replace('_', ' ').capitalize()) for dimension in DIMENSIONS],
+        'measures': MEASURES,
+        'grains': PERIOD_GRAINS,
+        'clusters': Cluster.objects.filter(is_active=True).order_by('name'),
+        'projects': Project.objects.filter(is_active=True).order_by('name'),
+        'indicators': Indicator.objects.filter(is_active=True).order_by('name'),
+        'indicator_types': Indicator.INDICATOR_TYPE_CHOICES,
+    }
+    return render(request, 'dashboard/admin/pivot.html', context)
+
+
 # AJAX endpoints for data review
+def _submission_details_scope(request, value_id):
+    """Querysets the submission details payload is built from"""
+    values = IndicatorValue.objects.visible_to(request.user).filter(id=value_id)
+    return [
+        values,
+        Indicator.objects.filter(values__in=values),
+        Project.objects.filter(indicator_values__in=values),
+    ]
+
+
 @admin_required
-def get_submission_details(request, value_id):
+@conditional_page(_submission_details_scope)
+async def get_submission_details(request, value_id):
     """Get detailed information about a specific submission (AJAX)"""
-    value = get_object_or_404(IndicatorValue, id=value_id)
+    value = await aget_object_or_404(
+        IndicatorValue.objects.visible_to(await request.auser()).select_related('indicator', 'project', 'reported_by'),
+        id=value_id
+    )
     
     data = {
         'id': value.id,
@@ -150,3 +248,21 @@ def get_submission_details(request, value_id):
     }
     
     return JsonResponse(data)
+
+
+@api_admin_required
+def change_feed(request):
+    """
+    Stream indicator values changed or deleted since ``cursor`` as NDJSON.
+
+    Meant for incremental BI extraction: store the cursor of the last line
+    received and pass it on the next request.
+    """
+    try:
+        cursor = FeedCursor.decode(request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    response = StreamingHttpResponse(iter_ndjson(cursor), content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-store'
+    return stream_response(request, response)
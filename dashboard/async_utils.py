@@ -0,0 +1,81 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections, connection
+
+
+async def aget_user_profile(request):
+    """
+    Async counterpart of ``request.user.profile``.
+
+    Returns the authenticated user's profile, or None for anonymous users and
+    users without a profile.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None
+
+    def _profile():
+        try:
+            return user.profile
+        except AttributeError:
+            return None
+
+    return await sync_to_async(_profile)()
+
+
+def _run_isolated(func):
+    # Runs in an executor thread with its own database connection; honour
+    # CONN_MAX_AGE the same way the request cycle does.
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+async def run_concurrently(*funcs):
+    """
+    Run independent, read-only ORM callables concurrently and return their results.
+
+    Each callable gets its own worker thread and database connection, so the
+    queries overlap on the database server. SQLite serialises access to a
+    single file anyway, so there the callables simply run one after another
+    on the shared ORM thread.
+    """
+    if connection.vendor == 'sqlite':
+        return [await sync_to_async(func)() for func in funcs]
+
+    return await asyncio.gather(*[
+        sync_to_async(_run_isolated, thread_sensitive=False)(func) for func in funcs
+    ])
+
+
+async def iterate_in_thread(iterator):
+    """
+    Async iterator over a synchronous one, pulling one item at a time
+    through ``sync_to_async``.
+
+    The items are produced on the request's sync thread, where the view ran,
+    so querysets and open files inside the iterator keep their connection.
+    """
+    iterator = iter(iterator)
+    done = object()
+    get_next = sync_to_async(next)
+    while (item := await get_next(iterator, done)) is not done:
+        yield item
+
+
+def stream_response(request, response):
+    """
+    Make a ``StreamingHttpResponse`` or ``FileResponse`` stream under ASGI.
+
+    ASGIHandler cannot iterate synchronous content itself: it reads all of
+    it into a list first and only then sends the first byte. Under ASGI the
+    content is handed over chunk by chunk with ``iterate_in_thread``
+    instead; WSGI servers keep iterating it directly.
+    """
+    if isinstance(request, ASGIRequest):
+        response.streaming_content = iterate_in_thread(response.streaming_content)
+    return response
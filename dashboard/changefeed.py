@@ -0,0 +1,152 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import IndicatorValue, IndicatorValueTombstone
+
+
+# The cursor only moves forward, so a row must not be emitted while a
+# transaction that stamped an earlier updated_at could still commit. On
+# PostgreSQL the feed stops short of the oldest open transaction, however
+# long it runs. Elsewhere it stops CHANGE_FEED_SETTLE short of now, which
+# assumes every writing transaction commits within that time of stamping
+# its rows. The settle period also absorbs clock skew between the app
+# servers and the database.
+CHANGE_FEED_SETTLE = timedelta(seconds=5)
+CHANGE_FEED_CHUNK_SIZE = 2000
+
+# Start of the oldest transaction open on this database in another session.
+# Sessions of other roles are only visible with pg_read_all_stats.
+OLDEST_TRANSACTION_SQL = """
+    SELECT min(xact_start) FROM pg_stat_activity
+    WHERE datname = current_database() AND pid <> pg_backend_pid()
+"""
+
+CHANGE_FIELDS = [
+    'id', 'project_id', 'project__code', 'indicator_id', 'indicator__code',
+    'reported_by_id', 'reported_value', 'target_value',
+    'reporting_period_start', 'reporting_period_end', 'notes',
+    'created_at', 'updated_at',
+]
+
+
+class FeedCursor:
+    """
+    Position in the change feed: the last (updated_at, id) of emitted values
+    and the last (deleted_at, id) of emitted tombstones.
+    """
+
+    def __init__(self, values=None, tombstones=None):
+        self.values = values
+        self.tombstones = tombstones
+
+    def encode(self):
+        state = {
+            'v': [self.values[0].isoformat(), self.values[1]] if self.values else None,
+            't': [self.tombstones[0].isoformat(), self.tombstones[1]] if self.tombstones else None,
+        }
+        return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode()).decode()
+
+    @classmethod
+    def decode(cls, cursor):
+        """Parse an encoded cursor; an empty cursor starts from the beginning"""
+        if not cursor:
+            return cls()
+        try:
+            state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return cls(
+                values=(datetime.fromisoformat(state['v'][0]), int(state['v'][1])) if state['v'] else None,
+                tombstones=(datetime.fromisoformat(state['t'][0]), int(state['t'][1])) if state['t'] else None,
+            )
+        except (ValueError, KeyError, TypeError, IndexError, UnicodeError):
+            raise ValueError('Invalid cursor')
+
+
+def after_cursor(queryset, cursor, field='updated_at'):
+    """Rows strictly after ``cursor`` in (``field``, id) order"""
+    if cursor is None:
+        return queryset.order_by(field, 'id')
+    moment, pk = cursor
+    return queryset.filter(
+        Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': pk})
+    ).order_by(field, 'id')
+
+
+def _value_record(row):
+    record = dict(zip(CHANGE_FIELDS, row))
+    record['project_code'] = record.pop('project__code')
+    record['indicator_code'] = record.pop('indicator__code')
+    for field in ('reported_value', 'target_value'):
+        if record[field] is not None:
+            record[field] = str(record[field])
+    for field in ('reporting_period_start', 'reporting_period_end', 'created_at', 'updated_at'):
+        record[field] = record[field].isoformat()
+    return record
+
+
+def change_horizon():
+    """Latest updated_at or deleted_at the feed may emit now"""
+    horizon = timezone.now() - CHANGE_FEED_SETTLE
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(OLDEST_TRANSACTION_SQL)
+            oldest = cursor.fetchone()[0]
+        if oldest is not None:
+            horizon = min(horizon, oldest - CHANGE_FEED_SETTLE)
+    return horizon
+
+
+def iter_changes(cursor):
+    """
+    Yield ``(record, cursor)`` for every change after ``cursor``.
+
+    Upserted values come first in (updated_at, id) order, then deletions
+    from the tombstone table. Each record is paired with the cursor that
+    resumes right after it, so an interrupted extract can pick up from the
+    last record it stored. Rows are read with a server-side cursor in
+    chunks, keeping memory flat however large the delta is.
+    """
+    horizon = change_horizon()
+    position = FeedCursor(cursor.values, cursor.tombstones)
+
+    values = after_cursor(IndicatorValue.objects.all(), cursor.values).filter(
+        updated_at__lte=horizon
+    ).values_list(*CHANGE_FIELDS)
+    for row in values.iterator(chunk_size=CHANGE_FEED_CHUNK_SIZE):
+        record = _value_record(row)
+        record['op'] = 'upsert'
+        position.values = (row[-1], row[0])
+        yield record, position
+
+    tombstones = after_cursor(
+        IndicatorValueTombstone.objects.all(), cursor.tombstones, field='deleted_at'
+    ).filter(
+        deleted_at__lte=horizon
+    ).values_list('id', 'value_id', 'project_id', 'indicator_id', 'deleted_at')
+    for pk, value_id, project_id, indicator_id, deleted_at in tombstones.iterator(chunk_size=CHANGE_FEED_CHUNK_SIZE):
+        position.tombstones = (deleted_at, pk)
+        yield {
+            'op': 'delete',
+            'id': value_id,
+            'project_id': project_id,
+            'indicator_id': indicator_id,
+            'deleted_at': deleted_at.isoformat(),
+        }, position
+
+
+def iter_ndjson(cursor):
+    """
+    Encode the change feed as NDJSON lines.
+
+    Every line carries the ``cursor`` that resumes after it; a final
+    ``{"op": "end"}`` line carries the cursor to start the next run from.
+    """
+    position = cursor
+    for record, position in iter_changes(cursor):
+        record['cursor'] = position.encode()
+        yield json.dumps(record) + '\n'
+    yield json.dumps({'op': 'end', 'cursor': position.encode()}) + '\n'
@@ -0,0 +1,83 @@
+import hashlib
+from datetime import datetime, time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+
+def scope_validators(request, querysets):
+    """
+    Compute an (etag, last_modified) pair for a page from the querysets it renders.
+
+    Each queryset is reduced to max(updated_at) and a row count in a single
+    aggregate query, so edits, inserts, deletes and M2M link changes (when the
+    queryset goes through the join) all change the validators without running
+    the page's own queries. The result is memoised on the request because
+    Django's ``condition`` decorator asks for the ETag and Last-Modified
+    separately.
+    """
+    cached = getattr(request, '_scope_validators', None)
+    if cached is not None:
+        return cached
+
+    profile = request.user.profile
+    today = timezone.localdate()
+    parts = [str(request.user.pk), profile.role, request.get_full_path(), today.isoformat()]
+    # Pages show date-dependent state (e.g. Project.health, refreshed daily),
+    # so a page is never considered older than the start of the current day.
+    latest = timezone.make_aware(datetime.combine(today, time.min))
+
+    for queryset in querysets:
+        aggregate = queryset.order_by().aggregate(latest=Max('updated_at'), count=Count('pk'))
+        parts.append(aggregate['latest'].isoformat() if aggregate['latest'] else '-')
+        parts.append(str(aggregate['count']))
+        if aggregate['latest'] and aggregate['latest'] > latest:
+            latest = aggregate['latest']
+
+    etag = hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+    request._scope_validators = (etag, latest)
+    return request._scope_validators
+
+
+def conditional_page(scope_func):
+    """
+    Decorator answering If-None-Match / If-Modified-Since with a 304 for a page.
+
+    ``scope_func`` receives the view's arguments and returns the querysets the
+    page depends on. The validators are skipped while flash messages are
+    pending so that they are rendered instead of being hidden behind a 304.
+    Must be placed inside the access-checking decorators. For async views the
+    validators are computed in a worker thread before Django's ``condition``
+    decorator (which calls them synchronously) reads them from the request.
+    """
+    def _validators(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+            return None, None
+        return scope_validators(request, scope_func(request, *args, **kwargs))
+
+    def etag_func(request, *args, **kwargs):
+        return _validators(request, *args, **kwargs)[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        return _validators(request, *args, **kwargs)[1]
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+        if iscoroutinefunction(view_func):
+            wrapped_view = conditional_view
+
+            @wraps(view_func)
+            async def conditional_view(request, *args, **kwargs):
+                await sync_to_async(_validators)(request, *args, **kwargs)
+                return await wrapped_view(request, *args, **kwargs)
+
+        conditional_view = vary_on_cookie(conditional_view)
+        # Browsers keep the page but must revalidate it on every visit.
+        return cache_control(private=True, no_cache=True)(conditional_view)
+    return decorator
@@ -0,0 +1,398 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+from django.db import connections
+
+from .changefeed import CHANGE_FEED_CHUNK_SIZE, FeedCursor, change_horizon, iter_changes
+from .models import Cluster, Indicator, IndicatorValue, Project
+
+
+DIMENSIONS = ('cluster', 'project', 'indicator', 'indicator_type', 'period')
+MEASURES = ('sum', 'count', 'average')
+PERIOD_GRAINS = ('month', 'quarter', 'year')
+
+# Axis of the base cuboid each dimension rolls up from. Cluster and
+# indicator type are attributes of a project and an indicator, so they
+# do not widen the cube.
+DIMENSION_AXES = {'cluster': 0, 'project': 0, 'indicator': 1, 'indicator_type': 1, 'period': 2}
+
+# Largest base cuboid kept dense, at 12 bytes per cell (about 240 MB).
+# Beyond it the cube only keeps the per-value coordinates and rolls up
+# from those.
+CUBE_MAX_DENSE_CELLS = 20_000_000
+
+Pivot = namedtuple('Pivot', [
+    'rows', 'columns', 'measure', 'grain',
+    'row_labels', 'column_labels', 'cells', 'row_totals', 'column_totals', 'total',
+])
+
+
+def month_key(day):
+    """Months since year 0 of a date, the cube's period coordinate"""
+    return day.year * 12 + day.month - 1
+
+
+def period_label(key, grain):
+    if grain == 'year':
+        return str(key)
+    if grain == 'quarter':
+        return f'{key // 4}-Q{key % 4 + 1}'
+    return f'{key // 12}-{key % 12 + 1:02d}'
+
+
+class IndicatorCube:
+    """
+    Totals of IndicatorValue.reported_value by project, indicator and month.
+
+    The base cuboid is a pair of dense arrays (sum and count) whose axes
+    are the dictionary-encoded project and indicator ids and the months
+    from the earliest reporting period on. Each value's coordinates and
+    amount are kept in parallel arrays, so an edit or delete takes back
+    exactly what the value added. ``refresh`` applies the change feed
+    since the previous refresh; cluster and indicator type are re-read
+    every time, so re-assigning a project needs no rebuild.
+
+    The cuboid takes 12 bytes per project × indicator × month cell, in
+    every process that serves the pivot. Once it would pass
+    CUBE_MAX_DENSE_CELLS it is dropped and the cube stays sparse: roll-ups
+    then aggregate the per-value coordinates, which take 40 bytes per value
+    whatever the number of cells.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.cursor = None
+        self.project_ids = np.empty(0, dtype=np.int64)
+        self.indicator_ids = np.empty(0, dtype=np.int64)
+        self.first_month = None
+        self.shape = (0, 0, 0)
+        self.sums = np.zeros(self.shape)
+        self.counts = np.zeros(self.shape, dtype=np.int32)
+        self.value_ids = np.empty(0, dtype=np.int64)
+        self.coordinates = np.empty((3, 0), dtype=np.int64)
+        self.amounts = np.empty(0)
+        self._project_index = {}
+        self._indicator_index = {}
+
+    def build(self):
+        """Load every value from scratch"""
+        with self._lock:
+            self._reset()
+            # Start the feed at its horizon; changes it replays are applied
+            # idempotently
+            start = change_horizon()
+            values = IndicatorValue.objects.order_by('id').values_list(
+                'id', 'project_id', 'indicator_id', 'reporting_period_start', 'reported_value',
+            )
+            sql, params = values.query.sql_with_params()
+            with connections[values.db].cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+            if rows:
+                count = len(rows)
+                ids, projects, indicators, starts, amounts = zip(*rows)
+                self._upsert(
+                    np.fromiter(ids, np.int64, count),
+                    np.fromiter(projects, np.int64, count),
+                    np.fromiter(indicators, np.int64, count),
+                    np.fromiter(map(month_key, starts), np.int64, count),
+                    np.fromiter(map(float, amounts), float, count),
+                )
+            self.cursor = FeedCursor(values=(start, 0), tombstones=(start, 0))
+            self._load_attributes()
+
+    def refresh(self):
+        """Apply the values saved and deleted since the last refresh"""
+        with self._lock:
+            if self.cursor is None:
+                self.build()
+                return
+            upserts, deletes = [], []
+            position = self.cursor
+            for record, position in iter_changes(self.cursor):
+                if record['op'] == 'delete':
+                    deletes.append(record['id'])
+                    continue
+                start = record['reporting_period_start']
+                upserts.append((
+                    record['id'], record['project_id'], record['indicator_id'],
+                    int(start[:4]) * 12 + int(start[5:7]) - 1, float(record['reported_value']),
+                ))
+                if len(upserts) >= CHANGE_FEED_CHUNK_SIZE:
+                    self._apply_upserts(upserts)
+                    upserts = []
+            self._apply_upserts(upserts)
+            if deletes:
+                self._remove(np.array(deletes, dtype=np.int64))
+            self.cursor = FeedCursor(position.values, position.tombstones)
+            self._load_attributes()
+
+    def _apply_upserts(self, rows):
+        if rows:
+            ids, projects, indicators, months, amounts = (np.array(column) for column in zip(*rows))
+            self._upsert(ids, projects, indicators, months, amounts.astype(float))
+
+    def _load_attributes(self):
+        projects = dict(Project.objects.filter(id__in=self.project_ids.tolist()).values_list('id', 'cluster_id'))
+        indicators = dict(
+            Indicator.objects.filter(id__in=self.indicator_ids.tolist()).values_list('id', 'indicator_type')
+        )
+        self.project_clusters = np.array([projects.get(pk, 0) for pk in self.project_ids.tolist()], dtype=np.int64)
+        self.indicator_types = np.array([indicators.get(pk, '') for pk in self.indicator_ids.tolist()], dtype=object)
+
+    def _encode(self, ids, index, axis_ids):
+        """Axis positions of ``ids``, appending members seen for the first time"""
+        new = [pk for pk in dict.fromkeys(ids.tolist()) if pk not in index]
+        for pk in new:
+            index[pk] = len(index)
+        positions = np.fromiter((index[pk] for pk in ids.tolist()), np.int64, len(ids))
+        return positions, np.concatenate((axis_ids, np.array(new, dtype=np.int64))), len(new)
+
+    def _upsert(self, ids, projects, indicators, months, amounts):
+        self._remove(ids)
+
+        project_positions, self.project_ids, new_projects = self._encode(projects, self._project_index, self.project_ids)
+        indicator_positions, self.indicator_ids, new_indicators = self._encode(
+            indicators, self._indicator_index, self.indicator_ids
+        )
+        first = int(months.min()) if self.first_month is None else min(self.first_month, int(months.min()))
+        before = 0 if self.first_month is None else self.first_month - first
+        after = max(int(months.max()) - first + 1 - (self.shape[2] + before), 0)
+        if new_projects or new_indicators or before or after:
+            self.shape = (len(self.project_ids), len(self.indicator_ids), self.shape[2] + before + after)
+            if self.dense and np.prod(self.shape) > CUBE_MAX_DENSE_CELLS:
+                self.sums = self.counts = None
+            elif self.dense:
+                padding = ((0, new_projects), (0, new_indicators), (before, after))
+                self.sums = np.pad(self.sums, padding)
+                self.counts = np.pad(self.counts, padding)
+            self.coordinates[2] += before
+            self.first_month = first
+
+        coordinates = np.stack((project_positions, indicator_positions, months - self.first_month))
+        if self.dense:
+            np.add.at(self.sums, tuple(coordinates), amounts)
+            np.add.at(self.counts, tuple(coordinates), 1)
+
+        self.value_ids = np.concatenate((self.value_ids, ids))
+        self.coordinates = np.concatenate((self.coordinates, coordinates), axis=1)
+        self.amounts = np.concatenate((self.amounts, amounts))
+
+    def _remove(self, ids):
+        """Take back the contribution of any of ``ids`` already in the cube"""
+        if not len(self.value_ids):
+            return
+        found = np.flatnonzero(np.isin(self.value_ids, ids))
+        if not len(found):
+            return
+        if self.dense:
+            coordinates = tuple(self.coordinates[:, found])
+            np.subtract.at(self.sums, coordinates, self.amounts[found])
+            np.subtract.at(self.counts, coordinates, 1)
+        keep = np.ones(len(self.value_ids), dtype=bool)
+        keep[found] = False
+        self.value_ids = self.value_ids[keep]
+        self.coordinates = self.coordinates[:, keep]
+        self.amounts = self.amounts[keep]
+
+    @property
+    def dense(self):
+        """Whether the base cuboid is held, see CUBE_MAX_DENSE_CELLS"""
+        return self.sums is not None
+
+    def select(self):
+        """The whole cube, to be sliced, diced and rolled up"""
+        return CubeSelection(self)
+
+
+class CubeSelection:
+    """
+    A dice of the cube: the members kept on each dimension and a period
+    range. Selections are immutable; ``slice`` and ``dice`` return new ones.
+    """
+
+    def __init__(self, cube, members=None, months=(None, None)):
+        self.cube = cube
+        self.members = members or {}
+        self.months = months
+
+    def dice(self, dimension, members):
+        """Keep only ``members`` (ids, or type codes for indicator_type) of a dimension"""
+        if dimension not in DIMENSION_AXES or dimension == 'period':
+            raise ValueError(f'Cannot dice on {dimension!r}; use between() for periods.')
+        members = set(members)
+        if dimension in self.members:
+            members &= self.members[dimension]
+        return CubeSelection(self.cube, {**self.members, dimension: members}, self.months)
+
+    def slice(self, dimension, member):
+        return self.dice(dimension, [member])
+
+    def between(self, start=None, end=None):
+        """Keep periods starting within ``start``..``end`` (dates, inclusive by month)"""
+        low, high = self.months
+        if start is not None:
+            low = max(low, month_key(start)) if low is not None else month_key(start)
+        if end is not None:
+            high = min(high, month_key(end)) if high is not None else month_key(end)
+        return CubeSelection(self.cube, self.members, (low, high))
+
+    def _axis_groups(self, axis, dimension, grain):
+        """Group key of every member of ``axis`` (None outside the selection) and their labels"""
+        cube = self.cube
+        if axis == 0:
+            keys = cube.project_clusters if dimension == 'cluster' else cube.project_ids
+            keep = np.ones(len(keys), dtype=bool)
+            if 'project' in self.members:
+                keep &= np.isin(cube.project_ids, list(self.members['project']))
+            if 'cluster' in self.members:
+                keep &= np.isin(cube.project_clusters, list(self.members['cluster']))
+        elif axis == 1:
+            keys = cube.indicator_types if dimension == 'indicator_type' else cube.indicator_ids
+            keep = np.ones(len(keys), dtype=bool)
+            if 'indicator' in self.members:
+                keep &= np.isin(cube.indicator_ids, list(self.members['indicator']))
+            if 'indicator_type' in self.members:
+                keep &= np.isin(cube.indicator_types, list(self.members['indicator_type']))
+        else:
+            months = cube.first_month + np.arange(cube.shape[2]) if cube.first_month is not None else np.arange(0)
+            keys = {'year': months // 12, 'quarter': months // 3, 'month': months}[grain]
+            low, high = self.months
+            keep = np.ones(len(keys), dtype=bool)
+            if low is not None:
+                keep &= months >= low
+            if high is not None:
+                keep &= months <= high
+        if dimension is None:
+            keys = np.zeros(len(keys), dtype=np.int64)
+        return keys, keep
+
+    def _labels(self, dimension, keys, grain):
+        if dimension == 'cluster':
+            names = dict(Cluster.objects.filter(id__in=keys.tolist()).values_list('id', 'name'))
+        elif dimension == 'project':
+            names = dict(Project.objects.filter(id__in=keys.tolist()).values_list('id', 'name'))
+        elif dimension == 'indicator':
+            names = dict(Indicator.objects.filter(id__in=keys.tolist()).values_list('id', 'name'))
+        elif dimension == 'indicator_type':
+            names = dict(Indicator.INDICATOR_TYPE_CHOICES)
+        else:
+            return [period_label(key, grain) for key in keys.tolist()]
+        return [names.get(key, str(key)) for key in keys.tolist()]
+
+    def roll_up(self, rows, columns=None, measure='sum', grain='quarter'):
+        """
+        Aggregate the selection to ``rows`` × ``columns`` (dimension names;
+        ``columns`` may be None for a single total column).
+
+        Every axis of the base cuboid is mapped onto its groups by a 0/1
+        matrix, with the members outside the selection zeroed, and the
+        cuboid is contracted with the three matrices in one ``einsum``. A
+        sparse cube instead maps every value's coordinates onto the groups
+        and adds them up with ``bincount``. Rows and columns without any
+        value are dropped. Returns a Pivot whose cells are None where no
+        value was reported.
+        """
+        if rows not in DIMENSIONS or (columns is not None and columns not in DIMENSIONS):
+            raise ValueError(f'Dimensions must be one of {", ".join(DIMENSIONS)}.')
+        if columns is not None and DIMENSION_AXES[rows] == DIMENSION_AXES[columns]:
+            raise ValueError(f'{rows} and {columns} cannot be crossed.')
+        if measure not in MEASURES:
+            raise ValueError(f'Measure must be one of {", ".join(MEASURES)}.')
+        if grain not in PERIOD_GRAINS:
+            raise ValueError(f'Period grain must be one of {", ".join(PERIOD_GRAINS)}.')
+
+        wanted = {DIMENSION_AXES[rows]: rows}
+        if columns is not None:
+            wanted[DIMENSION_AXES[columns]] = columns
+
+        with self.cube._lock:
+            groups, group_keys = [], []
+            for axis in range(3):
+                keys, keep = self._axis_groups(axis, wanted.get(axis), grain)
+                unique, inverse = np.unique(keys[keep], return_inverse=True)
+                # Group of every member of the axis, -1 outside the selection
+                group = np.full(len(keys), -1, dtype=np.int64)
+                group[np.flatnonzero(keep)] = inverse
+                groups.append(group)
+                group_keys.append(unique)
+            shape = tuple(len(unique) for unique in group_keys)
+            if self.cube.dense:
+                groupings = []
+                for group, size in zip(groups, shape):
+                    matrix = np.zeros((len(group), size))
+                    kept = np.flatnonzero(group >= 0)
+                    matrix[kept, group[kept]] = 1
+                    groupings.append(matrix)
+                sums = np.einsum('pit,pa,ib,tc->abc', self.cube.sums, *groupings, optimize=True)
+                counts = np.einsum('pit,pa,ib,tc->abc', self.cube.counts, *groupings, optimize=True)
+            else:
+                cells = np.stack([group[positions] for group, positions in zip(groups, self.cube.coordinates)])
+                kept = (cells >= 0).all(axis=0)
+                flat = np.ravel_multi_index(tuple(cells[:, kept]), shape)
+                size = int(np.prod(shape))
+                sums = np.bincount(flat, self.cube.amounts[kept], minlength=size).reshape(shape)
+                counts = np.bincount(flat, minlength=size).reshape(shape)
+
+        # Collapse the axis nobody asked for and put rows first
+        row_axis = DIMENSION_AXES[rows]
+        column_axis = DIMENSION_AXES[columns] if columns is not None else None
+        other = [axis for axis in range(3) if axis not in (row_axis, column_axis)]
+        sums, counts = sums.sum(axis=tuple(other)), counts.sum(axis=tuple(other))
+        if column_axis is not None and column_axis < row_axis:
+            sums, counts = sums.T, counts.T
+        if column_axis is None:
+            sums, counts = sums.reshape(-1, 1), counts.reshape(-1, 1)
+
+        row_keep = counts.sum(axis=1) > 0
+        column_keep = counts.sum(axis=0) > 0
+        sums, counts = sums[row_keep][:, column_keep], counts[row_keep][:, column_keep]
+        row_keys = group_keys[row_axis][row_keep]
+        column_keys = group_keys[column_axis][column_keep] if column_axis is not None else np.arange(0)
+
+        row_labels = self._labels(rows, row_keys, grain)
+        column_labels = self._labels(columns, column_keys, grain) if columns is not None else []
+        if rows != 'period':
+            order = sorted(range(len(row_labels)), key=row_labels.__getitem__)
+            sums, counts, row_labels = sums[order], counts[order], [row_labels[i] for i in order]
+        if columns is not None and columns != 'period':
+            order = sorted(range(len(column_labels)), key=column_labels.__getitem__)
+            sums, counts, column_labels = sums[:, order], counts[:, order], [column_labels[i] for i in order]
+
+        def measured(total, count):
+            total, count = np.asarray(total, dtype=float), np.asarray(count, dtype=float)
+            if measure == 'sum':
+                result = total
+            elif measure == 'count':
+                result = count
+            else:
+                result = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+            result = np.asarray(np.round(result, 2), dtype=object)
+            result[count == 0] = None
+            return result.tolist()
+
+        return Pivot(
+            rows=rows,
+            columns=columns,
+            measure=measure,
+            grain=grain,
+            row_labels=row_labels,
+            column_labels=column_labels,
+            cells=measured(sums, counts) if columns is not None else [[] for _ in row_labels],
+            row_totals=measured(sums.sum(axis=1), counts.sum(axis=1)),
+            column_totals=measured(sums.sum(axis=0), counts.sum(axis=0)) if columns is not None else [],
+            total=measured(sums.sum(keepdims=True), counts.sum(keepdims=True))[0][0],
+        )
+
+
+_cube = IndicatorCube()
+
+
+def get_cube():
+    """The process-wide cube, brought up to date with the change feed"""
+    _cube.refresh()
+    return _cube
@@ -1,14 +1,38 @@
 from functools import wraps
+from asgiref.sync import iscoroutinefunction
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.http import JsonResponse
 
+from .async_utils import aget_user_profile
+
 
 def admin_required(view_func):
     """
     Decorator that requires the user to be an admin.
     Redirects to dashboard home if user is not an admin.
+    Supports both sync and async views.
     """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                messages.error(request, 'Please log in to access this page.')
+                return redirect('login')
+            
+            profile = await aget_user_profile(request)
+            if profile is None:
+                messages.error(request, 'User profile not found. Please contact administrator.')
+                return redirect('dashboard:dashboard_home')
+            
+            if not profile.is_admin:
+                messages.warning(request, 'Access denied. Admin privileges required.')
+                return redirect('dashboard:dashboard_home')
+            
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -58,7 +82,25 @@ def api_admin_required(view_func):
     """
     API decorator that requires the user to be an admin.
     Returns JSON error response if user is not an admin.
+    Supports both sync and async views.
     """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return JsonResponse({'error': 'Authentication required'}, status=401)
+            
+            profile = await aget_user_profile(request)
+            if profile is None:
+                return JsonResponse({'error': 'User profile not found'}, status=400)
+            
+            if not profile.is_admin:
+                return JsonResponse({'error': 'Admin privileges required'}, status=403)
+            
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -119,17 +161,13 @@ def project_access_required(view_func):
         if profile.is_admin:
             return view_func(request, *args, **kwargs)
         
-        # Project users need to own the project
+        # Project users need to own the project; the check is a single
+        # query on the owner so nothing is loaded for foreign projects
         project_id = kwargs.get('project_id')
         if project_id:
             from .models import Project
-            try:
-                project = Project.objects.get(id=project_id, is_active=True)
-                if project.created_by != request.user:
-                    messages.warning(request, 'Access denied. You can only access your own projects.')
-                    return redirect('dashboard:dashboard_home')
-            except Project.DoesNotExist:
-                messages.error(request, 'Project not found.')
+            if not Project.objects.visible_to(request.user).filter(id=project_id, is_active=True).exists():
+                messages.warning(request, 'Access denied. You can only access your own projects.')
                 return redirect('dashboard:dashboard_home')
         
         return view_func(request, *args, **kwargs)
@@ -161,13 +199,8 @@ def indicator_access_required(view_func):
         indicator_id = kwargs.get('indicator_id')
         if indicator_id:
             from .models import Indicator
-            try:
-                indicator = Indicator.objects.get(id=indicator_id, is_active=True)
-                if indicator.created_by != request.user:
-                    messages.warning(request, 'Access denied. You can only access your own indicators.')
-                    return redirect('dashboard:dashboard_home')
-            except Indicator.DoesNotExist:
-                messages.error(request, 'Indicator not found.')
+            if not Indicator.objects.visible_to(request.user).filter(id=indicator_id, is_active=True).exists():
+                messages.warning(request, 'Access denied. You can only access your own indicators.')
                 return redirect('dashboard:dashboard_home')
         
         return view_func(request, *args, **kwargs)
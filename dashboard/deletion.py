@@ -0,0 +1,148 @@
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import (
+    Cluster, IndicatorValue, IndicatorValueTombstone, OutlierFlag, Project, SyncReceipt, UploadSession,
+)
+from .report_cache import invalidate_reports_for, invalidate_reports_for_object
+from .series import invalidate_series
+
+
+# Rows removed per statement/transaction; bounds memory and lock time
+DELETE_BATCH_SIZE = 2000
+
+
+def schedule_project_deletion(project, user):
+    """
+    Mark a project as being deleted and queue the actual removal.
+
+    The project is deactivated at once, so it stops accepting data and drops
+    out of active listings while the worker deletes its history.
+    """
+    with transaction.atomic():
+        job = enqueue('delete_project', {'project_id': project.pk}, user=user)
+        Project.objects.filter(pk=project.pk).update(deletion_job=job, is_active=False)
+    _invalidate_projects([project.pk])
+    return job
+
+
+def schedule_cluster_deletion(cluster, user):
+    """Mark a cluster and its projects as being deleted and queue the removal"""
+    with transaction.atomic():
+        job = enqueue('delete_cluster', {'cluster_id': cluster.pk}, user=user)
+        Cluster.objects.filter(pk=cluster.pk).update(deletion_job=job, is_active=False)
+        Project.objects.filter(cluster=cluster).update(deletion_job=job, is_active=False)
+    _invalidate_projects(Project.objects.filter(cluster=cluster).values_list('id', flat=True))
+    return job
+
+
+def _invalidate_projects(project_ids):
+    """
+    Evict the cached reports and charts of hidden projects; update() sends
+    no signals.
+    """
+    project_ids = list(project_ids)
+    for project_id in project_ids:
+        invalidate_reports_for_object(project_id=project_id)
+    invalidate_series(
+        IndicatorValue.objects.filter(project_id__in=project_ids).values_list('indicator_id', flat=True).distinct()
+    )
+
+
+def _delete_value_batch(ids):
+    """
+    Delete one batch of IndicatorValue rows with a single DELETE statement.
+
+    This skips Django's collector (which would load every row and send
+    signals one by one), so everything the signals and ON DELETE rules do
+    is done here explicitly: tombstones for the change feed, detaching sync
+    receipts, dropping upload sessions and outlier flags, and, once the batch is committed,
+    evicting cached reports and charts and removing attachment files.
+    """
+    rows = list(
+        IndicatorValue.objects.filter(pk__in=ids).values_list(
+            'id', 'project_id', 'indicator_id', 'reporting_period_start', 'reporting_period_end', 'attachment',
+        )
+    )
+    if not rows:
+        return 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        IndicatorValueTombstone.objects.bulk_create([
+            IndicatorValueTombstone(value_id=pk, project_id=project_id, indicator_id=indicator_id, deleted_at=now)
+            for pk, project_id, indicator_id, *_ in rows
+        ])
+        SyncReceipt.objects.filter(indicator_value_id__in=ids).update(indicator_value=None)
+        UploadSession.objects.filter(indicator_value_id__in=ids).delete()
+        OutlierFlag.objects.filter(value_id__in=ids).delete()
+
+        table = connection.ops.quote_name(IndicatorValue._meta.db_table)
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', list(ids))
+            deleted = cursor.rowcount
+
+        report_rows = [
+            {'project_id': project_id, 'indicator_id': indicator_id,
+             'reporting_period_start': start, 'reporting_period_end': end}
+            for _, project_id, indicator_id, start, end, _ in rows
+        ]
+        transaction.on_commit(lambda: invalidate_reports_for(report_rows))
+        transaction.on_commit(lambda: invalidate_series({row['indicator_id'] for row in report_rows}))
+
+        attachments = [name for *_, name in rows if name]
+        if attachments:
+            transaction.on_commit(lambda: _delete_files(attachments))
+    return deleted
+
+
+def _delete_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            pass
+
+
+def purge_project(project, progress=None):
+    """
+    Delete a project and everything hanging off it in bounded batches.
+
+    ``progress(deleted, total)`` is called after every batch.
+    """
+    values = IndicatorValue.objects.filter(project_id=project.pk)
+    total = values.count()
+    deleted = 0
+    while True:
+        ids = list(values.order_by('id').values_list('id', flat=True)[:DELETE_BATCH_SIZE])
+        if not ids:
+            break
+        deleted += _delete_value_batch(ids)
+        if progress:
+            progress(deleted, total)
+
+    project.indicators.clear()
+    project.assigned_users.clear()
+    # Nothing is left to cascade, so this is a single-row delete (its
+    # post_delete handler evicts the project's cached reports)
+    project.delete()
+    return deleted
+
+
+def purge_cluster(cluster, progress=None):
+    """Delete a cluster's projects (see purge_project), then the cluster"""
+    projects = list(Project.objects.filter(cluster=cluster))
+    total = IndicatorValue.objects.filter(project__cluster=cluster).count()
+    done = 0
+
+    for project in projects:
+        def project_progress(deleted, _, offset=done):
+            if progress:
+                progress(offset + deleted, total)
+        done += purge_project(project, project_progress)
+
+    cluster.delete()
+    return done
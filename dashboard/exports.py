@@ -0,0 +1,258 @@
+import csv
+import io
+import posixpath
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 5000
+
+EXPORT_FIELDS = [
+    'project__name', 'indicator__name', 'reported_value', 'target_value',
+    'reporting_period_start', 'reporting_period_end',
+    'reported_by__first_name', 'reported_by__last_name', 'reported_by__username',
+    'created_at',
+]
+
+
+def iter_export_rows(values, extra_fields=()):
+    """
+    Stream report rows as tuples from a server-side cursor.
+
+    Yields ``(project, indicator, reported_value, target_value, period_start,
+    period_end, reported_by, created_at)`` with native Python types
+    (Decimal, date, aware datetime), followed by the values of any
+    ``extra_fields``.
+    """
+    rows = values.values_list(*EXPORT_FIELDS, *extra_fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for (project, indicator, reported, target, start, end,
+         first_name, last_name, username, created_at, *extra) in rows:
+        yield (
+            project, indicator, reported, target, start, end,
+            f'{first_name} {last_name}'.strip() or username,
+            created_at,
+            *extra,
+        )
+
+
+class _ByteSink:
+    """Write-only file object whose contents are handed out as they are written"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def arrow_schema(pa):
+    return pa.schema([
+        pa.field('project', pa.dictionary(pa.int32(), pa.string()), nullable=False),
+        pa.field('indicator', pa.dictionary(pa.int32(), pa.string()), nullable=False),
+        pa.field('reported_value', pa.decimal128(15, 2), nullable=False),
+        pa.field('target_value', pa.decimal128(15, 2)),
+        pa.field('reporting_period_start', pa.date32(), nullable=False),
+        pa.field('reporting_period_end', pa.date32(), nullable=False),
+        pa.field('reported_by', pa.string(), nullable=False),
+        pa.field('created_at', pa.timestamp('us', tz='UTC'), nullable=False),
+    ])
+
+
+def _record_batches(pa, schema, rows, batch_size):
+    columns = [[] for _ in schema]
+    for row in rows:
+        for column, value in zip(columns, row):
+            column.append(value)
+        if len(columns[0]) >= batch_size:
+            yield _to_batch(pa, schema, columns)
+            columns = [[] for _ in schema]
+    if columns[0]:
+        yield _to_batch(pa, schema, columns)
+
+
+def _to_batch(pa, schema, columns):
+    arrays = []
+    for field, column in zip(schema, columns):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(column, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(column, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def stream_arrow(values, fmt, batch_size=EXPORT_CHUNK_SIZE):
+    """
+    Encode a report queryset as Parquet or an Arrow IPC stream, chunk by chunk.
+
+    Every record batch (one Parquet row group) is built from the next
+    ``batch_size`` rows of the cursor and handed to the client as soon as it
+    is encoded, so memory does not grow with the size of the extract.
+    Requires pyarrow.
+    """
+    import pyarrow as pa
+
+    schema = arrow_schema(pa)
+    sink = _ByteSink()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='zstd')
+        write = writer.write_batch
+    else:
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema)
+        write = writer.write_batch
+
+    for batch in _record_batches(pa, schema, iter_export_rows(values), batch_size):
+        write(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+XLSX_HEADERS = [
+    'Project', 'Indicator', 'Reported Value', 'Target Value', 'Period Start', 'Period End', 'Reported By', 'Created',
+]
+XLSX_COLUMN_WIDTHS = [30, 30, 15, 15, 13, 13, 22, 17]
+XLSX_NUMBER_FORMAT = '#,##0.00'
+XLSX_DATE_FORMAT = 'yyyy-mm-dd'
+XLSX_DATETIME_FORMAT = 'yyyy-mm-dd hh:mm'
+
+
+def write_xlsx(values, fileobj):
+    """
+    Write a report queryset to ``fileobj`` as an XLSX workbook.
+
+    The workbook is created in openpyxl's write-only mode, which spools rows
+    to disk instead of keeping a cell object per value, so memory stays flat
+    as the row count grows. Amounts are written as numbers and periods as
+    dates, and the header row is frozen. Requires openpyxl.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Report')
+    sheet.freeze_panes = 'A2'
+    for index, width in enumerate(XLSX_COLUMN_WIDTHS):
+        sheet.column_dimensions[chr(ord('A') + index)].width = width
+
+    header_font = Font(bold=True)
+    header = []
+    for title in XLSX_HEADERS:
+        cell = WriteOnlyCell(sheet, value=title)
+        cell.font = header_font
+        header.append(cell)
+    sheet.append(header)
+
+    # Reused for every row; append() serialises the cells immediately
+    formats = [None, None, XLSX_NUMBER_FORMAT, XLSX_NUMBER_FORMAT,
+               XLSX_DATE_FORMAT, XLSX_DATE_FORMAT, None, XLSX_DATETIME_FORMAT]
+    cells = [WriteOnlyCell(sheet) for _ in formats]
+    for cell, number_format in zip(cells, formats):
+        if number_format:
+            cell.number_format = number_format
+
+    for row in iter_export_rows(values):
+        *fields, created_at = row
+        # Excel has no time zones; show the timestamp in local time
+        fields.append(timezone.make_naive(timezone.localtime(created_at)))
+        for cell, value in zip(cells, fields):
+            cell.value = value
+        sheet.append(cells)
+
+    workbook.save(fileobj)
+
+
+ZIP_COPY_BLOCK_SIZE = 64 * 1024
+# Entries that may pass 2 GiB must be written as ZIP64 up front
+ZIP64_THRESHOLD = zipfile.ZIP64_LIMIT
+
+
+def _attachment_path(value_id, name):
+    return f'attachments/{value_id}/{posixpath.basename(name)}'
+
+
+def stream_report_zip(values, storage=default_storage):
+    """
+    Stream a ZIP holding ``report.csv`` and every attachment it references.
+
+    The archive is written to a non-seekable sink, so zipfile emits a data
+    descriptor after each entry instead of seeking back to patch headers;
+    whatever has been compressed is handed to the client straight away.
+    Attachments are copied from storage block by block, so neither temp
+    files nor whole attachments are ever held. The CSV has the columns of
+    the CSV export plus the path of the attachment inside the archive.
+    """
+    sink = _ByteSink()
+    attachments = []
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('report.csv', 'w') as entry:
+            text = io.TextIOWrapper(entry, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            writer.writerow([
+                'Project', 'Indicator', 'Reported Value', 'Target Value',
+                'Period Start', 'Period End', 'Reported By', 'Created', 'Attachment',
+            ])
+            for (project, indicator, reported, target, start, end,
+                 reported_by, created_at, value_id, attachment) in iter_export_rows(values, ('id', 'attachment')):
+                path = _attachment_path(value_id, attachment) if attachment else ''
+                if attachment:
+                    attachments.append((path, attachment))
+                writer.writerow([
+                    project, indicator, f'{reported}', f'{target if target is not None else ""}',
+                    start.isoformat(), end.isoformat(), reported_by,
+                    created_at.strftime('%Y-%m-%d %H:%M'), path,
+                ])
+                if sink.chunks:
+                    text.flush()
+                    yield sink.drain()
+            text.flush()
+            text.detach()
+        yield sink.drain()
+
+        missing = []
+        for path, name in attachments:
+            try:
+                source = storage.open(name, 'rb')
+            except (FileNotFoundError, OSError):
+                missing.append(name)
+                continue
+            with source:
+                size = getattr(source, 'size', 0) or 0
+                # Already-compressed formats (PDF, images, Office) gain nothing from deflate
+                info = zipfile.ZipInfo(path, date_time=timezone.localtime().timetuple()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                with archive.open(info, 'w', force_zip64=size >= ZIP64_THRESHOLD) as entry:
+                    while True:
+                        block = source.read(ZIP_COPY_BLOCK_SIZE)
+                        if not block:
+                            break
+                        entry.write(block)
+                        yield sink.drain()
+            yield sink.drain()
+
+        if missing:
+            archive.writestr('MISSING_ATTACHMENTS.txt', '\n'.join(missing) + '\n')
+    yield sink.drain()
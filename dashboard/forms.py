@@ -135,14 +135,15 @@ class IndicatorValueForm(forms.ModelForm):
                 pass
             else:
                 # Project users can only see their own projects and indicators
-                user_projects = Project.objects.filter(created_by=user, is_active=True)
+                user_projects = Project.objects.visible_to(user).filter(is_active=True)
                 self.fields['project'].queryset = user_projects
                 
-                # Filter indicators based on user's projects
-                user_indicators = Indicator.objects.filter(
-                    projects__in=user_projects, is_active=True
-                ).distinct()
-                self.fields['indicator'].queryset = user_indicators
+                # Indicators linked to those projects, as a subquery on the
+                # link table so no join/distinct() is needed
+                linked = Project.indicators.through.objects.filter(project__in=user_projects)
+                self.fields['indicator'].queryset = Indicator.objects.filter(
+                    id__in=linked.values('indicator_id'), is_active=True
+                )
 
 
 class ProjectUserIndicatorEntryForm(forms.Form):
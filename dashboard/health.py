@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import IndicatorValue, Project
+from .progress import compute_progress
+
+
+# An active project is at risk when it ends within AT_RISK_WINDOW and its
+# indicators average less than AT_RISK_ACHIEVEMENT percent of their targets.
+AT_RISK_WINDOW = timedelta(days=90)
+AT_RISK_ACHIEVEMENT = 80
+
+# Values of the ``health`` query parameter of the project lists
+HEALTH_FILTERS = {
+    'overdue': Project.HEALTH_OVERDUE,
+    'at_risk': Project.HEALTH_AT_RISK,
+    'on_track': Project.HEALTH_ON_TRACK,
+}
+
+
+def filter_projects_by_health(projects, params):
+    """
+    Apply a project list's ``health`` filter and ``sort=health`` (most
+    urgent first, then by end date) from the request parameters.
+    Returns ``(projects, health_filter, sort)`` with the values applied.
+    """
+    health_filter = params.get('health', '')
+    if health_filter in HEALTH_FILTERS:
+        projects = projects.filter(health=HEALTH_FILTERS[health_filter])
+    else:
+        health_filter = ''
+    sort = params.get('sort', '')
+    if sort == 'health':
+        projects = projects.order_by('health', 'end_date', 'name')
+    else:
+        sort = ''
+    return projects, health_filter, sort
+
+
+def low_achievement_projects(projects):
+    """
+    Ids of the projects whose indicators average less than
+    AT_RISK_ACHIEVEMENT percent of target.
+
+    Each indicator counts up to 100 percent, so one indicator far beyond its
+    target does not hide the others, and an indicator without values counts
+    as zero. Projects without indicators are not judged.
+    """
+    pairs = list(Project.indicators.through.objects.filter(project__in=projects).values_list('project_id', 'indicator_id'))
+    if not pairs:
+        return set()
+    progress = compute_progress(IndicatorValue.objects.filter(project_id__in={project_id for project_id, _ in pairs}))
+
+    totals = {}
+    for project_id, indicator_id in pairs:
+        item = progress.get((indicator_id, project_id))
+        achievement = min(item.achievement or 0, 100) if item else 0
+        total, count = totals.get(project_id, (0, 0))
+        totals[project_id] = (total + achievement, count + 1)
+    return {project_id for project_id, (total, count) in totals.items() if total / count < AT_RISK_ACHIEVEMENT}
+
+
+def refresh_project_health(projects=None, today=None):
+    """
+    Recompute ``Project.health`` for ``projects`` (default: all) with one
+    UPDATE per state, touching only the rows whose health changes.
+
+    Overdue and on-track are pure date and status conditions; achievement
+    is only computed for the active projects ending within AT_RISK_WINDOW.
+    Returns the number of projects moved into each state.
+    """
+    if projects is None:
+        projects = Project.objects.all()
+    today = today or timezone.localdate()
+    now = timezone.now()
+
+    overdue = Q(status='active', end_date__lt=today)
+    ending = projects.filter(status='active', end_date__gte=today, end_date__lte=today + AT_RISK_WINDOW)
+    at_risk = low_achievement_projects(ending)
+
+    with transaction.atomic():
+        changed = {
+            'overdue': projects.filter(overdue).exclude(health=Project.HEALTH_OVERDUE).update(
+                health=Project.HEALTH_OVERDUE, updated_at=now,
+            ),
+            'at_risk': projects.filter(pk__in=at_risk).exclude(health=Project.HEALTH_AT_RISK).update(
+                health=Project.HEALTH_AT_RISK, updated_at=now,
+            ),
+            'on_track': projects.exclude(overdue).exclude(pk__in=at_risk).exclude(health=Project.HEALTH_ON_TRACK).update(
+                health=Project.HEALTH_ON_TRACK, updated_at=now,
+            ),
+        }
+    return changed
@@ -0,0 +1,292 @@
+import csv
+import io
+import os
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .forms import ProjectUserIndicatorEntryForm
+from .models import Indicator, IndicatorValue, Project
+from .outliers import flag_outliers
+from .report_cache import invalidate_reports_for, report_row_state
+from .series import invalidate_series
+
+
+IMPORT_COLUMNS = [
+    'project_code', 'indicator_code', 'reported_value', 'target_value',
+    'reporting_period_start', 'reporting_period_end', 'notes',
+]
+REQUIRED_COLUMNS = {'project_code', 'indicator_code', 'reported_value', 'reporting_period_start', 'reporting_period_end'}
+
+IMPORT_CHUNK_SIZE = 1000
+
+
+class ImportFileError(Exception):
+    """The uploaded file cannot be read as an import (format or header)"""
+
+
+class ImportResult:
+    """Outcome of a bulk import: counters and the per-row error report"""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    @property
+    def failed(self):
+        return len({row for row, _ in self.errors})
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    def error_report_csv(self):
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['Row', 'Error'])
+        writer.writerows(self.errors)
+        return output.getvalue()
+
+
+def _csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        # Leave the caller's file open
+        text.detach()
+
+
+def _xlsx_rows(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError('Excel support is not installed (openpyxl).')
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield ['' if cell is None else cell for cell in row]
+    finally:
+        workbook.close()
+
+
+def read_import_rows(fileobj, filename):
+    """
+    Stream ``(row_number, record)`` pairs from a CSV or XLSX file.
+
+    Row numbers match the spreadsheet (the header is row 1). Records map the
+    IMPORT_COLUMNS found in the header to raw cell values.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        rows = _csv_rows(fileobj)
+    elif extension in ('.xlsx', '.xlsm'):
+        rows = _xlsx_rows(fileobj)
+    else:
+        raise ImportFileError('Unsupported file type. Upload a .csv or .xlsx file.')
+
+    try:
+        header = next(rows)
+    except StopIteration:
+        raise ImportFileError('The file is empty.')
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFileError(f'The file could not be read: {e}')
+
+    columns = [str(name).strip().lower() for name in header]
+    missing = REQUIRED_COLUMNS - set(columns)
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(sorted(missing))}")
+    positions = [(name, columns.index(name)) for name in IMPORT_COLUMNS if name in columns]
+
+    try:
+        for row_number, row in enumerate(rows, start=2):
+            if not any(str(cell).strip() for cell in row):
+                continue
+            yield row_number, {
+                name: row[index] if index < len(row) else ''
+                for name, index in positions
+            }
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFileError(f'The file could not be read: {e}')
+
+
+class EntryValidator:
+    """
+    Validate raw entries with the data entry form's rules.
+
+    One form instance is reused for every row: its fields clean the raw
+    values and its ``clean()`` applies the cross-field rules, without
+    building (and deep-copying the fields of) a new form per row.
+    """
+
+    def __init__(self, user):
+        self.form = ProjectUserIndicatorEntryForm(Indicator(), user)
+
+    def clean(self, indicator, data):
+        form = self.form
+        form.indicator = indicator
+        cleaned = {}
+        errors = []
+        for name, field in form.fields.items():
+            try:
+                cleaned[name] = field.clean(data.get(name))
+            except ValidationError as e:
+                errors.extend(f'{name}: {message}' for message in e.messages)
+        if errors:
+            return None, errors
+
+        form.cleaned_data = cleaned
+        try:
+            cleaned = form.clean()
+        except ValidationError as e:
+            return None, e.messages
+        return cleaned, []
+
+
+def _cell(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+def import_indicator_values(fileobj, filename, user, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Import indicator values for ``user``'s projects from a CSV/XLSX file.
+
+    Rows are resolved through project and indicator code lookups built once,
+    validated like ``submit_data`` and upserted on (indicator, project,
+    period) in one transaction per chunk, so memory stays bounded by the
+    chunk size. Invalid rows are skipped and listed in ``result.errors``.
+    ``progress`` is called with the number of rows read after each chunk.
+    """
+    projects = {
+        code: project_id
+        for code, project_id in Project.objects.visible_to(user).filter(
+            is_active=True
+        ).values_list('code', 'id')
+    }
+    indicators = {
+        indicator.code: indicator
+        for indicator in Indicator.objects.filter(is_active=True).only('id', 'code', 'name', 'target_value')
+    }
+    links = set(
+        Project.indicators.through.objects.filter(
+            project_id__in=projects.values()
+        ).values_list('project_id', 'indicator_id')
+    )
+
+    validator = EntryValidator(user)
+    result = ImportResult()
+    chunk = {}
+
+    for row_number, record in read_import_rows(fileobj, filename):
+        result.rows += 1
+        project_code = str(_cell(record.get('project_code', '')))
+        indicator_code = str(_cell(record.get('indicator_code', '')))
+
+        project_id = projects.get(project_code)
+        if project_id is None:
+            result.add_error(row_number, f'Unknown project code "{project_code}" (or not one of your projects).')
+            continue
+        indicator = indicators.get(indicator_code)
+        if indicator is None:
+            result.add_error(row_number, f'Unknown indicator code "{indicator_code}".')
+            continue
+        if (project_id, indicator.id) not in links:
+            result.add_error(row_number, f'Indicator "{indicator_code}" is not assigned to project "{project_code}".')
+            continue
+
+        cleaned, errors = validator.clean(indicator, {
+            'indicator_id': indicator.id,
+            'reported_value': _cell(record.get('reported_value', '')),
+            'target_value': _cell(record.get('target_value', '')) or indicator.target_value,
+            'reporting_period_start': _cell(record.get('reporting_period_start', '')),
+            'reporting_period_end': _cell(record.get('reporting_period_end', '')),
+            'notes': _cell(record.get('notes', '')) or '',
+        })
+        if errors:
+            for error in errors:
+                result.add_error(row_number, error)
+            continue
+
+        key = (indicator.id, project_id, cleaned['reporting_period_start'], cleaned['reporting_period_end'])
+        # A later row for the same period replaces an earlier one
+        chunk[key] = (
+            cleaned['reported_value'],
+            cleaned['target_value'] or indicator.target_value,
+            cleaned.get('notes', ''),
+        )
+        if len(chunk) >= chunk_size:
+            _upsert_chunk(chunk, user, result)
+            chunk = {}
+            if progress:
+                progress(result.rows)
+
+    if chunk:
+        _upsert_chunk(chunk, user, result)
+    if progress:
+        progress(result.rows)
+    return result
+
+
+def upsert_indicator_values(rows, user):
+    """
+    Create or update validated values in one transaction.
+
+    ``rows`` maps ``(indicator_id, project_id, period_start, period_end)`` to
+    ``(reported_value, target_value, notes)``. Values are written with INSERT
+    ... ON CONFLICT DO UPDATE per batch on that unique key; the keys that
+    already existed are read beforehand and returned, so callers can tell
+    creates from updates.
+    """
+    with transaction.atomic():
+        existing = set(
+            IndicatorValue.objects.filter(
+                indicator_id__in={key[0] for key in rows},
+                project_id__in={key[1] for key in rows},
+                reporting_period_start__in={key[2] for key in rows},
+            ).values_list('indicator_id', 'project_id', 'reporting_period_start', 'reporting_period_end')
+        )
+
+        values = [
+            IndicatorValue(
+                indicator_id=indicator_id,
+                project_id=project_id,
+                reporting_period_start=start,
+                reporting_period_end=end,
+                reported_by=user,
+                reported_value=reported_value,
+                target_value=target_value,
+                notes=notes,
+            )
+            for (indicator_id, project_id, start, end), (reported_value, target_value, notes) in rows.items()
+        ]
+        IndicatorValue.objects.bulk_create(
+            values,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['indicator', 'project', 'reporting_period_start', 'reporting_period_end'],
+            update_fields=['reported_by', 'reported_value', 'target_value', 'notes', 'updated_at'],
+        )
+
+    # Bulk writes skip model signals. Callers may run this inside their own
+    # transaction, and retry it, so the caches and outlier flags are only
+    # refreshed once the values are committed.
+    report_rows = [report_row_state(value) for value in values]
+    indicator_ids = {key[0] for key in rows}
+    transaction.on_commit(lambda: invalidate_reports_for(report_rows))
+    transaction.on_commit(lambda: invalidate_series(indicator_ids))
+    # Checks the same superset of rows as above; re-scoring the extra ones is harmless
+    transaction.on_commit(lambda: flag_outliers(IndicatorValue.objects.filter(
+        indicator_id__in=indicator_ids,
+        project_id__in={key[1] for key in rows},
+        reporting_period_start__in={key[2] for key in rows},
+    )))
+    return existing
+
+
+def _upsert_chunk(chunk, user, result):
+    existing = upsert_indicator_values(chunk, user)
+    updated = sum(1 for key in chunk if key in existing)
+    result.created += len(chunk) - updated
+    result.updated += updated
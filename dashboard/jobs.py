@@ -0,0 +1,217 @@
+import logging
+import random
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# Registered task functions by name, see ``task``
+TASKS = {}
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+# A running job whose worker has not reported for this long is assumed lost
+STALE_AFTER = timedelta(minutes=10)
+# How often a worker refreshes the heartbeat of the job it runs, whatever
+# the task is doing; well within STALE_AFTER
+HEARTBEAT_INTERVAL = timedelta(minutes=1)
+
+
+def task(name):
+    """
+    Register a function as a background task.
+
+    The function is called as ``func(context, **payload)``; its return value
+    (JSON serialisable) is stored as the job result.
+    """
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, payload=None, user=None, priority=0, max_attempts=3):
+    """Queue a registered task and return the Job to poll"""
+    if name not in TASKS:
+        raise ValueError(f'Unknown task: {name}')
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        created_by=user,
+        priority=priority,
+        max_attempts=max_attempts,
+    )
+
+
+class JobContext:
+    """Handed to a running task to report progress"""
+
+    def __init__(self, job):
+        self.job = job
+
+    def set_progress(self, percent, message=''):
+        percent = max(0, min(int(percent), 100))
+        self.job.progress = percent
+        self.job.progress_message = message[:255]
+        Job.objects.filter(pk=self.job.pk).update(
+            progress=percent,
+            progress_message=self.job.progress_message,
+            heartbeat_at=timezone.now(),
+        )
+
+
+def _runnable():
+    return Job.objects.filter(
+        status='queued', run_after__lte=timezone.now()
+    ).order_by('-priority', 'run_after', 'id')
+
+
+def claim_next(worker_id):
+    """
+    Atomically take the next runnable job for ``worker_id``, or return None.
+
+    On databases with SKIP LOCKED (PostgreSQL) concurrent workers lock
+    different rows without waiting on each other. Elsewhere (SQLite) a
+    candidate is claimed with a conditional UPDATE and another candidate is
+    tried if a competing worker got there first.
+    """
+    now = timezone.now()
+    claim = {
+        'status': 'running',
+        'locked_by': worker_id,
+        'started_at': now,
+        'heartbeat_at': now,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = _runnable().select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            Job.objects.filter(pk=job.pk).update(**claim)
+    else:
+        for candidate in _runnable().values_list('pk', flat=True)[:5]:
+            if Job.objects.filter(pk=candidate, status='queued').update(**claim):
+                break
+        else:
+            return None
+        job = Job(pk=candidate)
+
+    job.refresh_from_db()
+    return job
+
+
+def _retry_delay(attempts):
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _beat(job, stop):
+    try:
+        while not stop.wait(HEARTBEAT_INTERVAL.total_seconds()):
+            try:
+                Job.objects.filter(pk=job.pk, status='running').update(heartbeat_at=timezone.now())
+            except DatabaseError:
+                logger.warning('Could not record the heartbeat of job %s', job.pk, exc_info=True)
+    finally:
+        # The thread's own connection
+        connection.close()
+
+
+@contextmanager
+def heartbeat(job):
+    """
+    Refresh the job's heartbeat from a background thread while the block
+    runs, so a single slow step (reading a large workbook, a long delete
+    batch) does not make ``requeue_stale_jobs`` hand it to another worker.
+    """
+    stop = threading.Event()
+    thread = threading.Thread(target=_beat, args=(job, stop), name=f'job-{job.pk}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome; failures are retried with backoff"""
+    job.attempts += 1
+    Job.objects.filter(pk=job.pk).update(attempts=job.attempts)
+    func = TASKS.get(job.name)
+
+    try:
+        if func is None:
+            raise LookupError(f'Unknown task: {job.name}')
+        with heartbeat(job):
+            result = func(JobContext(job), **job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.name, job.attempts)
+        if func is not None and job.attempts < job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status='queued',
+                run_after=timezone.now() + _retry_delay(job.attempts),
+                error=error,
+                locked_by='',
+            )
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status='failed',
+                error=error,
+                finished_at=timezone.now(),
+                locked_by='',
+            )
+        return False
+
+    Job.objects.filter(pk=job.pk).update(
+        status='succeeded',
+        progress=100,
+        result=result,
+        error='',
+        finished_at=timezone.now(),
+        locked_by='',
+    )
+    return True
+
+
+def requeue_stale_jobs():
+    """Return jobs of workers that died mid-run to the queue (counts as an attempt)"""
+    cutoff = timezone.now() - STALE_AFTER
+    stale = Job.objects.filter(status='running', heartbeat_at__lt=cutoff)
+    requeued = 0
+    for job in stale:
+        if job.attempts < job.max_attempts:
+            requeued += Job.objects.filter(pk=job.pk, status='running').update(
+                status='queued', run_after=timezone.now(), locked_by='',
+                error='Worker stopped responding',
+            )
+        else:
+            Job.objects.filter(pk=job.pk, status='running').update(
+                status='failed', finished_at=timezone.now(), locked_by='',
+                error='Worker stopped responding',
+            )
+    return requeued
+
+
+def job_status(job):
+    """Pollable view of a job for the UI"""
+    return {
+        'id': job.pk,
+        'name': job.name,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.progress_message,
+        'attempts': job.attempts,
+        'result': job.result if job.status == 'succeeded' else None,
+        'error': job.error.strip().splitlines()[-1] if job.status == 'failed' and job.error else None,
+    }
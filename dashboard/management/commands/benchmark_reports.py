@@ -0,0 +1,90 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+DEFAULT_PATHS = [
+    '/dashboard/reports/generate/',
+    '/dashboard/admin/analytics/',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure concurrent report throughput against one or more running servers, '
+        'e.g. the WSGI and the ASGI deployment side by side'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='Base URLs of the servers to compare, e.g. http://127.0.0.1:8001')
+        parser.add_argument('--username', required=True, help='Admin account used to log in')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--path', action='append', dest='paths', help='Report path to request (repeatable)')
+        parser.add_argument('--concurrency', type=int, default=20, help='Simultaneous clients')
+        parser.add_argument('--requests', type=int, default=200, help='Total requests per server')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+
+        self.stdout.write(
+            f"{'server':<32} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}"
+        )
+        for base_url in options['urls']:
+            opener = self._login(base_url.rstrip('/'), options['username'], options['password'])
+            result = self._run(opener, base_url.rstrip('/'), paths, options['concurrency'], options['requests'])
+            self.stdout.write(
+                f"{base_url:<32} {result['throughput']:>8.1f} {result['p50']:>8.1f} "
+                f"{result['p95']:>8.1f} {result['errors']:>7}"
+            )
+
+    def _login(self, base_url, username, password):
+        """Log in through the regular login form and keep the session cookie"""
+        cookies = CookieJar()
+        opener = build_opener(HTTPCookieProcessor(cookies))
+        opener.open(f'{base_url}/accounts/login/').read()
+        csrf_token = next((c.value for c in cookies if c.name == 'csrftoken'), None)
+        if not csrf_token:
+            raise CommandError(f'No CSRF cookie received from {base_url}')
+
+        data = urlencode({
+            'username': username,
+            'password': password,
+            'csrfmiddlewaretoken': csrf_token,
+        }).encode()
+        request = Request(f'{base_url}/accounts/login/', data=data, headers={'Referer': f'{base_url}/accounts/login/'})
+        opener.open(request).read()
+        if not any(c.name == 'sessionid' for c in cookies):
+            raise CommandError(f'Login to {base_url} failed')
+        return opener
+
+    def _run(self, opener, base_url, paths, concurrency, total):
+        def fetch(index):
+            url = base_url + paths[index % len(paths)]
+            started = time.perf_counter()
+            try:
+                with opener.open(url, timeout=120) as response:
+                    response.read()
+                    ok = response.status == 200
+            except Exception:
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(duration * 1000 for duration, ok in results if ok)
+        if not latencies:
+            raise CommandError(f'Every request to {base_url} failed')
+        return {
+            'throughput': len(latencies) / elapsed,
+            'p50': statistics.median(latencies),
+            'p95': latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0],
+            'errors': total - len(latencies),
+        }
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.uploads import UPLOAD_SESSION_TTL, clear_stale_uploads
+
+
+class Command(BaseCommand):
+    help = f'Discard resumable uploads left unfinished for more than {UPLOAD_SESSION_TTL.days} days'
+
+    def handle(self, *args, **options):
+        deleted = clear_stale_uploads()
+        self.stdout.write(self.style.SUCCESS(f'Discarded {deleted} stale upload(s).'))
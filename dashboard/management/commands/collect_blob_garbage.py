@@ -0,0 +1,23 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.storage import BLOB_GC_GRACE_SECONDS
+
+
+class Command(BaseCommand):
+    help = 'Delete stored blobs that no media file references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+        parser.add_argument(
+            '--grace', type=int, default=BLOB_GC_GRACE_SECONDS,
+            help='Skip blobs referenced or released within this many seconds',
+        )
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'collect_garbage'):
+            raise CommandError('The default storage does not deduplicate files.')
+
+        removed, freed = default_storage.collect_garbage(dry_run=options['dry_run'], grace_seconds=options['grace'])
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {removed} unreferenced blob(s), {freed} bytes.'))
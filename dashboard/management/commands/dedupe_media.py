@@ -0,0 +1,37 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.storage import BLOB_DIR
+from dashboard.uploads import UPLOAD_PARTIAL_DIR
+
+
+class Command(BaseCommand):
+    help = (
+        'Move existing media files into the deduplicated blob store in place. '
+        'File names stay the same; identical files end up sharing one copy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directories', nargs='*', default=['indicator_attachments'],
+            help='Media subdirectories to process (default: indicator_attachments)',
+        )
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'deduplicate'):
+            raise CommandError('The default storage does not deduplicate files.')
+
+        skipped = {default_storage.path(BLOB_DIR), default_storage.path(UPLOAD_PARTIAL_DIR)}
+        files = freed = 0
+        for directory in options['directories']:
+            root = default_storage.path(directory)
+            for current, subdirectories, filenames in os.walk(root):
+                subdirectories[:] = [d for d in subdirectories if os.path.join(current, d) not in skipped]
+                for filename in filenames:
+                    name = os.path.relpath(os.path.join(current, filename), default_storage.location)
+                    freed += default_storage.deduplicate(name)
+                    files += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {files} file(s), freed {freed} bytes.'))
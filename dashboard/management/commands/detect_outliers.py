@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.outliers import OUTLIER_THRESHOLD, detect_outliers
+
+
+class Command(BaseCommand):
+    help = f'Flag indicator values more than {OUTLIER_THRESHOLD} robust deviations from their indicator median for review'
+
+    def handle(self, *args, **options):
+        result = detect_outliers()
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {result['checked']} value(s): {result['created']} new flag(s), "
+            f"{result['updated']} updated, {result['cleared']} cleared."
+        ))
@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.changefeed import FeedCursor, iter_changes
+
+
+class Command(BaseCommand):
+    help = (
+        'Write indicator values changed or deleted since the last run as NDJSON. '
+        'The cursor is kept in a state file, so each run only moves the delta '
+        'and an interrupted run resumes where it stopped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='NDJSON file to append to (default: stdout)')
+        parser.add_argument('--state', required=True, help='File holding the cursor between runs')
+        parser.add_argument('--checkpoint', type=int, default=5000, help='Records between cursor checkpoints')
+
+    def handle(self, *args, **options):
+        state_path = options['state']
+        try:
+            with open(state_path) as state_file:
+                cursor = FeedCursor.decode(json.load(state_file).get('cursor'))
+        except FileNotFoundError:
+            cursor = FeedCursor()
+        except ValueError as e:
+            raise CommandError(f'Unreadable state file {state_path}: {e}')
+
+        output = open(options['output'], 'a') if options['output'] else sys.stdout
+        written = 0
+        position = cursor
+        try:
+            for record, position in iter_changes(cursor):
+                output.write(json.dumps(record) + '\n')
+                written += 1
+                if written % options['checkpoint'] == 0:
+                    self._save(output, state_path, position)
+            self._save(output, state_path, position)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        self.stderr.write(self.style.SUCCESS(f'Exported {written} change(s)'))
+
+    def _save(self, output, state_path, position):
+        """Persist the cursor only once the records before it are on disk"""
+        output.flush()
+        if output is not sys.stdout:
+            os.fsync(output.fileno())
+        tmp_path = f'{state_path}.tmp'
+        with open(tmp_path, 'w') as state_file:
+            json.dump({'cursor': position.encode()}, state_file)
+        os.replace(tmp_path, state_path)
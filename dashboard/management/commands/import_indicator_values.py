@@ -0,0 +1,46 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.importers import IMPORT_CHUNK_SIZE, ImportFileError, import_indicator_values
+
+
+class Command(BaseCommand):
+    help = 'Import indicator values from a CSV or XLSX file on behalf of a project user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file to import')
+        parser.add_argument('--username', required=True, help='Project user who owns the projects in the file')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Rows per transaction')
+        parser.add_argument('--errors', help='Write the per-row error report to this CSV file')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+
+        def progress(rows):
+            self.stdout.write(f'{rows} rows processed')
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = import_indicator_values(
+                    fileobj, options['path'], user,
+                    chunk_size=options['chunk_size'], progress=progress,
+                )
+        except (OSError, ImportFileError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.rows} rows: {result.created} created, '
+            f'{result.updated} updated, {result.failed} rejected'
+        ))
+
+        if result.errors:
+            if options['errors']:
+                with open(options['errors'], 'w', newline='') as report:
+                    report.write(result.error_report_csv())
+                self.stdout.write(f"Error report written to {options['errors']}")
+            else:
+                for row_number, message in result.errors[:20]:
+                    self.stdout.write(self.style.WARNING(f'Row {row_number}: {message}'))
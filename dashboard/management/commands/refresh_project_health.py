@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.health import refresh_project_health
+
+
+class Command(BaseCommand):
+    help = 'Recompute the overdue / at-risk / on-track health of every project (run daily)'
+
+    def handle(self, *args, **options):
+        changed = refresh_project_health()
+        self.stdout.write(self.style.SUCCESS(
+            f"Marked {changed['overdue']} project(s) overdue, {changed['at_risk']} at risk "
+            f"and {changed['on_track']} on track."
+        ))
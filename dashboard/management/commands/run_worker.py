@@ -0,0 +1,53 @@
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from dashboard.jobs import claim_next, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Process background jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--worker-id', default=f'{socket.gethostname()}:{os.getpid()}')
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id']
+        self.stopping = False
+
+        def stop(signum, frame):
+            # Finish the current job, then exit
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f'Worker {worker_id} started')
+        last_sweep = 0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - last_sweep > 60:
+                requeued = requeue_stale_jobs()
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale job(s)'))
+                last_sweep = time.monotonic()
+
+            job = claim_next(worker_id)
+            if job is None:
+                if options['burst']:
+                    break
+                time.sleep(options['poll'])
+                continue
+
+            self.stdout.write(f'Running {job}')
+            ok = run_job(job)
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(f"Job {job.pk} {'succeeded' if ok else 'failed'}"))
+
+        self.stdout.write(f'Worker {worker_id} stopped')
@@ -99,32 +99,21 @@ class ProjectAccessMiddleware(MiddlewareMixin):
         except UserProfile.DoesNotExist:
             return None
         
-        # Check project access for project-specific URLs
+        # Check project access for project-specific URLs. Access is part of
+        # the query, so nothing is loaded for projects the user cannot see.
         if 'project_id' in view_kwargs:
             from .models import Project
-            project_id = view_kwargs['project_id']
-            
-            try:
-                project = Project.objects.get(id=project_id, is_active=True)
-                if project.created_by != request.user:
-                    messages.warning(request, 'Access denied. You can only access your own projects.')
-                    return redirect('dashboard:dashboard_home')
-            except Project.DoesNotExist:
-                messages.error(request, 'Project not found.')
+            visible = Project.objects.visible_to(request.user).filter(id=view_kwargs['project_id'], is_active=True)
+            if not visible.exists():
+                messages.warning(request, 'Access denied. You can only access your own projects.')
                 return redirect('dashboard:dashboard_home')
         
         # Check indicator access for indicator-specific URLs
         if 'indicator_id' in view_kwargs:
             from .models import Indicator
-            indicator_id = view_kwargs['indicator_id']
-            
-            try:
-                indicator = Indicator.objects.get(id=indicator_id, is_active=True)
-                if indicator.created_by != request.user:
-                    messages.warning(request, 'Access denied. You can only access your own indicators.')
-                    return redirect('dashboard:dashboard_home')
-            except Indicator.DoesNotExist:
-                messages.error(request, 'Indicator not found.')
+            visible = Indicator.objects.visible_to(request.user).filter(id=view_kwargs['indicator_id'], is_active=True)
+            if not visible.exists():
+                messages.warning(request, 'Access denied. You can only access your own indicators.')
                 return redirect('dashboard:dashboard_home')
         
         return None
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_cluster_created_by_indicator_created_by_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Client-generated idempotency key', max_length=64)),
+                ('status', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='indicatorvalue',
+            index=models.Index(fields=['updated_at', 'id'], name='indicatorvalue_change_idx'),
+        ),
+        migrations.AddField(
+            model_name='syncreceipt',
+            name='indicator_value',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sync_receipts', to='dashboard.indicatorvalue'),
+        ),
+        migrations.AddField(
+            model_name='syncreceipt',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_receipts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='syncreceipt',
+            unique_together={('user', 'key')},
+        ),
+    ]
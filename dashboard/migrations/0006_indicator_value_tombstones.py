@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_sync_receipts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorValueTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value_id', models.BigIntegerField(help_text='Primary key of the deleted value')),
+                ('project_id', models.BigIntegerField(blank=True, null=True)),
+                ('indicator_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['deleted_at', 'id'], name='tombstone_change_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cluster',
+            name='deletion_job',
+            field=models.ForeignKey(blank=True, help_text='Set while the cluster is being deleted in the background', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='dashboard.job'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='deletion_job',
+            field=models.ForeignKey(blank=True, help_text='Set while the project is being deleted in the background', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='dashboard.job'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_upload_sessions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutlierFlag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Distance from the indicator median in scaled MADs (robust z-score, absolute)')),
+                ('expected_value', models.DecimalField(decimal_places=2, help_text='Median reported value of the indicator when flagged', max_digits=15)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('confirmed', 'Confirmed'), ('dismissed', 'Dismissed')], default='open', max_length=10)),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('reviewed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviewed_outlier_flags', to=settings.AUTH_USER_MODEL)),
+                ('value', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='outlier_flag', to='dashboard.indicatorvalue')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'score'], name='outlierflag_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:21
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_overdue_projects(apps, schema_editor):
+    # At-risk needs achievement figures; refresh_project_health fills it in
+    Project = apps.get_model('dashboard', 'Project')
+    Project.objects.filter(status='active', end_date__lt=timezone.localdate()).update(health=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_outlier_flags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='health',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Overdue'), (1, 'At risk'), (2, 'On track')], default=2, editable=False, help_text='Overdue, at risk or on track; kept up to date by refresh_project_health'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['health', 'end_date'], name='project_health_idx'),
+        ),
+        migrations.RunPython(mark_overdue_projects, migrations.RunPython.noop),
+    ]
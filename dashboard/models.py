@@ -1,9 +1,37 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
 
+class VisibleToQuerySet(models.QuerySet):
+    """
+    Adds ``visible_to(user)``: the rows ``user`` may access, as one predicate
+    on the indexed owner column. Admins see everything, project users what
+    they created, anyone else nothing. Views load objects through it so the
+    access check is part of the query rather than done after the fetch.
+    """
+    owner_field = 'created_by'
+
+    def visible_to(self, user):
+        if not user.is_authenticated:
+            return self.none()
+        try:
+            profile = user.profile
+        except AttributeError:
+            return self.none()
+        if profile.is_admin:
+            return self.all()
+        return self.filter(**{self.owner_field: user})
+
+
+class IndicatorValueQuerySet(VisibleToQuerySet):
+    # Values belong to whoever owns their project
+    owner_field = 'project__created_by'
+
+
 class Cluster(models.Model):
     """Represents a cluster or thematic area in the M&E system"""
     name = models.CharField(max_length=200, unique=True)
@@ -13,6 +41,12 @@ class Cluster(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    deletion_job = models.ForeignKey(
+        'Job', on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+        help_text="Set while the cluster is being deleted in the background",
+    )
+
+    objects = VisibleToQuerySet.as_manager()
 
     class Meta:
         ordering = ['name']
@@ -30,6 +64,16 @@ class Project(models.Model):
         ('cancelled', 'Cancelled'),
     ]
 
+    # Ordered by urgency so sorting on health lists the overdue projects first
+    HEALTH_OVERDUE = 0
+    HEALTH_AT_RISK = 1
+    HEALTH_ON_TRACK = 2
+    HEALTH_CHOICES = [
+        (HEALTH_OVERDUE, 'Overdue'),
+        (HEALTH_AT_RISK, 'At risk'),
+        (HEALTH_ON_TRACK, 'On track'),
+    ]
+
     name = models.CharField(max_length=300)
     description = models.TextField(blank=True, null=True)
     code = models.CharField(max_length=20, unique=True, help_text="Project code/identifier")
@@ -40,12 +84,26 @@ class Project(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
     budget = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    health = models.PositiveSmallIntegerField(
+        choices=HEALTH_CHOICES, default=HEALTH_ON_TRACK, editable=False,
+        help_text="Overdue, at risk or on track; kept up to date by refresh_project_health",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    deletion_job = models.ForeignKey(
+        'Job', on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+        help_text="Set while the project is being deleted in the background",
+    )
+
+    objects = VisibleToQuerySet.as_manager()
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Project lists filtered and sorted by health
+            models.Index(fields=['health', 'end_date'], name='project_health_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.code})"
@@ -102,6 +160,8 @@ class Indicator(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    objects = VisibleToQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']
 
@@ -123,9 +183,15 @@ class IndicatorValue(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = IndicatorValueQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         unique_together = ['indicator', 'project', 'reporting_period_start', 'reporting_period_end']
+        indexes = [
+            # Cursor order of the sync "changes since" pull
+            models.Index(fields=['updated_at', 'id'], name='indicatorvalue_change_idx'),
+        ]
 
     def __str__(self):
         return f"{self.indicator.name} - {self.reported_value} ({self.reporting_period_start} to {self.reporting_period_end})"
@@ -145,6 +211,65 @@ class IndicatorValue(models.Model):
         return None
 
 
+class UploadSession(models.Model):
+    """Chunked, resumable upload of an IndicatorValue attachment"""
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    indicator_value = models.ForeignKey(IndicatorValue, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(help_text="Total size in bytes, declared by the client")
+    sha256 = models.CharField(max_length=64, help_text="Expected SHA-256 of the whole file (hex)")
+    received = models.PositiveBigIntegerField(default=0, help_text="Bytes stored so far; the offset to resume from")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size}, {self.status})"
+
+
+class OutlierFlag(models.Model):
+    """An IndicatorValue far from what its indicator usually reports, queued for review"""
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('confirmed', 'Confirmed'),
+        ('dismissed', 'Dismissed'),
+    ]
+
+    value = models.OneToOneField(IndicatorValue, on_delete=models.CASCADE, related_name='outlier_flag')
+    score = models.FloatField(help_text="Distance from the indicator median in scaled MADs (robust z-score, absolute)")
+    expected_value = models.DecimalField(
+        max_digits=15, decimal_places=2, help_text="Median reported value of the indicator when flagged",
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    reviewed_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='reviewed_outlier_flags',
+    )
+    reviewed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The review queue: open flags, most suspicious first
+            models.Index(fields=['status', 'score'], name='outlierflag_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Outlier {self.value_id} (score {self.score:.1f}, {self.status})"
+
+
 class UserProfile(models.Model):
     """Extended user profile for role management"""
     ROLE_CHOICES = [
@@ -169,4 +294,83 @@ class UserProfile(models.Model):
 
     @property
     def is_project_user(self):
-        return self.role == 'project_user'
\ No newline at end of file
+        return self.role == 'project_user'
+
+
+class IndicatorValueTombstone(models.Model):
+    """Marks a deleted IndicatorValue so incremental extracts can propagate the delete"""
+    value_id = models.BigIntegerField(help_text="Primary key of the deleted value")
+    project_id = models.BigIntegerField(null=True, blank=True)
+    indicator_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_change_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted value {self.value_id} ({self.deleted_at:%Y-%m-%d %H:%M})"
+
+
+class SyncReceipt(models.Model):
+    """Records an applied offline sync item so a retried upload is not applied twice"""
+    STATUS_CHOICES = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_receipts')
+    key = models.CharField(max_length=64, help_text="Client-generated idempotency key")
+    indicator_value = models.ForeignKey(
+        IndicatorValue, on_delete=models.SET_NULL, null=True, blank=True, related_name='sync_receipts'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['user', 'key']
+
+    def __str__(self):
+        return f"{self.user.username}: {self.key} ({self.status})"
+
+
+class Job(models.Model):
+    """Unit of background work picked up by the run_worker command"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100, help_text="Registered task name")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    priority = models.IntegerField(default=0, help_text="Higher runs first")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    progress = models.PositiveIntegerField(default=0, validators=[MaxValueValidator(100)])
+    progress_message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_after'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
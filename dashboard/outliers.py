@@ -0,0 +1,207 @@
+from collections import namedtuple
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from .models import IndicatorValue, OutlierFlag
+
+
+# Values are judged against every value their indicator has received, across
+# projects and periods, with the median and the median absolute deviation:
+# unlike the mean and standard deviation, neither moves much when the value
+# under suspicion is itself one of the inputs.
+OUTLIER_THRESHOLD = 3.5
+OUTLIER_MIN_VALUES = 8
+OUTLIER_FETCH_SIZE = 10000
+OUTLIER_BASELINE_SECONDS = 24 * 60 * 60
+
+# Units whose figures are not magnitudes
+SKIPPED_UNITS = ('text', 'date')
+
+# MAD and mean absolute deviation to standard deviation, for normal data
+MAD_SCALE = 1.4826
+MEAN_AD_SCALE = 1.2533
+
+BASELINE_KEY = 'dashboard:outliers:baseline:{}'
+SQL_BATCH_SIZE = 500
+
+Baseline = namedtuple('Baseline', ['count', 'median', 'scale'])
+
+
+def transform(values):
+    """
+    Symmetric log scale. Counts and budgets are skewed, and a value entered
+    100x too large is the same distance away whatever the indicator's size.
+    """
+    return np.sign(values) * np.log1p(np.abs(values))
+
+
+def untransform(values):
+    return np.sign(values) * np.expm1(np.abs(values))
+
+
+def _sorted_medians(values, counts):
+    """Median of each consecutive run of ``counts`` rows of sorted ``values``"""
+    starts = np.cumsum(counts) - counts
+    return (values[starts + (counts - 1) // 2] + values[starts + counts // 2]) / 2
+
+
+def grouped_baselines(groups, values):
+    """
+    Median and robust scale of ``values`` per group in one vectorized pass.
+
+    ``groups`` numbers each row's group 0..n-1 and every group has at least
+    one row. The scale is the MAD in standard deviation units, or the mean
+    absolute deviation when more than half of a group's values are equal.
+    Returns ``(counts, medians, scales)``.
+    """
+    counts = np.bincount(groups)
+    medians = _sorted_medians(values[np.lexsort((values, groups))], counts)
+    deviations = np.abs(values - medians[groups])
+    mad = _sorted_medians(deviations[np.lexsort((deviations, groups))], counts)
+    mean_ad = np.bincount(groups, deviations) / counts
+    scales = np.where(mad > 0, MAD_SCALE * mad, MEAN_AD_SCALE * mean_ad)
+    return counts, medians, scales
+
+
+def _read_values(values):
+    """``(ids, indicator_ids, transformed values)`` arrays of a queryset, read in chunks"""
+    queryset = values.exclude(indicator__measurement_unit__in=SKIPPED_UNITS).values_list(
+        'id', 'indicator_id', 'reported_value',
+    )
+    ids, indicator_ids, reported = [], [], []
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        while rows := cursor.fetchmany(OUTLIER_FETCH_SIZE):
+            chunk_ids, chunk_indicators, chunk_values = zip(*rows)
+            ids.append(np.fromiter(chunk_ids, np.int64, len(rows)))
+            indicator_ids.append(np.fromiter(chunk_indicators, np.int64, len(rows)))
+            reported.append(np.fromiter(map(float, chunk_values), float, len(rows)))
+    if not ids:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+    return np.concatenate(ids), np.concatenate(indicator_ids), transform(np.concatenate(reported))
+
+
+def _cache_baselines(keys, counts, medians, scales):
+    baselines = {
+        pk: Baseline(count, median, scale)
+        for pk, count, median, scale in zip(keys.tolist(), counts.tolist(), medians.tolist(), scales.tolist())
+    }
+    cache.set_many({BASELINE_KEY.format(pk): baseline for pk, baseline in baselines.items()}, OUTLIER_BASELINE_SECONDS)
+    return baselines
+
+
+def indicator_baselines(indicator_ids):
+    """
+    Cached baselines of the given indicators, computing the missing ones.
+
+    Baselines of indicators still short of ``OUTLIER_MIN_VALUES`` values are
+    recomputed every time, cheaply, so they become usable as soon as enough
+    values arrive; the rest are refreshed by the bulk pass.
+    """
+    cached = cache.get_many([BASELINE_KEY.format(pk) for pk in indicator_ids])
+    baselines = {
+        pk: cached[BASELINE_KEY.format(pk)] for pk in indicator_ids
+        if cached.get(BASELINE_KEY.format(pk), Baseline(0, 0.0, 0.0)).count >= OUTLIER_MIN_VALUES
+    }
+    missing = set(indicator_ids) - set(baselines)
+    if missing:
+        _, value_indicators, values = _read_values(IndicatorValue.objects.filter(indicator_id__in=missing))
+        keys, groups = np.unique(value_indicators, return_inverse=True)
+        if len(keys):
+            baselines.update(_cache_baselines(keys, *grouped_baselines(groups, values)))
+        baselines.update((pk, Baseline(0, 0.0, 0.0)) for pk in missing - set(baselines))
+    return baselines
+
+
+def _score(values, medians, scales, counts):
+    """Scores per value; NaN where the indicator has too few values or no spread"""
+    judged = (counts >= OUTLIER_MIN_VALUES) & (scales > 0)
+    scores = np.full(len(values), np.nan)
+    np.divide(np.abs(values - medians), scales, out=scores, where=judged)
+    return scores
+
+
+def _batches(items):
+    for start in range(0, len(items), SQL_BATCH_SIZE):
+        yield items[start:start + SQL_BATCH_SIZE]
+
+
+def _sync_flags(ids, scores, medians, checked=None):
+    """
+    Open flags for the values scoring above the threshold and drop the open
+    flags of values that no longer do.
+
+    ``checked`` limits the pass to those value ids; by default every flag is
+    considered. Confirmed and dismissed flags are left as reviewed.
+    Returns ``(created, updated, cleared)`` counts.
+    """
+    flagged = scores > OUTLIER_THRESHOLD
+    flagged_ids = ids[flagged]
+    if checked is None:
+        flags = [OutlierFlag.objects.values_list('value_id', 'id', 'status')]
+    else:
+        flags = (
+            OutlierFlag.objects.filter(value_id__in=batch).values_list('value_id', 'id', 'status')
+            for batch in _batches(checked.tolist())
+        )
+    existing = {value_id: (pk, status) for rows in flags for value_id, pk, status in rows}
+
+    now = timezone.now()
+    new_flags, open_flags = [], []
+    for value_id, score, median in zip(flagged_ids.tolist(), scores[flagged].tolist(), medians[flagged].tolist()):
+        pk, status = existing.get(value_id, (None, None))
+        flag = OutlierFlag(
+            pk=pk, value_id=value_id, score=score,
+            expected_value=round(float(untransform(median)), 2), updated_at=now,
+        )
+        if pk is None:
+            new_flags.append(flag)
+        elif status == 'open':
+            open_flags.append(flag)
+    OutlierFlag.objects.bulk_create(new_flags, batch_size=SQL_BATCH_SIZE, ignore_conflicts=True)
+    OutlierFlag.objects.bulk_update(open_flags, ['score', 'expected_value', 'updated_at'], batch_size=SQL_BATCH_SIZE)
+
+    still_open = np.fromiter((value_id for value_id, (_, status) in existing.items() if status == 'open'), np.int64)
+    stale = np.setdiff1d(still_open, flagged_ids).tolist()
+    for batch in _batches(stale):
+        OutlierFlag.objects.filter(value_id__in=batch, status='open').delete()
+    return len(new_flags), len(open_flags), len(stale)
+
+
+def detect_outliers():
+    """
+    Score every value against its indicator and bring the review queue up
+    to date. Also refreshes the cached baselines the incremental check uses.
+    Returns the number of values checked and flags created, updated and cleared.
+    """
+    ids, indicator_ids, values = _read_values(IndicatorValue.objects.all())
+    keys, groups = np.unique(indicator_ids, return_inverse=True)
+    if len(keys):
+        counts, medians, scales = grouped_baselines(groups, values)
+        _cache_baselines(keys, counts, medians, scales)
+        scores = _score(values, medians[groups], scales[groups], counts[groups])
+        row_medians = medians[groups]
+    else:
+        scores = row_medians = np.empty(0)
+    created, updated, cleared = _sync_flags(ids, scores, row_medians)
+    return {'checked': len(ids), 'created': created, 'updated': updated, 'cleared': cleared}
+
+
+def flag_outliers(values):
+    """
+    Check newly submitted values, an IndicatorValue queryset, against the
+    cached baselines of their indicators.
+    """
+    ids, indicator_ids, transformed = _read_values(values)
+    if not len(ids):
+        return
+    baselines = indicator_baselines(set(indicator_ids.tolist()))
+    rows = [baselines[pk] for pk in indicator_ids.tolist()]
+    counts = np.fromiter((baseline.count for baseline in rows), np.int64, len(rows))
+    medians = np.fromiter((baseline.median for baseline in rows), float, len(rows))
+    scales = np.fromiter((baseline.scale for baseline in rows), float, len(rows))
+    _sync_flags(ids, _score(transformed, medians, scales, counts), medians, checked=ids)
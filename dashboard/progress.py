@@ -0,0 +1,171 @@
+import math
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+from django.db import connections
+
+from .models import Indicator
+
+
+# Units reported as a level (a rate, a share) rather than an increment;
+# their progress is the latest value, not the running total.
+LEVEL_UNITS = {'percentage'}
+
+# Projections past the last representable date are reported as none
+MAX_DAY = date.max.toordinal()
+
+SeriesProgress = namedtuple('SeriesProgress', [
+    'indicator_id', 'project_id', 'periods', 'latest_period', 'latest_value',
+    'cumulative', 'target', 'achievement', 'last_change', 'reached_on', 'projected_date',
+])
+
+ProgressArrays = namedtuple('ProgressArrays', [
+    # Per row, in (series, period end) order
+    'cumulative', 'achievement', 'change',
+    # Per series
+    'starts', 'counts', 'reached_day', 'projected_day',
+])
+
+
+def compute_progress_arrays(series, days, values, targets, is_level):
+    """
+    Cumulative progress of many series in one vectorized pass.
+
+    ``series`` numbers each row's series 0..n-1 and rows are sorted by series
+    and then by ``days`` (period end as a proleptic ordinal); every series
+    has at least one row. ``targets`` and ``is_level`` hold one entry per
+    series. Per row this computes the running total (or the value itself for
+    level series), achievement in percent of the target and the change from
+    the previous period. Per series it finds the first day the target was
+    met and, for series still short of it, projects the day the least-squares
+    trend of the running total crosses the target. Missing results are NaN.
+    """
+    n_rows = len(values)
+    counts = np.bincount(series, minlength=len(targets))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    lasts = starts + counts - 1
+
+    # Running total restarted at every series boundary
+    running = np.cumsum(values)
+    offsets = np.repeat(running[starts] - values[starts], counts)
+    cumulative = np.where(is_level[series], values, running - offsets)
+
+    row_targets = targets[series]
+    has_target = row_targets > 0
+    achievement = np.full(n_rows, np.nan)
+    np.divide(cumulative, row_targets, out=achievement, where=has_target)
+    achievement *= 100
+
+    change = np.empty(n_rows)
+    change[1:] = values[1:] - values[:-1]
+    change[starts] = np.nan
+
+    # First row of each series whose progress meets the target
+    met = has_target & (cumulative >= row_targets)
+    first_met = np.minimum.reduceat(np.where(met, np.arange(n_rows), n_rows), starts)
+    reached = first_met < n_rows
+    reached_day = np.full(len(targets), np.nan)
+    reached_day[reached] = days[first_met[reached]]
+
+    # Linear trend per series, on days relative to the series' first period
+    # so the sums stay well conditioned
+    x = days - np.repeat(days[starts], counts)
+    n = counts.astype(float)
+    sx = np.bincount(series, x)
+    sy = np.bincount(series, cumulative)
+    sxx = np.bincount(series, x * x)
+    sxy = np.bincount(series, x * cumulative)
+    denominator = n * sxx - sx * sx
+    slope = np.full(len(targets), np.nan)
+    np.divide(n * sxy - sx * sy, denominator, out=slope, where=denominator > 0)
+    intercept = (sy - np.nan_to_num(slope) * sx) / n
+
+    projectable = ~reached & (targets > 0) & (slope > 0)
+    projected_day = np.full(len(targets), np.nan)
+    crossing = (targets - intercept)[projectable] / slope[projectable] + days[starts][projectable]
+    # A trend line running above the latest figure still has to get there
+    projected_day[projectable] = np.maximum(np.ceil(crossing), days[lasts][projectable] + 1)
+
+    return ProgressArrays(cumulative, achievement, change, starts, counts, reached_day, projected_day)
+
+
+def _to_date(day):
+    if math.isnan(day) or day > MAX_DAY:
+        return None
+    return date.fromordinal(int(day))
+
+
+def _to_float(value):
+    return None if math.isnan(value) else value
+
+
+def compute_progress(values):
+    """
+    Progress toward the indicator target for every (indicator, project)
+    series in an IndicatorValue queryset.
+
+    The rows are read once as plain columns and handed to
+    ``compute_progress_arrays``. Targets come from the indicator, so a
+    multi-year target is compared against the sum of all periods reported.
+    Returns ``{(indicator_id, project_id): SeriesProgress}``.
+    """
+    queryset = values.order_by(
+        'indicator_id', 'project_id', 'reporting_period_end', 'reporting_period_start',
+    ).values_list('indicator_id', 'project_id', 'reporting_period_end', 'reported_value')
+    # Read the raw cursor rows: NumPy parses the backend's dates and decimals
+    # (objects or strings) far faster than Django's per-value converters
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    if not rows:
+        return {}
+
+    count = len(rows)
+    indicator_ids, project_ids, period_ends, reported = zip(*rows)
+    indicator_ids = np.fromiter(indicator_ids, np.int64, count)
+    project_ids = np.fromiter(project_ids, np.int64, count)
+    days = np.fromiter(map(date.toordinal, period_ends), np.int64, count).astype(float)
+    reported = np.fromiter(map(float, reported), float, count)
+
+    boundary = np.empty(count, dtype=bool)
+    boundary[0] = True
+    boundary[1:] = (indicator_ids[1:] != indicator_ids[:-1]) | (project_ids[1:] != project_ids[:-1])
+    series = np.cumsum(boundary) - 1
+    series_indicators = indicator_ids[boundary]
+
+    indicators = {
+        pk: (float(target), unit)
+        for pk, target, unit in Indicator.objects.filter(id__in=set(series_indicators.tolist()))
+        .values_list('id', 'target_value', 'measurement_unit')
+    }
+    targets = np.array([indicators[pk][0] for pk in series_indicators.tolist()])
+    is_level = np.array([indicators[pk][1] in LEVEL_UNITS for pk in series_indicators.tolist()])
+
+    arrays = compute_progress_arrays(series, days, reported, targets, is_level)
+
+    lasts = arrays.starts + arrays.counts - 1
+    columns = zip(
+        series_indicators.tolist(), project_ids[lasts].tolist(), arrays.counts.tolist(),
+        days[lasts].tolist(), reported[lasts].tolist(), arrays.cumulative[lasts].tolist(),
+        targets.tolist(), arrays.achievement[lasts].tolist(), arrays.change[lasts].tolist(),
+        arrays.reached_day.tolist(), arrays.projected_day.tolist(),
+    )
+    progress = {}
+    for (indicator_id, project_id, periods, latest_day, latest_value, cumulative,
+         target, achievement, change, reached_day, projected_day) in columns:
+        progress[indicator_id, project_id] = SeriesProgress(
+            indicator_id=indicator_id,
+            project_id=project_id,
+            periods=periods,
+            latest_period=date.fromordinal(int(latest_day)),
+            latest_value=latest_value,
+            cumulative=cumulative,
+            target=target,
+            achievement=_to_float(achievement),
+            last_change=_to_float(change),
+            reached_on=_to_date(reached_day),
+            projected_date=_to_date(projected_day),
+        )
+    return progress
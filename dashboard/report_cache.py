@@ -0,0 +1,166 @@
+import hashlib
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+
+# Report results are cached per normalized filter tuple and output format.
+# Every entry key embeds the version tokens of the project it is filtered
+# on, of the indicator, and of the values it covers, with '*' standing for
+# no filter. The values of an entry filtered on a closed period are tracked
+# per (project, indicator, month) over that period; any other entry uses the
+# token of its (project, indicator) pair over all periods. A value change
+# replaces the pair token and the month tokens of the months its period
+# touches, so entries for other periods stay reachable.
+#
+# Replacing a token is a plain delete, atomic on every cache backend; the
+# next lookup starts a fresh random token, so neither concurrent writers nor
+# an evicted token can bring an old entry back.
+REPORT_CACHE_SECONDS = 15 * 60
+# Longer closed periods are tracked like open ones, with the pair token
+REPORT_CACHE_MAX_MONTHS = 120
+
+VERSION_KEY = 'dashboard:report:version:{}'
+HITS_KEY = 'dashboard:report:hits'
+MISSES_KEY = 'dashboard:report:misses'
+
+ANY = '*'
+
+
+def _project_version(project_id):
+    return VERSION_KEY.format(f'project:{project_id}')
+
+
+def _indicator_version(indicator_id):
+    return VERSION_KEY.format(f'indicator:{indicator_id}')
+
+
+def _pair_version(project_id, indicator_id, month=None):
+    if month is None:
+        return VERSION_KEY.format(f'pair:{project_id}:{indicator_id}')
+    return VERSION_KEY.format(f'pair:{project_id}:{indicator_id}:{month}')
+
+
+def _months(start, end):
+    """``YYYY-MM`` of every month from ``start``'s to ``end``'s, inclusive"""
+    first, last = start.year * 12 + start.month - 1, end.year * 12 + end.month - 1
+    return [f'{month // 12:04d}-{month % 12 + 1:02d}' for month in range(first, last + 1)]
+
+
+def _versions(keys):
+    """Current token of every version key, starting one where missing"""
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex[:12], None)
+        # Another process may have started the token first; use its one
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, ANY) for key in keys]
+
+
+def _entry_key(filters, fmt):
+    project_id = filters.project_id or ANY
+    indicator_id = filters.indicator_id or ANY
+    keys = [_project_version(project_id), _indicator_version(indicator_id)]
+    months = _months(filters.start_date, filters.end_date) if filters.start_date and filters.end_date else []
+    if 0 < len(months) <= REPORT_CACHE_MAX_MONTHS:
+        keys += [_pair_version(project_id, indicator_id, month) for month in months]
+    else:
+        keys.append(_pair_version(project_id, indicator_id))
+    # Up to a token per month; keep the key short for the database cache
+    versions = hashlib.sha1('.'.join(_versions(keys)).encode()).hexdigest()[:20]
+    parts = [
+        filters.project_id or '',
+        filters.indicator_id or '',
+        filters.start_date.isoformat() if filters.start_date else '',
+        filters.end_date.isoformat() if filters.end_date else '',
+    ]
+    return f"dashboard:report:{versions}:{fmt}:{':'.join(str(p) for p in parts)}"
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_cached_report(filters, fmt):
+    """
+    Return ``(key, payload)``: the cache key of ``filters`` in ``fmt`` and
+    its cached payload, or None.
+
+    Store a freshly built payload under the returned key with
+    ``set_cached_report``: the key holds the versions read before the build,
+    so a change made meanwhile leaves the new entry unreachable.
+    """
+    key = _entry_key(filters, fmt)
+    payload = cache.get(key)
+    _count(MISSES_KEY if payload is None else HITS_KEY)
+    return key, payload
+
+
+def set_cached_report(key, payload):
+    """Store a report payload under a key from ``get_cached_report``"""
+    cache.set(key, payload, REPORT_CACHE_SECONDS)
+
+
+aget_cached_report = sync_to_async(get_cached_report)
+aset_cached_report = sync_to_async(set_cached_report)
+
+
+def report_row_state(value):
+    """The fields of an IndicatorValue that decide which reports include it"""
+    return {
+        'project_id': value.project_id,
+        'indicator_id': value.indicator_id,
+        'reporting_period_start': value.reporting_period_start,
+        'reporting_period_end': value.reporting_period_end,
+    }
+
+
+def invalidate_reports_for(rows):
+    """
+    Evict the cached reports whose filters match any of ``rows``: those on
+    its project and indicator (or on none) over all periods, or over a
+    period sharing a month with the row's.
+
+    ``rows`` are dicts as returned by ``report_row_state``. Pass both the old
+    and the new state of an edited value so it leaves and enters the right
+    reports. Returns the number of version tokens replaced.
+    """
+    keys = set()
+    for row in rows:
+        months = _months(row['reporting_period_start'], row['reporting_period_end'])
+        for project_id in (row['project_id'], ANY):
+            for indicator_id in (row['indicator_id'], ANY):
+                keys.add(_pair_version(project_id, indicator_id))
+                keys.update(_pair_version(project_id, indicator_id, month) for month in months)
+    if keys:
+        cache.delete_many(list(keys))
+    return len(keys)
+
+
+def invalidate_reports_for_object(project_id=None, indicator_id=None):
+    """Evict every cached report that may show the given project or indicator"""
+    keys = []
+    if project_id is not None:
+        keys += [_project_version(project_id), _project_version(ANY)]
+    if indicator_id is not None:
+        keys += [_indicator_version(indicator_id), _indicator_version(ANY)]
+    if keys:
+        cache.delete_many(keys)
+    return len(keys)
+
+
+def report_cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups, 3) if lookups else None,
+    }
@@ -0,0 +1,475 @@
+from collections import namedtuple
+from datetime import date, datetime
+
+from django.db import connections
+from django.db.models import (
+    Avg, Count, Exists, ExpressionWrapper, F, FloatField, OuterRef, Q, Subquery, Sum, Value, Window,
+)
+from django.db.models.functions import (
+    Cast, Coalesce, ExtractDay, ExtractMonth, Lag, Least, NullIf, RowNumber, TruncMonth, TruncQuarter, TruncYear,
+)
+from django.utils import timezone
+
+from .exports import EXPORT_CHUNK_SIZE
+from .models import Indicator, IndicatorValue, Project
+
+
+ReportFilters = namedtuple('ReportFilters', ['project_id', 'indicator_id', 'start_date', 'end_date'])
+
+# Column header of the compact JSON report payload; each row is a list in
+# this order.
+REPORT_COLUMNS = [
+    'project', 'indicator', 'reported_value', 'target_value',
+    'period_start', 'period_end', 'reported_by', 'created_at',
+]
+
+REPORT_PAGE_SIZE = 200
+REPORT_MAX_PAGE_SIZE = 1000
+
+
+def parse_report_filters(params):
+    """
+    Normalize report filters from request parameters.
+
+    Raises ValueError for malformed ids or dates (dates must be YYYY-MM-DD).
+    """
+    def _int_or_none(value):
+        return int(value) if value else None
+
+    def _date_or_none(value):
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+    return ReportFilters(
+        project_id=_int_or_none(params.get('project_id')),
+        indicator_id=_int_or_none(params.get('indicator_id')),
+        start_date=_date_or_none(params.get('start_date')),
+        end_date=_date_or_none(params.get('end_date')),
+    )
+
+
+def filter_report_values(filters, queryset=None):
+    """Apply report filters (date bounds inclusive) to an IndicatorValue queryset"""
+    values = IndicatorValue.objects.all() if queryset is None else queryset
+    if filters.project_id:
+        values = values.filter(project_id=filters.project_id)
+    if filters.indicator_id:
+        values = values.filter(indicator_id=filters.indicator_id)
+    if filters.start_date:
+        values = values.filter(reporting_period_start__gte=filters.start_date)
+    if filters.end_date:
+        values = values.filter(reporting_period_end__lte=filters.end_date)
+    # The id breaks created_at ties (bulk imports, sync batches), so offset
+    # pages neither repeat nor skip rows
+    return values.order_by('-created_at', '-id')
+
+
+def with_total(values):
+    """Annotate every row with the size of the whole (unsliced) result set"""
+    return values.annotate(report_total=Window(expression=Count('pk')))
+
+
+async def report_rows_page(filters, offset, limit):
+    """
+    Fetch one page of report rows as lists ordered like REPORT_COLUMNS.
+
+    The total is read from a window count on the same query, so a page costs a
+    single round trip. Only a page past the end needs a separate count.
+    Returns ``(rows, total)``.
+    """
+    values = with_total(filter_report_values(filters)).values_list(
+        'project__name', 'indicator__name', 'reported_value', 'target_value',
+        'reporting_period_start', 'reporting_period_end',
+        'reported_by__first_name', 'reported_by__last_name', 'reported_by__username',
+        'created_at', 'report_total',
+    )[offset:offset + limit]
+
+    rows = []
+    total = None
+    async for (project, indicator, reported, target, start, end,
+               first_name, last_name, username, created_at, total) in values:
+        full_name = f'{first_name} {last_name}'.strip()
+        rows.append([
+            project,
+            indicator,
+            str(reported),
+            None if target is None else str(target),
+            start.isoformat(),
+            end.isoformat(),
+            full_name or username,
+            timezone.localtime(created_at).strftime('%Y-%m-%d %H:%M'),
+        ])
+
+    if total is None:
+        total = await filter_report_values(filters).acount() if offset else 0
+    return rows, total
+
+
+CrossTabOptions = namedtuple('CrossTabOptions', ['rows', 'columns', 'measure', 'period'])
+
+# Group key and label of each cross-tab dimension
+CROSSTAB_DIMENSIONS = {
+    'project': ('project_id', 'project__name'),
+    'indicator': ('indicator_id', 'indicator__name'),
+    'cluster': ('project__cluster_id', 'project__cluster__name'),
+    'indicator_type': ('indicator__indicator_type', 'indicator__indicator_type'),
+    'period': ('period_bucket', 'period_bucket'),
+}
+CROSSTAB_MEASURES = ('sum', 'average', 'latest', 'achievement')
+CROSSTAB_PERIODS = {'month': TruncMonth, 'quarter': TruncQuarter, 'year': TruncYear}
+# Each column is one more aggregate in the query
+CROSSTAB_MAX_COLUMNS = 60
+
+
+def parse_crosstab_options(params):
+    """
+    Normalize cross-tab options from request parameters.
+
+    Raises ValueError for unknown dimensions or measures, or when rows and
+    columns are the same dimension.
+    """
+    options = CrossTabOptions(
+        rows=params.get('rows') or 'project',
+        columns=params.get('columns') or 'period',
+        measure=params.get('measure') or 'sum',
+        period=params.get('period') or 'quarter',
+    )
+    if options.rows not in CROSSTAB_DIMENSIONS or options.columns not in CROSSTAB_DIMENSIONS:
+        raise ValueError(f'Dimensions must be one of {", ".join(CROSSTAB_DIMENSIONS)}.')
+    if options.rows == options.columns:
+        raise ValueError('Rows and columns must be different dimensions.')
+    if options.measure not in CROSSTAB_MEASURES:
+        raise ValueError(f'Measure must be one of {", ".join(CROSSTAB_MEASURES)}.')
+    if options.period not in CROSSTAB_PERIODS:
+        raise ValueError(f'Period must be one of {", ".join(CROSSTAB_PERIODS)}.')
+    return options
+
+
+def _crosstab_label(dimension, label, period):
+    if dimension == 'indicator_type':
+        return dict(Indicator.INDICATOR_TYPE_CHOICES).get(label, label)
+    if dimension == 'period':
+        if period == 'year':
+            return f'{label:%Y}'
+        if period == 'quarter':
+            return f'{label:%Y}-Q{(label.month - 1) // 3 + 1}'
+        return f'{label:%Y-%m}'
+    return label
+
+
+def _crosstab_aggregate(measure, condition, latest='is_latest'):
+    if measure == 'average':
+        return Avg('reported_value', filter=condition)
+    if measure == 'latest':
+        return Sum('reported_value', filter=condition & Q(**{latest: True}))
+    if measure == 'achievement':
+        target = Coalesce('target_value', 'indicator__target_value')
+        # Cast first, or SQLite divides whole-number sums as integers
+        return ExpressionWrapper(
+            Cast(Sum('reported_value', filter=condition), FloatField()) * 100
+            / NullIf(Sum(target, filter=condition), 0),
+            output_field=FloatField(),
+        )
+    return Sum('reported_value', filter=condition)
+
+
+def build_crosstab(filters, options, queryset=None):
+    """
+    Cross-tabulate the report values by two dimensions in the database.
+
+    The column members are read first; every column then becomes one
+    conditional aggregate (``SUM(...) FILTER (WHERE column = member)``, or
+    ``CASE WHEN`` where FILTER is missing) of a single grouped query, so
+    the pivot comes back from the database already shaped. ``latest``
+    adds up each indicator/project series' most recent value in the cell;
+    ``achievement`` is reported over target in percent, targets falling
+    back to the indicator's. Returns a dict with ``column_labels`` and
+    ``rows`` of ``[label, cells, total]``.
+    """
+    values = filter_report_values(filters, queryset).order_by()
+    bucket = CROSSTAB_PERIODS[options.period]('reporting_period_start')
+    uses_period = 'period' in (options.rows, options.columns)
+    if uses_period:
+        values = values.annotate(period_bucket=bucket)
+    total_latest = 'is_latest'
+    if options.measure == 'latest':
+        later = filter_report_values(filters, queryset).order_by().filter(
+            indicator=OuterRef('indicator'),
+            project=OuterRef('project'),
+            reporting_period_start__gt=OuterRef('reporting_period_start'),
+        )
+        if uses_period:
+            values = values.annotate(is_latest=~Exists(
+                later.annotate(period_bucket=bucket).filter(period_bucket=OuterRef('period_bucket'))
+            ))
+        else:
+            values = values.annotate(is_latest=~Exists(later))
+        if options.columns == 'period':
+            # A row total spans all periods, so it takes the latest overall
+            values = values.annotate(is_latest_overall=~Exists(later))
+            total_latest = 'is_latest_overall'
+
+    column_key, column_label = CROSSTAB_DIMENSIONS[options.columns]
+    members = list(
+        values.values_list(column_key, column_label).distinct()
+        .order_by(column_key if options.columns == 'period' else column_label)[:CROSSTAB_MAX_COLUMNS + 1]
+    )
+    if len(members) > CROSSTAB_MAX_COLUMNS:
+        raise ValueError(
+            f'More than {CROSSTAB_MAX_COLUMNS} columns; narrow the filters or choose another column dimension.'
+        )
+
+    aggregates = {'total': _crosstab_aggregate(options.measure, Q(), total_latest)}
+    for index, (member, _) in enumerate(members):
+        aggregates[f'c{index}'] = _crosstab_aggregate(options.measure, Q(**{column_key: member}))
+
+    row_key, row_label = CROSSTAB_DIMENSIONS[options.rows]
+    grouped = values.values(*dict.fromkeys([row_key, row_label])).annotate(**aggregates).order_by(
+        row_key if options.rows == 'period' else row_label
+    )
+
+    def number(value):
+        return None if value is None else round(float(value), 2)
+
+    rows = []
+    for row in grouped:
+        rows.append([
+            _crosstab_label(options.rows, row[row_label], options.period),
+            [number(row[f'c{index}']) for index in range(len(members))],
+            number(row['total']),
+        ])
+    return {
+        'rows_dimension': options.rows,
+        'columns_dimension': options.columns,
+        'measure': options.measure,
+        'column_labels': [_crosstab_label(options.columns, label, options.period) for _, label in members],
+        'rows': rows,
+    }
+
+
+# ``previous`` compares each value with the series' preceding report
+# (quarter over quarter for a quarterly indicator), ``year`` with the
+# report for the same period a year earlier.
+COMPARISONS = ('previous', 'year')
+COMPARISON_LIMIT = 100
+COMPARISON_COLUMNS = [
+    'project', 'indicator', 'period_start', 'previous_period_start',
+    'value', 'previous_value', 'change', 'change_percent',
+]
+COMPARISON_FIELDS = [
+    'project__name', 'indicator__name', 'reporting_period_start', 'previous_start',
+    'reported_value', 'previous_value',
+]
+
+
+def _comparison_partition(compare):
+    partition = [F('indicator_id'), F('project_id')]
+    if compare == 'year':
+        # Within one calendar slot the preceding row is the year before
+        partition += [ExtractMonth('reporting_period_start'), ExtractDay('reporting_period_start')]
+    return partition
+
+
+def _window_comparison(values, filters, compare, latest_only, limit):
+    """
+    Rank with LAG in the database. The windowed query is wrapped so the
+    start date, latest-only and ranking apply after LAG has looked back
+    past the start of the range.
+    """
+    order = F('reporting_period_start').asc()
+    partition = _comparison_partition(compare)
+    windowed = values.annotate(
+        previous_value=Window(Lag('reported_value'), partition_by=partition, order_by=order),
+        previous_start=Window(Lag('reporting_period_start'), partition_by=partition, order_by=order),
+        recency=Window(
+            RowNumber(), partition_by=[F('indicator_id'), F('project_id')],
+            order_by=F('reporting_period_start').desc(),
+        ),
+    ).values(*COMPARISON_FIELDS, 'recency')
+    connection = connections[windowed.db]
+    inner_sql, params = windowed.query.sql_with_params()
+
+    conditions = ['previous_value IS NOT NULL']
+    params = list(params)
+    if latest_only:
+        conditions.append('recency = 1')
+    if filters.start_date:
+        conditions.append('reporting_period_start >= %s')
+        params.append(connection.ops.adapt_datefield_value(filters.start_date))
+    columns = ', '.join(connection.ops.quote_name(field) for field in COMPARISON_FIELDS)
+    sql = (
+        f'SELECT {columns} FROM ({inner_sql}) comparison WHERE {" AND ".join(conditions)} '
+        'ORDER BY CASE WHEN previous_value = 0 THEN 1 ELSE 0 END, '
+        'ABS((reported_value - previous_value) * 1.0 / CASE WHEN previous_value = 0 THEN 1 ELSE previous_value END) DESC, '
+        'ABS(reported_value - previous_value) DESC '
+        'LIMIT %s'
+    )
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    for project, indicator, start, previous_start, value, previous in rows:
+        if isinstance(previous_start, str):
+            # SQLite types a LAG() of a date column as text
+            previous_start = date.fromisoformat(previous_start)
+        yield project, indicator, start, previous_start, value, previous
+
+
+def _python_comparison(values, filters, compare, latest_only, limit):
+    """Fallback for databases without window functions: one ordered pass in Python"""
+    rows = values.order_by('indicator_id', 'project_id', 'reporting_period_start').values_list(
+        'indicator_id', 'project_id', *COMPARISON_FIELDS[:3], 'reported_value',
+    )
+    previous = {}
+    compared = {}
+    for indicator_id, project_id, project, indicator, start, value in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        series = (indicator_id, project_id)
+        slot = series + ((start.month, start.day) if compare == 'year' else ())
+        before = previous.get(slot)
+        previous[slot] = (start, value)
+        row = (project, indicator, start, before[0], value, before[1]) if before else None
+        if row and filters.start_date and start < filters.start_date:
+            row = None
+        if latest_only:
+            compared[series] = row
+        elif row:
+            compared[len(compared)] = row
+
+    def rank(row):
+        change = row[4] - row[5]
+        return (row[5] == 0, -abs(change / row[5]) if row[5] else 0, -abs(change))
+
+    return sorted((row for row in compared.values() if row), key=rank)[:limit]
+
+
+def period_comparison(filters, compare='previous', latest_only=True, queryset=None, limit=COMPARISON_LIMIT):
+    """
+    Period-over-period changes per indicator and project, biggest movers first.
+
+    Each value is compared with the preceding one of its indicator/project
+    series (``LAG`` partitioned by indicator and project, ordered by
+    ``reporting_period_start``), or for ``compare='year'`` with the same
+    period of the year before. With ``latest_only`` only each series' most
+    recent value is compared. Movers are ranked by the size of the change
+    in percent, then in absolute terms. Databases without window
+    functions (SQLite before 3.25) fall back to one ordered pass in Python.
+    Returns rows ordered like COMPARISON_COLUMNS.
+    """
+    if compare not in COMPARISONS:
+        raise ValueError(f'Comparison must be one of {", ".join(COMPARISONS)}.')
+    values = filter_report_values(filters._replace(start_date=None), queryset).order_by()
+    if connections[values.db].features.supports_over_clause:
+        rows = _window_comparison(values, filters, compare, latest_only, limit)
+    else:
+        rows = _python_comparison(values, filters, compare, latest_only, limit)
+
+    result = []
+    for project, indicator, start, previous_start, value, previous in rows:
+        value, previous = float(value), float(previous)
+        change = value - previous
+        result.append([
+            project,
+            indicator,
+            start.isoformat(),
+            previous_start.isoformat(),
+            round(value, 2),
+            round(previous, 2),
+            round(change, 2),
+            round(change * 100 / previous, 1) if previous else None,
+        ])
+    return result
+
+
+BUDGET_COLUMNS = [
+    'cluster', 'status', 'projects', 'budget', 'units_achieved',
+    'cost_per_unit', 'achievement', 'weighted_spend',
+]
+
+# Units achieved only add up indicators counted in plain numbers
+BUDGET_UNIT_MEASURE = 'number'
+
+
+def _budget_row(cluster, status, projects, budget, units, budgeted_units, weighted_spend):
+    budget = float(budget or 0)
+    return [
+        cluster,
+        status,
+        projects,
+        round(budget, 2),
+        round(float(units or 0), 2),
+        round(budget / float(budgeted_units), 2) if budgeted_units else None,
+        round(weighted_spend * 100 / budget, 1) if budget else None,
+        round(weighted_spend, 2),
+    ]
+
+
+def budget_efficiency(filters, projects, queryset=None):
+    """
+    Budget against achievement per cluster and project status.
+
+    Every project is scored on the latest value of each of its indicators
+    (the report filters narrow those values; a project or indicator filter
+    also narrows the projects). ``units_achieved`` adds up the latest values
+    of number indicators, and ``cost_per_unit`` divides the budget of the
+    projects that have one by the units they achieved. A project's
+    achievement is the mean of its latest values over their targets, each
+    capped at 100%. ``weighted_spend`` is the budget scaled by that
+    achievement, and the group's ``achievement`` is weighted spend over
+    budget in percent.
+
+    Each project's figures come from correlated subqueries, which are then
+    summed in one grouped query per cluster and status. Summing that way
+    means the budget is never multiplied by the join to values. Returns
+    ``rows`` per cluster and status, ``clusters`` subtotals and a grand
+    ``total``, each ordered like BUDGET_COLUMNS.
+    """
+    if filters.project_id:
+        projects = projects.filter(pk=filters.project_id)
+    if filters.indicator_id:
+        projects = projects.filter(indicators=filters.indicator_id)
+
+    values = filter_report_values(filters, queryset).order_by()
+    later = values.filter(
+        indicator=OuterRef('indicator'),
+        project=OuterRef('project'),
+        reporting_period_start__gt=OuterRef('reporting_period_start'),
+    )
+    latest = values.filter(~Exists(later), project=OuterRef('pk'))
+    units = latest.filter(indicator__measurement_unit=BUDGET_UNIT_MEASURE).values('project').annotate(
+        total=Sum('reported_value'),
+    ).values('total')
+    # Cast first, or SQLite divides whole numbers as integers
+    achievement = latest.exclude(indicator__measurement_unit__in=('text', 'date')).annotate(
+        target=Cast(Coalesce('target_value', 'indicator__target_value'), FloatField()),
+    ).filter(target__gt=0).values('project').annotate(
+        ratio=Avg(Least(Cast('reported_value', FloatField()) / F('target'), Value(1.0))),
+    ).values('ratio')
+
+    grouped = projects.order_by().annotate(
+        units=Subquery(units),
+        achievement=Coalesce(Subquery(achievement, output_field=FloatField()), Value(0.0)),
+    ).values('cluster__name', 'status').annotate(
+        project_count=Count('pk'),
+        total_budget=Sum('budget'),
+        total_units=Sum('units'),
+        budgeted_units=Sum('units', filter=Q(budget__isnull=False)),
+        weighted_spend=Sum(Cast('budget', FloatField()) * F('achievement'), output_field=FloatField()),
+    ).order_by('cluster__name', 'status')
+
+    statuses = dict(Project.PROJECT_STATUS_CHOICES)
+    rows, clusters, total = [], {}, [0, 0, 0, 0, 0]
+    for group in grouped:
+        figures = [
+            group['project_count'], group['total_budget'] or 0, group['total_units'] or 0,
+            group['budgeted_units'] or 0, group['weighted_spend'] or 0,
+        ]
+        rows.append(_budget_row(group['cluster__name'], statuses.get(group['status'], group['status']), *figures))
+        subtotal = clusters.setdefault(group['cluster__name'], [0, 0, 0, 0, 0])
+        for i, figure in enumerate(figures):
+            subtotal[i] += figure
+            total[i] += figure
+    return {
+        'columns': BUDGET_COLUMNS,
+        'rows': rows,
+        'clusters': [_budget_row(cluster, 'All', *figures) for cluster, figures in clusters.items()],
+        'total': _budget_row('All clusters', 'All', *total),
+    }
@@ -0,0 +1,220 @@
+import base64
+import hashlib
+import uuid
+from datetime import date
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Avg, Sum
+
+from .models import IndicatorValue
+from .progress import LEVEL_UNITS
+
+
+# Chart series are downsampled on the server to about one point per pixel.
+# Results, and the list sparklines, are cached per indicator under its version
+# token; every change to the indicator's values replaces the token, orphaning
+# the old entries.
+SERIES_DEFAULT_WIDTH = 800
+SERIES_MIN_WIDTH = 10
+SERIES_MAX_WIDTH = 4000
+SERIES_CACHE_SECONDS = 60 * 60
+
+# Sparklines in the indicator lists: the latest periods, drawn in a small box
+SPARKLINE_PERIODS = 12
+SPARKLINE_WIDTH = 100
+SPARKLINE_HEIGHT = 24
+SPARKLINE_CACHE_SECONDS = 24 * 60 * 60
+
+VERSION_KEY = 'dashboard:series:version:{}'
+EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+
+def lttb(x, y, threshold):
+    """
+    Indices of ``threshold`` points of the series ``(x, y)`` chosen with
+    Largest-Triangle-Three-Buckets.
+
+    The first and last points are kept. The rest are split into equal
+    buckets, and from each the point forming the largest triangle with the
+    point kept before it and the average of the next bucket is kept, which
+    preserves peaks and troughs that averaging would flatten.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    bounds = np.floor(np.arange(threshold - 1) * every).astype(np.int64) + 1
+    bounds[-1] = n - 1
+    # Average of every bucket, and the last point standing in after the last one
+    counts = np.diff(bounds)
+    mean_x = np.append(np.add.reduceat(x[1:-1], bounds[:-1] - 1) / counts, x[-1])
+    mean_y = np.append(np.add.reduceat(y[1:-1], bounds[:-1] - 1) / counts, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, stop = bounds[bucket], bounds[bucket + 1]
+        areas = np.abs(
+            (x[a] - mean_x[bucket + 1]) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (mean_y[bucket + 1] - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[bucket + 1] = a
+    return selected
+
+
+def _encode(array, dtype):
+    return base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode('ascii')
+
+
+def _read_rows(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def build_series(values, measurement_unit, width, by_project=False):
+    """
+    Downsampled chart series of an indicator's values, an IndicatorValue
+    queryset.
+
+    By default one series: per reporting period end, the total across the
+    projects, or the average for units reported as a level. With
+    ``by_project`` one series per project of its own values. Each series is
+    reduced to at most ``width`` points with ``lttb``.
+
+    The series are returned back to back as little-endian typed arrays,
+    base64 encoded: ``x`` holds int32 days since 1970-01-01, ``y`` float64
+    values and ``offsets`` the int32 start of each series plus the end.
+    """
+    if by_project:
+        queryset = values.order_by('project_id', 'reporting_period_end').values_list(
+            'project_id', 'reporting_period_end', 'reported_value',
+        )
+        rows = _read_rows(queryset)
+    else:
+        aggregate = Avg if measurement_unit in LEVEL_UNITS else Sum
+        queryset = values.order_by('reporting_period_end').values('reporting_period_end').annotate(
+            value=aggregate('reported_value'),
+        ).values_list('reporting_period_end', 'value')
+        rows = [(0, period_end, value) for period_end, value in _read_rows(queryset)]
+
+    count = len(rows)
+    keys, period_ends, reported = zip(*rows) if rows else ((), (), ())
+    keys = np.fromiter(keys, np.int64, count)
+    days = np.fromiter(map(date.toordinal, period_ends), np.int64, count) - EPOCH_DAY
+    reported = np.fromiter(map(float, reported), float, count)
+
+    starts = np.flatnonzero(np.diff(keys, prepend=-1))
+    ends = np.append(starts[1:], count)
+    kept = [start + lttb(days[start:end], reported[start:end], width) for start, end in zip(starts, ends)]
+    offsets = np.cumsum([0] + [len(indices) for indices in kept])
+    kept = np.concatenate(kept) if kept else np.empty(0, np.int64)
+    return {
+        'projects': keys[starts].tolist() if by_project else None,
+        'points': count,
+        'length': len(kept),
+        'dtypes': {'x': '<i4', 'y': '<f8', 'offsets': '<i4'},
+        'x': _encode(days[kept], '<i4'),
+        'y': _encode(reported[kept], '<f8'),
+        'offsets': _encode(offsets, '<i4'),
+    }
+
+
+def _versions(indicator_ids):
+    """Current version token of each indicator, starting one where missing"""
+    keys = {pk: VERSION_KEY.format(pk) for pk in indicator_ids}
+    cached = cache.get_many(keys.values())
+    versions = {pk: cached.get(key) for pk, key in keys.items()}
+    missing = {pk: uuid.uuid4().hex[:12] for pk, version in versions.items() if version is None}
+    if missing:
+        cache.set_many({keys[pk]: version for pk, version in missing.items()}, None)
+        versions.update(missing)
+    return versions
+
+
+def series_cache_key(indicator_id, project_ids, width, by_project):
+    projects = hashlib.sha1(','.join(map(str, sorted(project_ids))).encode()).hexdigest()[:16]
+    mode = 'project' if by_project else 'total'
+    return f"dashboard:series:{indicator_id}:{_versions([indicator_id])[indicator_id]}:{projects}:{width}:{mode}"
+
+
+def get_series(values, indicator_id, measurement_unit, width, by_project=False):
+    """``build_series`` of an indicator's values, cached per project set and width"""
+    # Keyed on the projects actually charted, so every user who sees the
+    # same values shares the entry
+    project_ids = values.order_by().values_list('project_id', flat=True).distinct()
+    key = series_cache_key(indicator_id, project_ids, width, by_project)
+    series = cache.get(key)
+    if series is None:
+        series = build_series(values, measurement_unit, width, by_project)
+        cache.set(key, series, SERIES_CACHE_SECONDS)
+    return series
+
+
+def _sparkline_points(totals):
+    """SVG polyline points of ``totals`` scaled into the sparkline box"""
+    if len(totals) < 2:
+        return ''
+    low, high = min(totals), max(totals)
+    span = (high - low) or 1
+    step = SPARKLINE_WIDTH / (len(totals) - 1)
+    return ' '.join(
+        f"{i * step:.1f},{SPARKLINE_HEIGHT - (total - low) / span * SPARKLINE_HEIGHT:.1f}"
+        for i, total in enumerate(totals)
+    )
+
+
+def attach_sparklines(indicators, user):
+    """
+    Set ``indicator.sparkline`` on every indicator: the last
+    ``SPARKLINE_PERIODS`` period totals of the values ``user`` may see (the
+    average for level units), as ``{'points', 'latest', 'periods'}``, or
+    None without values.
+
+    Sparklines are cached until the indicator's values change; the missing
+    ones come from a single grouped query over all their indicators.
+    """
+    indicators = list(indicators)
+    scope = 'all' if user.profile.is_admin else user.pk
+    versions = _versions([indicator.pk for indicator in indicators])
+    keys = {
+        indicator.pk: f"dashboard:sparkline:{indicator.pk}:{versions[indicator.pk]}:{scope}"
+        for indicator in indicators
+    }
+    sparklines = cache.get_many(keys.values())
+
+    missing = {indicator.pk: indicator for indicator in indicators if keys[indicator.pk] not in sparklines}
+    if missing:
+        rows = (
+            IndicatorValue.objects.visible_to(user).filter(indicator_id__in=missing)
+            .values('indicator_id', 'reporting_period_end')
+            .annotate(total=Sum('reported_value'), average=Avg('reported_value'))
+            .order_by('indicator_id', 'reporting_period_end')
+        )
+        totals = {pk: [] for pk in missing}
+        for row in rows:
+            level = missing[row['indicator_id']].measurement_unit in LEVEL_UNITS
+            totals[row['indicator_id']].append(float(row['average'] if level else row['total']))
+        computed = {}
+        for pk, series in totals.items():
+            series = series[-SPARKLINE_PERIODS:]
+            computed[keys[pk]] = {
+                'points': _sparkline_points(series),
+                'latest': series[-1],
+                'periods': len(series),
+            } if series else None
+        cache.set_many(computed, SPARKLINE_CACHE_SECONDS)
+        sparklines.update(computed)
+
+    for indicator in indicators:
+        indicator.sparkline = sparklines[keys[indicator.pk]]
+
+
+def invalidate_series(indicator_ids):
+    cache.delete_many([VERSION_KEY.format(pk) for pk in set(indicator_ids)])
@@ -0,0 +1,93 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .health import refresh_project_health
+from .models import Cluster, Indicator, IndicatorValue, IndicatorValueTombstone, Project, UploadSession
+from .outliers import flag_outliers
+from .report_cache import invalidate_reports_for, invalidate_reports_for_object, report_row_state
+from .series import invalidate_series
+from .uploads import remove_partial_file
+
+
+@receiver(pre_save, sender=IndicatorValue)
+def remember_report_row_state(sender, instance, raw=False, **kwargs):
+    """Keep the pre-edit state so the reports the value leaves are evicted too"""
+    instance._previous_report_state = None
+    if raw or instance.pk is None:
+        return
+    previous = sender.objects.filter(pk=instance.pk).values(
+        'project_id', 'indicator_id', 'reporting_period_start', 'reporting_period_end'
+    ).first()
+    instance._previous_report_state = previous
+
+
+@receiver(post_save, sender=IndicatorValue)
+def invalidate_reports_on_value_save(sender, instance, raw=False, **kwargs):
+    rows = [report_row_state(instance)]
+    previous = getattr(instance, '_previous_report_state', None)
+    if previous and previous != rows[0]:
+        rows.append(previous)
+    invalidate_reports_for(rows)
+
+
+@receiver([post_save, post_delete], sender=IndicatorValue)
+def invalidate_series_on_value_change(sender, instance, **kwargs):
+    # A value moved to another indicator leaves the old one's chart too
+    previous = getattr(instance, '_previous_report_state', None)
+    invalidate_series({instance.indicator_id, previous['indicator_id'] if previous else instance.indicator_id})
+
+
+@receiver(post_save, sender=IndicatorValue)
+def check_value_for_outlier(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    flag_outliers(sender.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=IndicatorValue)
+def invalidate_reports_on_value_delete(sender, instance, **kwargs):
+    invalidate_reports_for([report_row_state(instance)])
+
+
+@receiver([post_save, post_delete], sender=Project)
+def invalidate_reports_on_project_change(sender, instance, **kwargs):
+    # Reports show the project name
+    invalidate_reports_for_object(project_id=instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Cluster)
+def invalidate_reports_on_cluster_change(sender, instance, **kwargs):
+    # Reports show the cluster name through its projects; the projects of a
+    # deleted cluster evict their own entries as they are deleted with it
+    for project_id in Project.objects.filter(cluster_id=instance.pk).values_list('id', flat=True):
+        invalidate_reports_for_object(project_id=project_id)
+
+
+@receiver(post_save, sender=Project)
+def refresh_health_on_project_save(sender, instance, raw=False, **kwargs):
+    # Dates and status are edited here; the daily command catches achievement
+    if raw:
+        return
+    refresh_project_health(sender.objects.filter(pk=instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Indicator)
+def invalidate_reports_on_indicator_change(sender, instance, **kwargs):
+    invalidate_reports_for_object(indicator_id=instance.pk)
+    # The measurement unit decides how the chart totals periods
+    invalidate_series([instance.pk])
+
+
+@receiver(post_delete, sender=IndicatorValue)
+def record_value_tombstone(sender, instance, **kwargs):
+    IndicatorValueTombstone.objects.create(
+        value_id=instance.pk,
+        project_id=instance.project_id,
+        indicator_id=instance.indicator_id,
+    )
+
+
+@receiver(post_delete, sender=UploadSession)
+def remove_upload_part_file(sender, instance, **kwargs):
+    # Also runs when the session goes with its value, so no part file is orphaned
+    remove_partial_file(instance.pk)
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from django.core.files.storage import FileSystemStorage
+
+
+BLOB_DIR = 'blobs'
+HASH_BLOCK_SIZE = 1024 * 1024
+# Blobs whose link count changed this recently are left alone by the
+# collector, so a file that is being saved right now is never swept
+BLOB_GC_GRACE_SECONDS = 60 * 60
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DeduplicatedFileSystemStorage(FileSystemStorage):
+    """
+    File system storage that keeps one copy of each distinct file content.
+
+    The data lives once under ``blobs/<aa>/<bb>/<sha256>`` and every stored
+    name (``indicator_attachments/report.pdf``, ...) is a hard link to its
+    blob. Names, URLs and paths therefore behave exactly as with
+    FileSystemStorage, while a duplicate costs a directory entry instead of
+    its size. The blob's link count is its reference count: deleting a name
+    drops one reference, and a blob left with a single link (its own) is
+    garbage that ``collect_garbage`` removes.
+
+    Requires MEDIA_ROOT on a file system with hard links.
+    """
+
+    def blob_path(self, digest):
+        return self.path(f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}')
+
+    def _new_temp_file(self):
+        directory = self.path(f'{BLOB_DIR}/tmp')
+        os.makedirs(directory, exist_ok=True)
+        return tempfile.mkstemp(dir=directory)
+
+    def _store_blob(self, temp_path, digest):
+        """Make ``temp_path`` the blob for ``digest`` unless one exists; returns the blob path"""
+        blob = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        try:
+            os.link(temp_path, blob)
+            if self.file_permissions_mode is not None:
+                os.chmod(blob, self.file_permissions_mode)
+        except FileExistsError:
+            pass
+        return blob
+
+    def _save(self, name, content):
+        # Hash while spooling to a private temp file, so the content is
+        # read once whatever kind of file object it is
+        fd, temp_path = self._new_temp_file()
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+            blob = self._store_blob(temp_path, digest.hexdigest())
+
+            while True:
+                full_path = self.path(name)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                try:
+                    os.link(blob, full_path)
+                    break
+                except FileExistsError:
+                    name = self.get_available_name(name)
+                except FileNotFoundError:
+                    # The blob was collected between the two links; recreate it
+                    blob = self._store_blob(temp_path, digest.hexdigest())
+        finally:
+            os.remove(temp_path)
+        return str(name).replace('\\', '/')
+
+    def deduplicate(self, name):
+        """
+        Point an existing file at its blob, in place.
+
+        If another file already has the same content, ``name`` is atomically
+        replaced with a link to that blob and its own copy is freed;
+        otherwise the file itself becomes the blob. Returns the number of
+        bytes freed.
+        """
+        full_path = self.path(name)
+        stat = os.stat(full_path)
+        digest = file_sha256(full_path)
+        blob = self._store_blob(full_path, digest)
+        if os.path.samefile(blob, full_path):
+            return 0
+
+        fd, temp_path = self._new_temp_file()
+        os.close(fd)
+        os.remove(temp_path)
+        os.link(blob, temp_path)
+        os.replace(temp_path, full_path)
+        return stat.st_size if stat.st_nlink == 1 else 0
+
+    def iter_blobs(self):
+        root = self.path(BLOB_DIR)
+        for directory, subdirectories, files in os.walk(root):
+            if directory == root:
+                # Skip the temp dir; only the fan-out directories hold blobs
+                subdirectories[:] = [d for d in subdirectories if d != 'tmp']
+                continue
+            for filename in files:
+                yield os.path.join(directory, filename)
+
+    def collect_garbage(self, dry_run=False, grace_seconds=BLOB_GC_GRACE_SECONDS):
+        """Remove blobs no stored name links to any more; returns ``(blobs, bytes)``"""
+        cutoff = time.time() - grace_seconds
+        removed = freed = 0
+        for blob in self.iter_blobs():
+            stat = os.stat(blob)
+            if stat.st_nlink > 1 or stat.st_ctime > cutoff:
+                continue
+            if not dry_run:
+                os.remove(blob)
+            removed += 1
+            freed += stat.st_size
+        return removed, freed
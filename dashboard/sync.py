@@ -0,0 +1,239 @@
+import base64
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+
+from .changefeed import FeedCursor, after_cursor, change_horizon
+from .importers import EntryValidator, upsert_indicator_values
+from .models import Indicator, IndicatorValue, IndicatorValueTombstone, Project, SyncReceipt
+
+
+SYNC_MAX_BATCH = 500
+SYNC_PAGE_SIZE = 500
+# Tries of a batch racing a concurrent re-send of the same keys
+SYNC_ATTEMPTS = 3
+
+
+def decode_cursor(cursor):
+    """
+    Parse a pull cursor into a FeedCursor; raises ValueError for a malformed
+    cursor.
+
+    Cursors handed out before deletions were synced hold only the last
+    (updated_at, id) of a value; their deletions start from that moment.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        if '|' in raw:
+            updated_at, pk = raw.split('|')
+            moment = datetime.fromisoformat(updated_at)
+            return FeedCursor(values=(moment, int(pk)), tombstones=(moment, 0))
+    except (ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    return FeedCursor.decode(cursor)
+
+
+def _item_error(key, *errors):
+    return {'key': key, 'status': 'error', 'errors': list(errors)}
+
+
+def apply_sync_batch(user, items):
+    """
+    Apply a batch of offline entries for ``user`` in one transaction.
+
+    Each item carries a client-generated ``key``. Items whose key was already
+    applied are answered from their receipt instead of being written again,
+    so a device can safely re-send a batch after a lost response. Invalid
+    items are reported and skipped; they leave no receipt, so they can be
+    corrected and re-sent under the same key. Returns one result per item,
+    in order.
+    """
+    results = [None] * len(items)
+    seen_keys = set()
+    for index, item in enumerate(items):
+        key = item.get('key') if isinstance(item, dict) else None
+        if not isinstance(key, str) or not key or len(key) > 64:
+            results[index] = _item_error(key, 'key: a string of at most 64 characters is required.')
+        elif key in seen_keys:
+            results[index] = _item_error(key, 'key: used more than once in this batch.')
+        else:
+            seen_keys.add(key)
+
+    # Receipts that do not exist yet cannot be locked, so a device re-sending
+    # while its first push is still running gets past the receipt check too.
+    # Whichever transaction commits its receipts second fails on the unique
+    # (user, key) constraint and is rolled back; running it again answers
+    # those items from the receipts the first one committed.
+    for attempt in range(SYNC_ATTEMPTS):
+        try:
+            return _apply_items(user, items, list(results), seen_keys)
+        except IntegrityError:
+            if attempt == SYNC_ATTEMPTS - 1:
+                raise
+
+
+def _apply_items(user, items, results, seen_keys):
+    with transaction.atomic():
+        receipts = {
+            receipt.key: receipt
+            for receipt in SyncReceipt.objects.select_for_update().filter(user=user, key__in=seen_keys)
+        }
+        project_ids = set(
+            Project.objects.visible_to(user).filter(is_active=True).values_list('id', flat=True)
+        )
+        indicators = Indicator.objects.filter(is_active=True).only('id', 'name', 'target_value').in_bulk()
+        links = set(
+            Project.indicators.through.objects.filter(
+                project_id__in=project_ids
+            ).values_list('project_id', 'indicator_id')
+        )
+
+        validator = EntryValidator(user)
+        rows = {}
+        pending = {}
+        for index, item in enumerate(items):
+            if results[index] is not None:
+                continue
+            key = item['key']
+            receipt = receipts.get(key)
+            if receipt is not None:
+                results[index] = {
+                    'key': key,
+                    'status': receipt.status,
+                    'id': receipt.indicator_value_id,
+                    'duplicate': True,
+                }
+                continue
+
+            try:
+                project_id = int(item.get('project_id'))
+                indicator_id = int(item.get('indicator_id'))
+            except (TypeError, ValueError):
+                results[index] = _item_error(key, 'project_id and indicator_id must be integers.')
+                continue
+            indicator = indicators.get(indicator_id)
+            if project_id not in project_ids:
+                results[index] = _item_error(key, 'project_id: not one of your active projects.')
+                continue
+            if indicator is None or (project_id, indicator_id) not in links:
+                results[index] = _item_error(key, 'indicator_id: not an active indicator of this project.')
+                continue
+
+            cleaned, errors = validator.clean(indicator, {
+                'indicator_id': indicator_id,
+                'reported_value': item.get('reported_value'),
+                'target_value': item.get('target_value') or indicator.target_value,
+                'reporting_period_start': item.get('reporting_period_start'),
+                'reporting_period_end': item.get('reporting_period_end'),
+                'notes': item.get('notes') or '',
+            })
+            if errors:
+                results[index] = _item_error(key, *errors)
+                continue
+
+            value_key = (indicator_id, project_id, cleaned['reporting_period_start'], cleaned['reporting_period_end'])
+            rows[value_key] = (
+                cleaned['reported_value'],
+                cleaned['target_value'] or indicator.target_value,
+                cleaned.get('notes', ''),
+            )
+            pending[index] = value_key
+
+        if rows:
+            existing = upsert_indicator_values(rows, user)
+            value_ids = {
+                (indicator_id, project_id, start, end): pk
+                for pk, indicator_id, project_id, start, end in IndicatorValue.objects.filter(
+                    indicator_id__in={key[0] for key in rows},
+                    project_id__in={key[1] for key in rows},
+                    reporting_period_start__in={key[2] for key in rows},
+                ).values_list('id', 'indicator_id', 'project_id', 'reporting_period_start', 'reporting_period_end')
+            }
+
+            new_receipts = []
+            for index, value_key in pending.items():
+                status = 'updated' if value_key in existing else 'created'
+                value_id = value_ids[value_key]
+                new_receipts.append(SyncReceipt(
+                    user=user, key=items[index]['key'], indicator_value_id=value_id, status=status,
+                ))
+                results[index] = {'key': items[index]['key'], 'status': status, 'id': value_id}
+            SyncReceipt.objects.bulk_create(new_receipts)
+
+    return results
+
+
+def serialize_change(value):
+    return {
+        'op': 'upsert',
+        'id': value.id,
+        'project_id': value.project_id,
+        'indicator_id': value.indicator_id,
+        'reported_value': str(value.reported_value),
+        'target_value': None if value.target_value is None else str(value.target_value),
+        'reporting_period_start': value.reporting_period_start.isoformat(),
+        'reporting_period_end': value.reporting_period_end.isoformat(),
+        'notes': value.notes or '',
+        'updated_at': value.updated_at.isoformat(),
+    }
+
+
+def serialize_deletion(tombstone):
+    return {
+        'op': 'delete',
+        'id': tombstone.value_id,
+        'project_id': tombstone.project_id,
+        'indicator_id': tombstone.indicator_id,
+        'deleted_at': tombstone.deleted_at.isoformat(),
+    }
+
+
+def changes_since(user, cursor=None, limit=SYNC_PAGE_SIZE):
+    """
+    Values of ``user``'s projects changed or deleted after ``cursor``, oldest
+    first.
+
+    Upserts and deletions share one page in order of their updated_at or
+    deleted_at, and stop at the change feed's horizon so a transaction still
+    committing cannot land behind the returned cursor. ``cursor`` is a
+    FeedCursor from ``decode_cursor``. Returns ``(changes, next_cursor,
+    has_more)``; ``next_cursor`` is the cursor to send on the next pull
+    (unchanged when nothing is new).
+    """
+    cursor = cursor or FeedCursor()
+    horizon = change_horizon()
+    values = after_cursor(
+        IndicatorValue.objects.visible_to(user), cursor.values
+    ).filter(
+        updated_at__lte=horizon
+    ).only(
+        'id', 'project_id', 'indicator_id', 'reported_value', 'target_value',
+        'reporting_period_start', 'reporting_period_end', 'notes', 'updated_at',
+    )
+    tombstones = after_cursor(
+        IndicatorValueTombstone.objects.filter(
+            project_id__in=Project.objects.visible_to(user).values('id')
+        ), cursor.tombstones, field='deleted_at'
+    ).filter(deleted_at__lte=horizon)
+
+    # The first ``limit`` changes overall are among the first ``limit`` + 1
+    # of each kind
+    page = sorted(
+        [(value.updated_at, 0, value.id, value) for value in values[:limit + 1]]
+        + [(tombstone.deleted_at, 1, tombstone.id, tombstone) for tombstone in tombstones[:limit + 1]],
+        key=lambda change: change[:3],
+    )
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    position = FeedCursor(cursor.values, cursor.tombstones)
+    changes = []
+    for moment, kind, pk, row in page:
+        if kind == 0:
+            position.values = (moment, pk)
+            changes.append(serialize_change(row))
+        else:
+            position.tombstones = (moment, pk)
+            changes.append(serialize_deletion(row))
+    next_cursor = position.encode() if position.values or position.tombstones else None
+    return changes, next_cursor, has_more
@@ -0,0 +1,59 @@
+import json
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+
+from .decorators import api_project_user_required
+from .sync import SYNC_MAX_BATCH, SYNC_PAGE_SIZE, apply_sync_batch, changes_since, decode_cursor
+
+
+# JSON API for offline data collection. Devices log in with the regular
+# session and send the CSRF token in the X-CSRFToken header.
+
+
+@api_project_user_required
+@require_POST
+def sync_push(request):
+    """
+    Apply a batch of indicator values collected offline.
+
+    Body: ``{"items": [{"key", "project_id", "indicator_id", "reported_value",
+    "target_value", "reporting_period_start", "reporting_period_end",
+    "notes"}, ...]}``. Responds with one result per item, in order.
+    """
+    try:
+        payload = json.loads(request.body)
+        items = payload['items']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected a JSON object with an "items" list.'}, status=400)
+
+    if not isinstance(items, list):
+        return JsonResponse({'error': '"items" must be a list.'}, status=400)
+    if len(items) > SYNC_MAX_BATCH:
+        return JsonResponse({'error': f'At most {SYNC_MAX_BATCH} items per batch.'}, status=413)
+
+    results = apply_sync_batch(request.user, items)
+    return JsonResponse({
+        'results': results,
+        'applied': sum(1 for result in results if result['status'] != 'error' and not result.get('duplicate')),
+        'failed': sum(1 for result in results if result['status'] == 'error'),
+    })
+
+
+@api_project_user_required
+@require_GET
+def sync_changes(request):
+    """Values of the user's projects changed or deleted since ``cursor`` (JSON)"""
+    cursor = request.GET.get('cursor')
+    try:
+        cursor = decode_cursor(cursor) if cursor else None
+        limit = min(max(int(request.GET.get('limit', SYNC_PAGE_SIZE)), 1), SYNC_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor or limit.'}, status=400)
+
+    changes, next_cursor, has_more = changes_since(request.user, cursor, limit)
+    return JsonResponse({
+        'changes': changes,
+        'cursor': next_cursor,
+        'has_more': has_more,
+    })
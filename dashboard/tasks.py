@@ -0,0 +1,78 @@
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .deletion import purge_cluster, purge_project
+from .importers import ImportFileError, import_indicator_values
+from .jobs import task
+from .models import Cluster, Project
+
+
+IMPORT_ERRORS_SHOWN = 200
+
+
+def import_error_report_path(job_id):
+    return f'imports/{job_id}/errors.csv'
+
+
+@task('import_indicator_values')
+def import_indicator_values_task(context, path, filename, user_id):
+    """Import an uploaded CSV/XLSX file saved by the import_values view"""
+    user = User.objects.get(pk=user_id)
+    size = default_storage.size(path) or 1
+
+    with default_storage.open(path, 'rb') as fileobj:
+        def progress(rows):
+            # Bytes consumed is a good enough estimate of how far along we are
+            percent = min(int(fileobj.tell() * 100 / size), 99)
+            context.set_progress(percent, f'{rows} rows processed')
+
+        try:
+            result = import_indicator_values(fileobj, filename, user, progress=progress)
+        except ImportFileError as e:
+            result = None
+            file_error = str(e)
+
+    if result is None:
+        # Retrying cannot fix an unreadable file
+        default_storage.delete(path)
+        return {'file_error': file_error}
+
+    if result.errors:
+        default_storage.save(
+            import_error_report_path(context.job.pk),
+            ContentFile(result.error_report_csv().encode()),
+        )
+    default_storage.delete(path)
+
+    return {
+        'rows': result.rows,
+        'created': result.created,
+        'updated': result.updated,
+        'failed': result.failed,
+        'error_count': len(result.errors),
+        'errors': result.errors[:IMPORT_ERRORS_SHOWN],
+    }
+
+
+def _deletion_progress(context):
+    def progress(deleted, total):
+        percent = deleted * 100 // total if total else 100
+        context.set_progress(min(percent, 99), f'{deleted} of {total} indicator values deleted')
+    return progress
+
+
+@task('delete_project')
+def delete_project_task(context, project_id):
+    project = Project.objects.filter(pk=project_id).first()
+    if project is None:
+        return {'deleted_values': 0}
+    return {'deleted_values': purge_project(project, _deletion_progress(context))}
+
+
+@task('delete_cluster')
+def delete_cluster_task(context, cluster_id):
+    cluster = Cluster.objects.filter(pk=cluster_id).first()
+    if cluster is None:
+        return {'deleted_values': 0}
+    return {'deleted_values': purge_cluster(cluster, _deletion_progress(context))}
@@ -1,3 +1,204 @@
+import asyncio
+import warnings
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
 from django.test import TestCase
+from django.urls import URLPattern, reverse
+
+from . import urls as dashboard_urls
+from .deletion import purge_project
+from .models import Cluster, Indicator, IndicatorValue, OutlierFlag, Project, UserProfile
+
+
+def create_user(username, role):
+    user = User.objects.create_user(username, password='pw')
+    UserProfile.objects.create(user=user, role=role)
+    return user
+
+
+class AccessTestCase(TestCase):
+    """One project user owning a cluster, project, indicator and value; another owning nothing"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user('admin', 'admin')
+        cls.owner = create_user('owner', 'project_user')
+        cls.other = create_user('other', 'project_user')
+
+        cls.cluster = Cluster.objects.create(name='Health', code='HLT', created_by=cls.owner)
+        cls.project = Project.objects.create(
+            name='Clinics', code='CLN', cluster=cls.cluster, created_by=cls.owner,
+            start_date=date(2024, 1, 1), end_date=date(2030, 1, 1), budget=Decimal('1000'),
+        )
+        cls.project.assigned_users.add(cls.owner)
+        cls.indicator = Indicator.objects.create(
+            name='Visits', code='VIS', target_value=Decimal('100'), created_by=cls.owner,
+        )
+        cls.indicator.projects.add(cls.project)
+        cls.value = IndicatorValue.objects.create(
+            indicator=cls.indicator, project=cls.project, reported_by=cls.owner,
+            reported_value=Decimal('40'), target_value=Decimal('100'),
+            reporting_period_start=date(2024, 1, 1), reporting_period_end=date(2024, 1, 31),
+        )
+
+
+class VisibleToTests(AccessTestCase):
+    def test_owner_and_admin_see_everything_others_nothing(self):
+        for model in (Cluster, Project, Indicator, IndicatorValue):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(model.objects.visible_to(self.owner).count(), 1)
+                self.assertEqual(model.objects.visible_to(self.admin).count(), 1)
+                self.assertEqual(model.objects.visible_to(self.other).count(), 0)
+                self.assertEqual(model.objects.visible_to(AnonymousUser()).count(), 0)
+
+    def test_access_is_a_single_predicate(self):
+        # No join through assigned users and no DISTINCT, just the owner column
+        sql = str(Project.objects.visible_to(self.owner).query)
+        self.assertIn('"created_by_id" = ', sql)
+        self.assertNotIn('DISTINCT', sql)
+        sql = str(IndicatorValue.objects.visible_to(self.owner).query)
+        self.assertIn('"created_by_id" = ', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+
+class ViewAccessTests(AccessTestCase):
+    """Every dashboard URL that addresses an object must not load it for a user without access"""
+
+    def _object_urls(self):
+        objects = {
+            'cluster_id': self.cluster,
+            'project_id': self.project,
+            'indicator_id': self.indicator,
+            'value_id': self.value,
+        }
+        for pattern in dashboard_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern):
+                continue
+            names = set(pattern.pattern.converters)
+            if names == {'model_name', 'object_id'}:
+                for model_name, obj in (('cluster', self.cluster), ('project', self.project), ('indicator', self.indicator)):
+                    url = reverse(f'dashboard:{pattern.name}', kwargs={'model_name': model_name, 'object_id': obj.pk})
+                    yield url, obj
+            elif len(names) == 1 and names <= set(objects):
+                name = names.pop()
+                yield reverse(f'dashboard:{pattern.name}', kwargs={name: objects[name].pk}), objects[name]
+
+    def _loads(self, target, method, url):
+        """Request ``url`` and report whether ``target`` was instantiated from the database"""
+        loaded = []
+        model = type(target)
+        original = model.from_db.__func__
+
+        def from_db(cls, db, field_names, values):
+            instance = original(cls, db, field_names, values)
+            loaded.append(instance.pk)
+            return instance
+
+        with mock.patch.object(model, 'from_db', classmethod(from_db)):
+            response = getattr(self.client, method)(url)
+        return target.pk in loaded, response
+
+    def test_no_view_loads_an_object_before_checking_access(self):
+        urls = list(self._object_urls())
+        self.assertGreaterEqual(len(urls), 12)
+
+        self.client.force_login(self.other)
+        for url, target in urls:
+            for method in ('get', 'post'):
+                with self.subTest(url=url, method=method):
+                    loaded, response = self._loads(target, method, url)
+                    self.assertFalse(loaded, f'{method.upper()} {url} loaded {target!r} for a user without access')
+                    self.assertNotEqual(response.status_code, 200)
+
+        # Nothing was changed or deleted on the way
+        self.assertTrue(Project.objects.filter(pk=self.project.pk, is_active=True, deletion_job=None).exists())
+        self.assertTrue(Cluster.objects.filter(pk=self.cluster.pk, is_active=True, deletion_job=None).exists())
+        self.assertTrue(Indicator.objects.filter(pk=self.indicator.pk, is_active=True).exists())
+
+    def test_owner_still_reaches_own_objects(self):
+        self.client.force_login(self.owner)
+        for name, kwargs in (
+            ('project_detail', {'project_id': self.project.pk}),
+            ('indicator_detail', {'indicator_id': self.indicator.pk}),
+            ('data_entry_form', {'project_id': self.project.pk}),
+            ('user_cluster_edit', {'cluster_id': self.cluster.pk}),
+            ('get_user_project_indicators', {'project_id': self.project.pk}),
+        ):
+            with self.subTest(view=name):
+                self.assertEqual(self.client.get(reverse(f'dashboard:{name}', kwargs=kwargs)).status_code, 200)
+
+
+class PurgeTests(AccessTestCase):
+    def test_purge_removes_outlier_flags_with_their_values(self):
+        OutlierFlag.objects.create(value=self.value, score=9.0, expected_value=Decimal('4'))
+
+        purge_project(self.project)
+
+        # The batch deletes with raw SQL, so Django's CASCADE is not emulated
+        connection.check_constraints()
+        self.assertFalse(IndicatorValue.objects.filter(pk=self.value.pk).exists())
+        self.assertFalse(OutlierFlag.objects.exists())
+        self.assertFalse(Project.objects.filter(pk=self.project.pk).exists())
+
+
+class ASGIStreamingTests(AccessTestCase):
+    """Streaming endpoints must reach the client chunk by chunk under ASGI, not be buffered first"""
+
+    async def _asgi_get(self, url, cookie):
+        path, _, query = url.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query.encode(), 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+        requested = False
+        disconnected = asyncio.Event()
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await ASGIHandler()(scope, receive, send)
+        disconnected.set()
+        return messages
+
+    async def test_streaming_responses_use_async_iterators(self):
+        await self.async_client.aforce_login(self.admin)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={self.async_client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        urls = [reverse('dashboard:change_feed')] + [
+            reverse('dashboard:export_report', kwargs={'format': format}) for format in ('parquet', 'arrow', 'zip', 'xlsx')
+        ]
 
-# Create your tests here.
+        # Keep the test transaction's connection open, as the test client does
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            for url in urls:
+                with self.subTest(url=url), warnings.catch_warnings(record=True) as caught:
+                    warnings.simplefilter('always')
+                    messages = await self._asgi_get(url, cookie)
+                    self.assertEqual(messages[0]['status'], 200)
+                    self.assertEqual([str(w.message) for w in caught if 'iterator' in str(w.message)], [])
+                    body = [m for m in messages if m['type'] == 'http.response.body']
+                    self.assertTrue(b''.join(m.get('body', b'') for m in body))
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
@@ -0,0 +1,64 @@
+import json
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods, require_POST
+
+from .decorators import api_project_user_required
+from .models import IndicatorValue, UploadSession
+from .uploads import UploadError, parse_content_range, start_upload, upload_status, write_chunk
+
+
+# Resumable attachment uploads. A client opens a session, PUTs the file in
+# chunks with a Content-Range header, and after a dropped connection GETs
+# the session to learn the offset to continue from.
+
+
+@api_project_user_required
+@require_POST
+def upload_start(request):
+    """
+    Open an upload session.
+
+    Body: ``{"indicator_value_id", "filename", "size", "sha256"}``.
+    """
+    try:
+        payload = json.loads(request.body)
+        value_id = int(payload['indicator_value_id'])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected a JSON object with an integer "indicator_value_id".'}, status=400)
+
+    value = IndicatorValue.objects.visible_to(request.user).filter(pk=value_id).first()
+    if value is None:
+        return JsonResponse({'error': 'Indicator value not found.'}, status=404)
+
+    try:
+        session = start_upload(request.user, value, payload.get('filename'), payload.get('size'), payload.get('sha256'))
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse(upload_status(session), status=201)
+
+
+@api_project_user_required
+@require_http_methods(['GET', 'PUT', 'DELETE'])
+def upload_detail(request, upload_id):
+    """GET the session's offset, PUT the next chunk, or DELETE to cancel"""
+    session = UploadSession.objects.filter(pk=upload_id, user=request.user).select_related('indicator_value').first()
+    if session is None:
+        return JsonResponse({'error': 'Upload not found.'}, status=404)
+
+    if request.method == 'DELETE':
+        upload_id = str(session.pk)
+        session.delete()
+        return JsonResponse({'id': upload_id, 'status': 'cancelled'})
+
+    if request.method == 'PUT':
+        try:
+            first, length, total = parse_content_range(request.headers.get('Content-Range'))
+            write_chunk(session, request, first, length, total)
+        except UploadError as e:
+            return JsonResponse({**upload_status(session), 'error': str(e)}, status=e.status)
+
+    response = upload_status(session)
+    if session.status == 'complete':
+        response['attachment'] = session.indicator_value.attachment.url
+    return JsonResponse(response)
@@ -0,0 +1,218 @@
+import os
+import re
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import IndicatorValue, UploadSession
+from .storage import file_sha256
+
+
+UPLOAD_MAX_SIZE = 1024 * 1024 * 1024
+UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_BLOCK_SIZE = 64 * 1024
+# Parts are assembled inside MEDIA_ROOT so the finished file can be
+# renamed into place instead of copied
+UPLOAD_PARTIAL_DIR = 'uploads/partial'
+ATTACHMENT_DIR = 'indicator_attachments'
+# Open sessions untouched for this long are discarded by clear_stale_uploads
+UPLOAD_SESSION_TTL = timedelta(days=7)
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    """A chunk or session request that cannot be applied; ``status`` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def partial_path(session_id):
+    return default_storage.path(f'{UPLOAD_PARTIAL_DIR}/{session_id}.part')
+
+
+def start_upload(user, value, filename, size, sha256):
+    """Open an upload session for an attachment of ``value`` and create its empty part file"""
+    filename = get_valid_filename(os.path.basename(filename or ''))
+    if not filename:
+        raise UploadError('filename is required.')
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError('size must be a positive integer.')
+    if size > UPLOAD_MAX_SIZE:
+        raise UploadError(f'Files may be at most {UPLOAD_MAX_SIZE} bytes.', status=413)
+    sha256 = (sha256 or '').lower()
+    if not SHA256_RE.match(sha256):
+        raise UploadError('sha256 must be a 64 character hex digest.')
+
+    session = UploadSession.objects.create(
+        user=user, indicator_value=value, filename=filename, size=size, sha256=sha256,
+    )
+    path = partial_path(session.pk)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return session
+
+
+def parse_content_range(header):
+    """``bytes first-last/total`` as ``(first, length, total)``; raises UploadError"""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise UploadError('A "Content-Range: bytes first-last/total" header is required.')
+    first, last, total = (int(group) for group in match.groups())
+    if last < first:
+        raise UploadError('Invalid Content-Range.')
+    return first, last - first + 1, total
+
+
+def write_chunk(session, stream, first, length, total):
+    """
+    Append one chunk read from ``stream`` to the session's part file.
+
+    Chunks must arrive in order: ``first`` has to equal the number of bytes
+    already received, otherwise a 409 carries the offset to resume from.
+    Whatever part of the chunk arrives before a dropped connection is kept,
+    so the client only re-sends from the new offset. (Under ASGI the server
+    reads the whole request body before the view runs, so a dropped chunk
+    never gets here and is re-sent whole.) The offset is advanced
+    with a conditional UPDATE, so of two racing requests for the same range
+    only one is counted. The file is verified and attached as soon as the
+    last byte is in.
+    """
+    if session.status != 'open':
+        raise UploadError(f'Upload is {session.status}.', status=409)
+    if total != session.size:
+        raise UploadError(f'Total size does not match the declared {session.size} bytes.')
+    if first != session.received:
+        raise UploadError(f'Expected a chunk starting at byte {session.received}.', status=409)
+    if length > UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError(f'Chunks may be at most {UPLOAD_MAX_CHUNK_SIZE} bytes.', status=413)
+    if first + length > session.size:
+        raise UploadError('Chunk extends past the declared size.')
+
+    written = 0
+    with open(partial_path(session.pk), 'r+b') as part:
+        part.seek(first)
+        while written < length:
+            block = stream.read(min(UPLOAD_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            part.write(block)
+            written += len(block)
+        part.flush()
+        os.fsync(part.fileno())
+
+    advanced = UploadSession.objects.filter(pk=session.pk, status='open', received=first).update(
+        received=first + written, updated_at=timezone.now(),
+    )
+    if not advanced:
+        session.refresh_from_db()
+        raise UploadError(f'Expected a chunk starting at byte {session.received}.', status=409)
+    session.received = first + written
+
+    if written < length:
+        raise UploadError(f'Chunk ended early; resume from byte {session.received}.')
+    if session.received == session.size:
+        finish_upload(session)
+    return session
+
+
+def finish_upload(session):
+    """
+    Verify the assembled file and attach it to the session's value.
+
+    The attachment name is reserved with an empty placeholder, so sessions
+    finishing with the same filename cannot pick the same name. The part
+    file is renamed over the placeholder, so the data is not copied a second
+    time, once the value and the session are saved: if saving fails, the
+    placeholder is removed and the part file is left for the session. The
+    attachment it replaces is deleted on commit. On a checksum mismatch the
+    part is dropped and the session fails; the client has to start a new
+    one.
+    """
+    path = partial_path(session.pk)
+    if file_sha256(path) != session.sha256:
+        os.remove(path)
+        UploadSession.objects.filter(pk=session.pk).update(
+            status='failed', error='Checksum mismatch', updated_at=timezone.now(),
+        )
+        session.status, session.error = 'failed', 'Checksum mismatch'
+        raise UploadError('Checksum mismatch; the upload was discarded.', status=422)
+
+    name = _reserve_name(f'{ATTACHMENT_DIR}/{session.filename}')
+    try:
+        with transaction.atomic():
+            value = IndicatorValue.objects.select_for_update().get(pk=session.indicator_value_id)
+            previous = value.attachment.name
+            value.attachment.name = name
+            value.save(update_fields=['attachment', 'updated_at'])
+            UploadSession.objects.filter(pk=session.pk).update(status='complete', updated_at=timezone.now())
+            transaction.on_commit(lambda: _move_into_place(path, name))
+            if previous:
+                transaction.on_commit(lambda: _delete_attachment(previous))
+    except Exception:
+        _delete_attachment(name)
+        raise
+    session.indicator_value = value
+    session.status = 'complete'
+
+
+def _reserve_name(name):
+    """Create an empty file under a free name derived from ``name`` and return that name"""
+    while True:
+        name = default_storage.get_available_name(name)
+        target = default_storage.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            open(target, 'x').close()
+        except FileExistsError:
+            # Taken since get_available_name looked; try the next free name
+            continue
+        return name
+
+
+def _move_into_place(path, name):
+    os.replace(path, default_storage.path(name))
+    deduplicate = getattr(default_storage, 'deduplicate', None)
+    if deduplicate is not None:
+        deduplicate(name)
+
+
+def _delete_attachment(name):
+    try:
+        default_storage.delete(name)
+    except OSError:
+        pass
+
+
+def remove_partial_file(session_id):
+    try:
+        os.remove(partial_path(session_id))
+    except FileNotFoundError:
+        pass
+
+
+def clear_stale_uploads():
+    """
+    Discard open sessions nobody has resumed within UPLOAD_SESSION_TTL.
+    Their part files are removed by the post_delete signal.
+    """
+    cutoff = timezone.now() - UPLOAD_SESSION_TTL
+    deleted, _ = UploadSession.objects.filter(status='open', updated_at__lt=cutoff).delete()
+    return deleted
+
+
+def upload_status(session):
+    return {
+        'id': str(session.pk),
+        'status': session.status,
+        'offset': session.received,
+        'size': session.size,
+        'chunk_size': UPLOAD_MAX_CHUNK_SIZE,
+        'error': session.error or None,
+    }
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views, user_views, auth_views, admin_views, user_crud_views
+from . import views, user_views, auth_views, admin_views, user_crud_views, widget_views, sync_views, upload_views
 
 app_name = 'dashboard'
 
@@ -10,11 +10,14 @@ urlpatterns = [
     path('projects/<int:project_id>/', views.project_detail, name='project_detail'),
     path('indicators/', views.indicator_list, name='indicator_list'),
     path('indicators/<int:indicator_id>/', views.indicator_detail, name='indicator_detail'),
+    path('indicators/<int:indicator_id>/series/', views.indicator_series, name='indicator_series'),
     
     # Data entry views (for project users)
     path('data-entry/', views.data_entry_home, name='data_entry_home'),
     path('data-entry/project/<int:project_id>/', views.data_entry_form, name='data_entry_form'),
     path('data-entry/submit/', views.submit_data, name='submit_data'),
+    path('data-entry/import/', views.import_values, name='import_values'),
+    path('data-entry/import/<int:job_id>/errors/', views.import_error_report, name='import_error_report'),
     
     # User management views
     path('profile/', user_views.profile_view, name='profile_view'),
@@ -27,10 +30,13 @@ urlpatterns = [
     # Admin data review views (read-only)
     path('admin/submitted-data/', admin_views.submitted_data_list, name='submitted_data_list'),
     path('admin/submitted-data/<int:value_id>/', admin_views.submitted_data_view, name='submitted_data_view'),
+    path('admin/submitted-data/<int:value_id>/review-flag/', admin_views.review_outlier_flag, name='review_outlier_flag'),
     path('admin/analytics/', admin_views.data_analytics, name='data_analytics'),
+    path('admin/analytics/pivot/', admin_views.cube_pivot, name='cube_pivot'),
     
     # Admin AJAX endpoints for data review
     path('admin/api/submission/<int:value_id>/', admin_views.get_submission_details, name='get_submission_details'),
+    path('admin/api/changes/', admin_views.change_feed, name='change_feed'),
     
     # User CRUD operations (project users can manage everything)
     # Cluster management
@@ -55,6 +61,24 @@ urlpatterns = [
     path('api/toggle-status/<str:model_name>/<int:object_id>/', user_crud_views.toggle_user_object_status, name='toggle_user_object_status'),
     path('api/project/<int:project_id>/indicators/', user_crud_views.get_user_project_indicators, name='get_user_project_indicators'),
     
+    # Dashboard widgets (loaded in parallel by the dashboard pages)
+    path('api/widgets/totals/', widget_views.widget_totals, name='widget_totals'),
+    path('api/widgets/submission-counts/', widget_views.widget_submission_counts, name='widget_submission_counts'),
+    path('api/widgets/recent-values/<str:layout>/', widget_views.widget_recent_values, name='widget_recent_values'),
+    path('api/widgets/my-submissions/', widget_views.widget_my_submissions, name='widget_my_submissions'),
+    path('api/widgets/my-projects/', widget_views.widget_my_projects, name='widget_my_projects'),
+
+    # Offline sync API
+    path('api/sync/push/', sync_views.sync_push, name='sync_push'),
+    path('api/sync/changes/', sync_views.sync_changes, name='sync_changes'),
+
+    # Resumable attachment uploads
+    path('api/uploads/', upload_views.upload_start, name='upload_start'),
+    path('api/uploads/<uuid:upload_id>/', upload_views.upload_detail, name='upload_detail'),
+
+    # Background jobs
+    path('api/jobs/<int:job_id>/', views.job_status_api, name='job_status'),
+    
     # User management (admin only)
     path('admin/users/', user_views.user_list, name='user_list'),
     path('admin/users/create/', user_views.user_create, name='user_create'),
@@ -79,5 +103,10 @@ urlpatterns = [
     # Reporting views
     path('reports/', views.reports_home, name='reports_home'),
     path('reports/generate/', views.generate_report, name='generate_report'),
+    path('reports/progress/', views.progress_report, name='progress_report'),
+    path('reports/crosstab/', views.crosstab_report, name='crosstab_report'),
+    path('reports/comparison/', views.comparison_report, name='comparison_report'),
+    path('reports/budget/', views.budget_report, name='budget_report'),
     path('reports/export/<str:format>/', views.export_report, name='export_report'),
+    path('api/reports/cache-stats/', views.report_cache_stats_api, name='report_cache_stats'),
 ]
@@ -10,6 +10,9 @@ from django.utils import timezone
 from .models import Cluster, Project, Indicator, IndicatorValue, UserProfile
 from .forms import ClusterForm, ProjectForm, IndicatorForm, IndicatorValueForm
 from .decorators import project_user_required
+from .deletion import schedule_cluster_deletion, schedule_project_deletion
+from .health import filter_projects_by_health
+from .series import attach_sparklines
 
 
 # Cluster Management for Project Users
@@ -17,7 +20,7 @@ from .decorators import project_user_required
 def user_cluster_list(request):
     """List clusters created by current user only"""
     search_query = request.GET.get('search', '')
-    clusters = Cluster.objects.filter(created_by=request.user)
+    clusters = Cluster.objects.visible_to(request.user).select_related('deletion_job')
     
     if search_query:
         clusters = clusters.filter(
@@ -64,7 +67,7 @@ def user_cluster_create(request):
 @project_user_required
 def user_cluster_edit(request, cluster_id):
     """Edit existing cluster - Project users can only edit their own clusters"""
-    cluster = get_object_or_404(Cluster, id=cluster_id, created_by=request.user)
+    cluster = get_object_or_404(Cluster.objects.visible_to(request.user), id=cluster_id, deletion_job__isnull=True)
     
     if request.method == 'POST':
         form = ClusterForm(request.POST, instance=cluster)
@@ -87,12 +90,14 @@ def user_cluster_edit(request, cluster_id):
 @project_user_required
 def user_cluster_delete(request, cluster_id):
     """Delete cluster - Project users can only delete their own clusters"""
-    cluster = get_object_or_404(Cluster, id=cluster_id, created_by=request.user)
+    cluster = get_object_or_404(Cluster.objects.visible_to(request.user), id=cluster_id)
     
     if request.method == 'POST':
-        cluster_name = cluster.name
-        cluster.delete()
-        messages.success(request, f'Cluster "{cluster_name}" has been deleted.')
+        if cluster.deletion_job_id:
+            messages.info(request, f'Cluster "{cluster.name}" is already being deleted.')
+        else:
+            schedule_cluster_deletion(cluster, request.user)
+            messages.success(request, f'Cluster "{cluster.name}" is being deleted in the background.')
         return redirect('dashboard:user_cluster_list')
     
     context = {
@@ -108,7 +113,7 @@ def user_cluster_delete(request, cluster_id):
 def user_project_list(request):
     """List projects created by current user only"""
     search_query = request.GET.get('search', '')
-    projects = Project.objects.filter(created_by=request.user).select_related('cluster')
+    projects = Project.objects.visible_to(request.user).select_related('cluster', 'deletion_job')
     
     if search_query:
         projects = projects.filter(
@@ -117,6 +122,8 @@ def user_project_list(request):
             Q(description__icontains=search_query)
         )
     
+    projects, health_filter, sort = filter_projects_by_health(projects, request.GET)
+    
     paginator = Paginator(projects, 20)
     page_number = request.GET.get('page')
     projects = paginator.get_page(page_number)
@@ -125,6 +132,8 @@ def user_project_list(request):
         'title': 'My Projects',
         'projects': projects,
         'search_query': search_query,
+        'health_filter': health_filter,
+        'sort': sort,
     }
     
     return render(request, 'dashboard/user/project_list.html', context)
@@ -157,7 +166,7 @@ def user_project_create(request):
 @project_user_required
 def user_project_edit(request, project_id):
     """Edit existing project - Project users can only edit their own projects"""
-    project = get_object_or_404(Project, id=project_id, created_by=request.user)
+    project = get_object_or_404(Project.objects.visible_to(request.user), id=project_id, deletion_job__isnull=True)
     
     if request.method == 'POST':
         form = ProjectForm(request.POST, instance=project)
@@ -180,12 +189,14 @@ def user_project_edit(request, project_id):
 @project_user_required
 def user_project_delete(request, project_id):
     """Delete project - Project users can only delete their own projects"""
-    project = get_object_or_404(Project, id=project_id, created_by=request.user)
+    project = get_object_or_404(Project.objects.visible_to(request.user), id=project_id)
     
     if request.method == 'POST':
-        project_name = project.name
-        project.delete()
-        messages.success(request, f'Project "{project_name}" has been deleted.')
+        if project.deletion_job_id:
+            messages.info(request, f'Project "{project.name}" is already being deleted.')
+        else:
+            schedule_project_deletion(project, request.user)
+            messages.success(request, f'Project "{project.name}" is being deleted in the background.')
         return redirect('dashboard:user_project_list')
     
     context = {
@@ -200,11 +211,12 @@ def user_project_delete(request, project_id):
 @project_user_required
 def user_indicator_list(request):
     """List indicators created by current user only"""
-    indicators = Indicator.objects.filter(created_by=request.user).order_by('name')
+    indicators = Indicator.objects.visible_to(request.user).order_by('name')
     
     paginator = Paginator(indicators, 20)
     page_number = request.GET.get('page')
     indicators = paginator.get_page(page_number)
+    attach_sparklines(indicators, request.user)
     
     context = {
         'title': 'My Indicators',
@@ -239,7 +251,7 @@ def user_indicator_create(request):
 @project_user_required
 def user_indicator_edit(request, indicator_id):
     """Edit existing indicator - Project users can only edit their own indicators"""
-    indicator = get_object_or_404(Indicator, id=indicator_id, created_by=request.user)
+    indicator = get_object_or_404(Indicator.objects.visible_to(request.user), id=indicator_id)
     
     if request.method == 'POST':
         form = IndicatorForm(request.POST, instance=indicator)
@@ -262,7 +274,7 @@ def user_indicator_edit(request, indicator_id):
 @project_user_required
 def user_indicator_delete(request, indicator_id):
     """Delete indicator - Project users can only delete their own indicators"""
-    indicator = get_object_or_404(Indicator, id=indicator_id, created_by=request.user)
+    indicator = get_object_or_404(Indicator.objects.visible_to(request.user), id=indicator_id)
     
     if request.method == 'POST':
         indicator_name = indicator.name
@@ -293,7 +305,9 @@ def toggle_user_object_status(request, model_name, object_id):
         return JsonResponse({'error': 'Invalid model'}, status=400)
     
     model_class = model_map[model_name]
-    obj = get_object_or_404(model_class, id=object_id)
+    obj = get_object_or_404(model_class.objects.visible_to(request.user), id=object_id)
+    if getattr(obj, 'deletion_job_id', None):
+        return JsonResponse({'error': f'{model_name.title()} is being deleted'}, status=409)
     
     obj.is_active = not obj.is_active
     obj.save()
@@ -308,7 +322,7 @@ def toggle_user_object_status(request, model_name, object_id):
 @project_user_required
 def get_user_project_indicators(request, project_id):
     """Get indicators for a specific project (AJAX) - Project users can access this"""
-    project = get_object_or_404(Project, id=project_id)
+    project = get_object_or_404(Project.objects.visible_to(request.user), id=project_id)
     indicators = project.indicators.filter(is_active=True)
     
     data = [{
@@ -1,20 +1,37 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.models import User
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
+from django.core.files.storage import default_storage
 from django.core.paginator import Paginator
-from django.db.models import Count, Sum, Avg, Q
-from django.db import models
-from django.utils import timezone
-from datetime import datetime, timedelta
+from django.db.models import Q
 import csv
-import json
-
-from .models import Cluster, Project, Indicator, IndicatorValue, UserProfile
-from .decorators import admin_required, project_user_required, project_access_required, indicator_access_required
+import os
+import tempfile
+import uuid
+
+from .models import Cluster, Project, Indicator, IndicatorValue, UserProfile, Job
+from .decorators import (
+    api_admin_required, project_user_required, project_access_required, indicator_access_required,
+)
 from .forms import ProjectUserIndicatorEntryForm
+from .exports import stream_arrow, stream_report_zip, write_xlsx
+from .health import filter_projects_by_health
+from .progress import compute_progress
+from .series import SERIES_DEFAULT_WIDTH, SERIES_MAX_WIDTH, SERIES_MIN_WIDTH, attach_sparklines, get_series
+from .importers import IMPORT_COLUMNS
+from .jobs import enqueue, job_status
+from .tasks import import_error_report_path
+from .conditional import conditional_page
+from .async_utils import aget_user_profile, stream_response
+from .report_cache import aget_cached_report, aset_cached_report, get_cached_report, set_cached_report, report_cache_stats
+from .reports import (
+    COMPARISON_COLUMNS, REPORT_COLUMNS, REPORT_MAX_PAGE_SIZE, REPORT_PAGE_SIZE,
+    budget_efficiency, build_crosstab, filter_report_values, parse_crosstab_options, parse_report_filters,
+    period_comparison, report_rows_page, with_total,
+)
 
 
 def home(request):
@@ -41,75 +58,34 @@ def dashboard_home(request):
         # Create profile if it doesn't exist
         profile = UserProfile.objects.create(user=user, role='project_user')
     
-    # Get basic statistics based on user role
-    if profile.is_admin:
-        # Admin dashboard - show data review focused stats
-        total_projects = Project.objects.filter(is_active=True).count()
-        total_indicators = Indicator.objects.filter(is_active=True).count()
-        total_submissions = IndicatorValue.objects.count()
-        
-        # Get recent indicator values
-        recent_values = IndicatorValue.objects.select_related(
-            'indicator', 'project', 'reported_by'
-        ).order_by('-created_at')[:10]
-        
-        context = {
-            'title': 'Admin Dashboard - Data Review',
-            'total_projects': total_projects,
-            'total_indicators': total_indicators,
-            'total_submissions': total_submissions,
-            'recent_values': recent_values,
-            'is_admin': True,
-        }
-        
-    else:
-        # Project user dashboard - show only their own projects and data
-        user_projects = Project.objects.filter(
-            created_by=user,
-            is_active=True
-        ).distinct()
-        
-        total_user_projects = user_projects.count()
-        
-        # Get indicators created by this user
-        user_indicators = Indicator.objects.filter(
-            created_by=user,
-            is_active=True
-        ).distinct()
-        
-        total_indicators = user_indicators.count()
-        
-        # Get recent submissions by this user
-        recent_submissions = IndicatorValue.objects.filter(
-            reported_by=user
-        ).select_related('indicator', 'project').order_by('-created_at')[:10]
-        
-        context = {
-            'title': 'My Dashboard',
-            'total_projects': total_user_projects,
-            'total_indicators': total_indicators,
-            'assigned_projects': user_projects,
-            'recent_submissions': recent_submissions,
-            'is_admin': False,
-        }
+    # Counts and recent activity are served by the widget endpoints in
+    # widget_views so the page shell renders without waiting on them.
+    context = {
+        'title': 'Admin Dashboard - Data Review' if profile.is_admin else 'My Dashboard',
+        'is_admin': profile.is_admin,
+    }
     
     return render(request, 'dashboard/dashboard_home.html', context)
 
 
+def _project_list_scope(request):
+    """Querysets the project list page is rendered from"""
+    projects = Project.objects.visible_to(request.user).filter(is_active=True)
+    return [
+        projects,
+        Indicator.objects.filter(projects__in=projects),
+        Cluster.objects.filter(projects__in=projects),
+    ]
+
+
 @login_required
+@conditional_page(_project_list_scope)
 def project_list(request):
     """List projects (filtered by user role)"""
     user = request.user
     
-    if user.profile.is_admin:
-        # Admins can see all projects for review
-        projects = Project.objects.filter(is_active=True).select_related('cluster')
-    else:
-        # Project users can only see their own projects
-        projects = Project.objects.filter(
-            created_by=user,
-            is_active=True
-        ).select_related('cluster')
+    # Admins see all projects for review, project users their own
+    projects = Project.objects.visible_to(user).filter(is_active=True).select_related('cluster')
     
     # Add search functionality
     search_query = request.GET.get('search', '')
@@ -120,6 +96,8 @@ def project_list(request):
             Q(description__icontains=search_query)
         )
     
+    projects, health_filter, sort = filter_projects_by_health(projects, request.GET)
+    
     # Add pagination
     paginator = Paginator(projects, 20)
     page_number = request.GET.get('page')
@@ -129,25 +107,29 @@ def project_list(request):
         'title': 'My Projects' if not user.profile.is_admin else 'All Projects',
         'projects': projects,
         'search_query': search_query,
+        'health_filter': health_filter,
+        'sort': sort,
     }
     
     return render(request, 'dashboard/project_list.html', context)
 
 
+def _project_detail_scope(request, project_id):
+    """Querysets the project detail page is rendered from"""
+    user = request.user
+    return [
+        Project.objects.visible_to(user).filter(id=project_id),
+        Cluster.objects.filter(projects__in=Project.objects.visible_to(user).filter(id=project_id)),
+        Indicator.objects.filter(projects__in=Project.objects.visible_to(user).filter(id=project_id)),
+        IndicatorValue.objects.visible_to(user).filter(project_id=project_id),
+    ]
+
+
 @project_access_required
+@conditional_page(_project_detail_scope)
 def project_detail(request, project_id):
     """Project detail view"""
-    user = request.user
-    
-    if user.profile.is_admin:
-        project = get_object_or_404(Project, id=project_id, is_active=True)
-    else:
-        project = get_object_or_404(
-            Project,
-            id=project_id,
-            assigned_users=user,
-            is_active=True
-        )
+    project = get_object_or_404(Project.objects.visible_to(request.user), id=project_id, is_active=True)
     
     # Get indicators for this project
     indicators = project.indicators.filter(is_active=True)
@@ -156,6 +138,12 @@ def project_detail(request, project_id):
     recent_values = IndicatorValue.objects.filter(
         project=project
     ).select_related('indicator', 'reported_by').order_by('-created_at')[:20]
+
+    # Cumulative progress toward each indicator's target
+    progress = compute_progress(IndicatorValue.objects.visible_to(request.user).filter(project=project))
+    indicators = list(indicators)
+    for indicator in indicators:
+        indicator.progress = progress.get((indicator.id, project.id))
     
     context = {
         'title': f'Project: {project.name}',
@@ -172,10 +160,7 @@ def data_entry_home(request):
     """Data entry home for project users"""
     
     # Get user's own projects
-    user_projects = Project.objects.filter(
-        created_by=request.user,
-        is_active=True
-    ).select_related('cluster')
+    user_projects = Project.objects.visible_to(request.user).filter(is_active=True).select_related('cluster')
     
     # Calculate statistics
     total_indicators = 0
@@ -183,7 +168,7 @@ def data_entry_home(request):
         total_indicators += project.indicators.filter(is_active=True).count()
     
     # Get recent submissions
-    recent_submissions = IndicatorValue.objects.filter(
+    recent_submissions = IndicatorValue.objects.visible_to(request.user).filter(
         reported_by=request.user
     ).select_related('indicator', 'project').order_by('-created_at')[:10]
     
@@ -205,12 +190,7 @@ def data_entry_form(request, project_id):
         return redirect('dashboard:dashboard_home')
     
     # Verify user owns this project
-    project = get_object_or_404(
-        Project,
-        id=project_id,
-        created_by=request.user,
-        is_active=True
-    )
+    project = get_object_or_404(Project.objects.visible_to(request.user), id=project_id, is_active=True)
     
     # Get indicators for this project
     indicators = project.indicators.filter(is_active=True)
@@ -240,10 +220,9 @@ def submit_data(request):
             return redirect('dashboard:data_entry_home')
         
         try:
-            project = get_object_or_404(Project, id=project_id, is_active=True)
-            
-            # Verify user owns this project (only for project users)
-            if project.created_by != request.user:
+            # Only the user's own projects are found
+            project = Project.objects.visible_to(request.user).filter(id=project_id, is_active=True).first()
+            if project is None:
                 messages.error(request, 'You can only submit data for your own projects.')
                 return redirect('dashboard:data_entry_home')
             
@@ -321,6 +300,64 @@ def submit_data(request):
     return redirect('dashboard:data_entry_home')
 
 
+@project_user_required
+def import_values(request):
+    """Bulk import of indicator values from CSV/XLSX - PROJECT USERS ONLY"""
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, 'Please choose a CSV or Excel file to import.')
+            return redirect('dashboard:import_values')
+
+        extension = os.path.splitext(upload.name)[1].lower()
+        if extension not in ('.csv', '.xlsx', '.xlsm'):
+            messages.error(request, 'Unsupported file type. Upload a .csv or .xlsx file.')
+            return redirect('dashboard:import_values')
+
+        # The import runs on the background worker; the page polls the job
+        path = default_storage.save(f'imports/uploads/{uuid.uuid4().hex}{extension}', upload)
+        job = enqueue('import_indicator_values', {
+            'path': path,
+            'filename': upload.name,
+            'user_id': request.user.pk,
+        }, user=request.user, priority=10)
+        return redirect(f"{reverse('dashboard:import_values')}?job={job.pk}")
+
+    context = {
+        'title': 'Import Indicator Values',
+        'columns': IMPORT_COLUMNS,
+    }
+    job_id = request.GET.get('job')
+    if job_id and job_id.isdigit():
+        context['job'] = get_object_or_404(Job, pk=job_id, created_by=request.user, name='import_indicator_values')
+
+    return render(request, 'dashboard/data_import.html', context)
+
+
+@project_user_required
+def import_error_report(request, job_id):
+    """Download the per-row error report of an import"""
+    job = get_object_or_404(Job, pk=job_id, created_by=request.user, name='import_indicator_values')
+    path = import_error_report_path(job.pk)
+    if not default_storage.exists(path):
+        messages.warning(request, 'No error report is available for this import.')
+        return redirect('dashboard:import_values')
+
+    response = FileResponse(default_storage.open(path, 'rb'), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="import_errors.csv"'
+    return stream_response(request, response)
+
+
+@login_required
+def job_status_api(request, job_id):
+    """Progress of a background job started by the current user (JSON)"""
+    jobs = Job.objects.all()
+    if not request.user.profile.is_admin:
+        jobs = jobs.filter(created_by=request.user)
+    job = get_object_or_404(jobs, pk=job_id)
+    return JsonResponse(job_status(job))
+
+
 @login_required
 def reports_home(request):
     """Reports home page"""
@@ -330,50 +367,213 @@ def reports_home(request):
     
     context = {
         'title': 'Reports',
-        'clusters': Cluster.objects.filter(is_active=True),
-        'projects': Project.objects.filter(is_active=True),
-        'indicators': Indicator.objects.filter(is_active=True),
+        'clusters': Cluster.objects.visible_to(request.user).filter(is_active=True),
+        'projects': Project.objects.visible_to(request.user).filter(is_active=True),
+        'indicators': Indicator.objects.visible_to(request.user).filter(is_active=True),
     }
     
     return render(request, 'dashboard/reports_home.html', context)
 
 
 @login_required
-def generate_report(request):
-    """Generate reports based on filters"""
-    if not request.user.profile.is_admin:
+async def generate_report(request):
+    """
+    Generate reports based on filters.
+
+    ``format=json`` returns a compact columnar page (``columns`` once, then
+    ``rows`` as arrays) addressed by ``offset``/``limit`` so the client can load
+    more rows on scroll. Without it, the first 1,000 rows are rendered with the
+    ``report_rows`` partial. Both carry the true total from a windowed count.
+    """
+    profile = await aget_user_profile(request)
+    if profile is None or not profile.is_admin:
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
-    project_id = request.GET.get('project_id')
-    indicator_id = request.GET.get('indicator_id')
-    start_date_str = request.GET.get('start_date')
-    end_date_str = request.GET.get('end_date')
+    try:
+        filters = parse_report_filters(request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid filters. Use numeric ids and YYYY-MM-DD dates.'}, status=400)
 
-    values = IndicatorValue.objects.select_related('project', 'indicator', 'reported_by').all()
+    if request.GET.get('format') == 'json':
+        try:
+            offset = max(int(request.GET.get('offset', 0)), 0)
+            limit = min(max(int(request.GET.get('limit', REPORT_PAGE_SIZE)), 1), REPORT_MAX_PAGE_SIZE)
+        except ValueError:
+            return JsonResponse({'error': 'offset and limit must be integers.'}, status=400)
+
+        page_format = f'json:{offset}:{limit}'
+        page_key, page = await aget_cached_report(filters, page_format)
+        if page is None:
+            page = await report_rows_page(filters, offset, limit)
+            await aset_cached_report(page_key, page)
+        rows, total = page
+        next_offset = offset + len(rows)
+        return JsonResponse({
+            'columns': REPORT_COLUMNS,
+            'rows': rows,
+            'total': total,
+            'offset': offset,
+            'next_offset': next_offset if next_offset < total else None,
+        })
+
+    key, payload = await aget_cached_report(filters, 'html')
+    if payload is None:
+        values = with_total(
+            filter_report_values(filters).select_related('project', 'indicator', 'reported_by')
+        )[:REPORT_MAX_PAGE_SIZE]
+        rows = [value async for value in values]
+
+        html = render_to_string('dashboard/partials/report_rows.html', {
+            'values': rows,
+        })
+        payload = {'html': html, 'count': rows[0].report_total if rows else 0}
+        await aset_cached_report(key, payload)
+
+    return JsonResponse(payload)
+
+
+@api_admin_required
+def report_cache_stats_api(request):
+    """Hit/miss counters of the report result cache (JSON)"""
+    return JsonResponse(report_cache_stats())
+
+
+PROGRESS_COLUMNS = [
+    'project', 'indicator', 'periods', 'latest_period', 'cumulative', 'target',
+    'achievement', 'last_change', 'reached_on', 'projected_date',
+]
+
+
+@api_admin_required
+def progress_report(request):
+    """
+    Cumulative progress toward target for every indicator and project
+    matching the report filters (JSON, rows ordered like PROGRESS_COLUMNS).
+    With a start date, progress is counted from that date on.
+    """
+    try:
+        filters = parse_report_filters(request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid filters. Use numeric ids and YYYY-MM-DD dates.'}, status=400)
+
+    progress = compute_progress(filter_report_values(filters, IndicatorValue.objects.visible_to(request.user)))
+    project_names = dict(Project.objects.filter(id__in={key[1] for key in progress}).values_list('id', 'name'))
+    indicator_names = dict(Indicator.objects.filter(id__in={key[0] for key in progress}).values_list('id', 'name'))
+
+    rows = []
+    for item in progress.values():
+        rows.append([
+            project_names[item.project_id],
+            indicator_names[item.indicator_id],
+            item.periods,
+            item.latest_period.isoformat(),
+            item.cumulative,
+            item.target,
+            None if item.achievement is None else round(item.achievement, 1),
+            item.last_change,
+            item.reached_on.isoformat() if item.reached_on else None,
+            item.projected_date.isoformat() if item.projected_date else None,
+        ])
+    rows.sort(key=lambda row: (row[0], row[1]))
+    return JsonResponse({'columns': PROGRESS_COLUMNS, 'rows': rows})
 
-    if project_id:
-        values = values.filter(project_id=project_id)
-    if indicator_id:
-        values = values.filter(indicator_id=indicator_id)
 
-    # Date filters (inclusive)
+@api_admin_required
+def crosstab_report(request):
+    """
+    Cross-tab of the report values by two dimensions (JSON, or a CSV
+    download with ``format=csv``). Results are cached like the other report
+    formats and evicted when a value they may include changes.
+    """
     try:
-        if start_date_str:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            values = values.filter(reporting_period_start__gte=start_date)
-        if end_date_str:
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-            values = values.filter(reporting_period_end__lte=end_date)
+        filters = parse_report_filters(request.GET)
     except ValueError:
-        return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+        return JsonResponse({'error': 'Invalid filters. Use numeric ids and YYYY-MM-DD dates.'}, status=400)
+    try:
+        options = parse_crosstab_options(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
 
-    values = values.order_by('-created_at')[:1000]
+    cache_format = 'crosstab:' + ':'.join(options)
+    key, crosstab = get_cached_report(filters, cache_format)
+    if crosstab is None:
+        try:
+            crosstab = build_crosstab(filters, options, IndicatorValue.objects.visible_to(request.user))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        set_cached_report(key, crosstab)
+
+    if request.GET.get('format') != 'csv':
+        return JsonResponse(crosstab)
+
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="crosstab.csv"'
+    writer = csv.writer(response)
+    writer.writerow([options.rows.replace('_', ' ').title(), *crosstab['column_labels'], 'Total'])
+    for label, cells, total in crosstab['rows']:
+        writer.writerow([label, *('' if cell is None else cell for cell in cells), '' if total is None else total])
+    return response
+
+
+@api_admin_required
+def comparison_report(request):
+    """
+    Period-over-period changes per indicator and project, biggest movers
+    first (JSON). ``compare=year`` compares with the same period a year
+    earlier; ``all=1`` ranks every period instead of each series' latest.
+    """
+    try:
+        filters = parse_report_filters(request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid filters. Use numeric ids and YYYY-MM-DD dates.'}, status=400)
+    compare = request.GET.get('compare') or 'previous'
+    latest_only = request.GET.get('all') != '1'
+
+    cache_format = f'comparison:{compare}:{int(latest_only)}'
+    key, rows = get_cached_report(filters, cache_format)
+    if rows is None:
+        try:
+            rows = period_comparison(filters, compare, latest_only, IndicatorValue.objects.visible_to(request.user))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        set_cached_report(key, rows)
+    return JsonResponse({'columns': COMPARISON_COLUMNS, 'rows': rows})
+
+
+@api_admin_required
+def budget_report(request):
+    """
+    Budget efficiency per cluster and project status: cost per unit
+    achieved and achievement-weighted spend (JSON). Cached like the other
+    reports; budget edits evict it through the project's change signal.
+    """
+    try:
+        filters = parse_report_filters(request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid filters. Use numeric ids and YYYY-MM-DD dates.'}, status=400)
+
+    key, report = get_cached_report(filters, 'budget')
+    if report is None:
+        report = budget_efficiency(
+            filters,
+            Project.objects.visible_to(request.user).filter(is_active=True),
+            IndicatorValue.objects.visible_to(request.user),
+        )
+        set_cached_report(key, report)
+    return JsonResponse(report)
 
-    html = render_to_string('dashboard/partials/report_rows.html', {
-        'values': values,
-    })
 
-    return JsonResponse({'html': html, 'count': values.count()})
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'pdf': 'application/pdf',
+}
+
+# Large columnar extracts are streamed rather than cached
+STREAMING_EXPORT_TYPES = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+XLSX_SPOOL_SIZE = 10 * 1024 * 1024
 
 
 @login_required
@@ -382,29 +582,52 @@ def export_report(request, format):
     if not request.user.profile.is_admin:
         return HttpResponse('Unauthorized', status=403)
     
-    project_id = request.GET.get('project_id')
-    indicator_id = request.GET.get('indicator_id')
-    start_date_str = request.GET.get('start_date')
-    end_date_str = request.GET.get('end_date')
+    try:
+        filters = parse_report_filters(request.GET)
+    except ValueError:
+        return HttpResponse('Invalid filters. Use numeric ids and YYYY-MM-DD dates.', status=400)
 
-    values = IndicatorValue.objects.select_related('project', 'indicator', 'reported_by').all()
+    if format in EXPORT_CONTENT_TYPES:
+        key, content = get_cached_report(filters, format)
+        if content is not None:
+            response = HttpResponse(content, content_type=EXPORT_CONTENT_TYPES[format])
+            response['Content-Disposition'] = f'attachment; filename="report.{format}"'
+            return response
 
-    if project_id:
-        values = values.filter(project_id=project_id)
-    if indicator_id:
-        values = values.filter(indicator_id=indicator_id)
+    values = filter_report_values(filters).select_related('project', 'indicator', 'reported_by')
 
-    try:
-        if start_date_str:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            values = values.filter(reporting_period_start__gte=start_date)
-        if end_date_str:
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-            values = values.filter(reporting_period_end__lte=end_date)
-    except ValueError:
-        return HttpResponse('Invalid date format. Use YYYY-MM-DD.', status=400)
+    if format in STREAMING_EXPORT_TYPES:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return HttpResponse('Parquet/Arrow export library not installed.', status=500)
+
+        content_type, extension = STREAMING_EXPORT_TYPES[format]
+        response = StreamingHttpResponse(stream_arrow(values, format), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="report.{extension}"'
+        return stream_response(request, response)
 
-    values = values.order_by('-created_at')
+    if format == 'zip':
+        response = StreamingHttpResponse(stream_report_zip(values), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="report.zip"'
+        return stream_response(request, response)
+
+    if format == 'xlsx':
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            return HttpResponse('Excel export library not installed.', status=500)
+
+        # Small workbooks stay in memory, larger ones roll over to disk
+        output = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_SIZE)
+        write_xlsx(values, output)
+        output.seek(0)
+        return stream_response(request, FileResponse(
+            output,
+            as_attachment=True,
+            filename='report.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        ))
 
     if format == 'csv':
         response = HttpResponse(content_type='text/csv')
@@ -424,6 +647,7 @@ def export_report(request, format):
                 v.reported_by.get_full_name() or v.reported_by.username,
                 v.created_at.strftime('%Y-%m-%d %H:%M'),
             ])
+        set_cached_report(key, response.content)
         return response
 
     if format == 'pdf':
@@ -490,6 +714,7 @@ def export_report(request, format):
 
         c.showPage()
         c.save()
+        set_cached_report(key, response.content)
         return response
 
     return HttpResponse('Unsupported export format', status=400)
@@ -498,23 +723,28 @@ def export_report(request, format):
 # Admin can only view data - no CRUD operations allowed
 
 
+def _indicator_list_scope(request):
+    """Querysets the indicator list page is rendered from"""
+    indicators = Indicator.objects.visible_to(request.user).filter(is_active=True)
+    return [
+        indicators,
+        Project.objects.filter(indicators__in=indicators),
+        IndicatorValue.objects.filter(indicator__in=indicators),
+    ]
+
+
 @login_required
+@conditional_page(_indicator_list_scope)
 def indicator_list(request):
     """List indicators"""
-    if request.user.profile.is_admin:
-        # Admins can see all indicators for review
-        indicators = Indicator.objects.filter(is_active=True).order_by('name')
-    else:
-        # Project users can only see their own indicators
-        indicators = Indicator.objects.filter(
-            created_by=request.user,
-            is_active=True
-        ).order_by('name')
+    # Admins see all indicators for review, project users their own
+    indicators = Indicator.objects.visible_to(request.user).filter(is_active=True).order_by('name')
     
     # Add pagination
     paginator = Paginator(indicators, 20)
     page_number = request.GET.get('page')
     indicators = paginator.get_page(page_number)
+    attach_sparklines(indicators, request.user)
     
     context = {
         'title': 'My Indicators' if not request.user.profile.is_admin else 'All Indicators',
@@ -524,30 +754,69 @@ def indicator_list(request):
     return render(request, 'dashboard/indicator_list.html', context)
 
 
+def _indicator_detail_scope(request, indicator_id):
+    """Querysets the indicator detail page is rendered from"""
+    indicators = Indicator.objects.visible_to(request.user).filter(id=indicator_id)
+    return [
+        indicators,
+        Project.objects.filter(indicators__in=indicators),
+        Cluster.objects.filter(projects__indicators__in=indicators),
+        IndicatorValue.objects.filter(indicator__in=indicators),
+    ]
+
+
 @indicator_access_required
+@conditional_page(_indicator_detail_scope)
 def indicator_detail(request, indicator_id):
     """Indicator detail view"""
-    if request.user.profile.is_admin:
-        indicator = get_object_or_404(Indicator, id=indicator_id, is_active=True)
-    else:
-        # Verify user has access to this indicator
-        assigned_projects = Project.objects.filter(assigned_users=request.user)
-        indicator = get_object_or_404(
-            Indicator,
-            id=indicator_id,
-            projects__in=assigned_projects,
-            is_active=True
-        )
+    indicator = get_object_or_404(Indicator.objects.visible_to(request.user), id=indicator_id, is_active=True)
     
-    # Get values for this indicator
+    # Get values for this indicator; the chart loads its own downsampled series
     values = IndicatorValue.objects.filter(
         indicator=indicator
-    ).select_related('project', 'reported_by').order_by('-created_at')
+    ).select_related('project', 'project__cluster', 'reported_by').order_by('-created_at')
+    values = Paginator(values, 20).get_page(request.GET.get('page'))
+
+    # Cumulative progress toward the target in each project
+    progress = compute_progress(IndicatorValue.objects.visible_to(request.user).filter(indicator=indicator))
+    projects = list(indicator.projects.select_related('cluster'))
+    for project in projects:
+        project.progress = progress.get((indicator.id, project.id))
     
     context = {
         'title': f'Indicator: {indicator.name}',
         'indicator': indicator,
+        'projects': projects,
         'values': values,
     }
     
     return render(request, 'dashboard/indicator_detail.html', context)
+
+
+@login_required
+def indicator_series(request, indicator_id):
+    """
+    Chart series of an indicator's values downsampled to ``width`` points,
+    as typed arrays (see ``build_series``). ``projects`` limits the chart to
+    comma-separated project ids and ``by=project`` returns one series per
+    project instead of the total.
+    """
+    unit = Indicator.objects.visible_to(request.user).filter(
+        id=indicator_id, is_active=True
+    ).values_list('measurement_unit', flat=True).first()
+    if unit is None:
+        return JsonResponse({'error': 'Indicator not found.'}, status=404)
+
+    try:
+        width = int(request.GET.get('width', SERIES_DEFAULT_WIDTH))
+        project_ids = {int(pk) for pk in request.GET.get('projects', '').split(',') if pk}
+    except ValueError:
+        return JsonResponse({'error': 'Use an integer width and comma-separated project ids.'}, status=400)
+    width = min(max(width, SERIES_MIN_WIDTH), SERIES_MAX_WIDTH)
+    by_project = request.GET.get('by') == 'project'
+
+    values = IndicatorValue.objects.visible_to(request.user).filter(indicator_id=indicator_id)
+    if project_ids:
+        values = values.filter(project_id__in=project_ids)
+    series = get_series(values, indicator_id, unit, width, by_project)
+    return JsonResponse({'indicator': indicator_id, 'unit': unit, 'width': width, **series})
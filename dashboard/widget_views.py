@@ -0,0 +1,142 @@
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.vary import vary_on_cookie
+
+from .models import Project, Indicator, IndicatorValue
+from .decorators import api_admin_required, api_project_user_required
+from .async_utils import aget_user_profile, run_concurrently
+
+
+# Dashboard widgets are loaded in parallel by the page shell (see
+# initializeWidgets in static/js/main.js). Each one is cached on its own,
+# both server side and in the browser.
+WIDGET_CACHE_SECONDS = 60
+
+RECENT_VALUE_LAYOUTS = {
+    'cards': 'dashboard/partials/widgets/recent_values_cards.html',
+    'table': 'dashboard/partials/widgets/recent_values_table.html',
+}
+
+
+def widget_cache(view_func):
+    """Mark a widget response as privately cacheable by the browser"""
+    return vary_on_cookie(cache_control(private=True, max_age=WIDGET_CACHE_SECONDS)(view_func))
+
+
+def _widget_scope(user, profile):
+    """Cache namespace for the data the current user is allowed to see"""
+    if profile.is_admin:
+        return 'admin'
+    return f'user:{user.pk}'
+
+
+def _cached(request, name, build):
+    key = f'dashboard:widget:{name}:{_widget_scope(request.user, request.user.profile)}'
+    return cache.get_or_set(key, build, WIDGET_CACHE_SECONDS)
+
+
+async def _acached(request, name, build):
+    """Async variant of _cached for widgets built from concurrent aggregates"""
+    user = await request.auser()
+    profile = await aget_user_profile(request)
+    key = f'dashboard:widget:{name}:{_widget_scope(user, profile)}'
+    payload = await cache.aget(key)
+    if payload is None:
+        payload = await build(user, profile)
+        await cache.aset(key, payload, WIDGET_CACHE_SECONDS)
+    return payload
+
+
+@login_required
+@widget_cache
+async def widget_totals(request):
+    """Project, indicator and submission totals (JSON)"""
+    async def build(user, profile):
+        projects = Project.objects.visible_to(user).filter(is_active=True)
+        indicators = Indicator.objects.visible_to(user).filter(is_active=True)
+        values = IndicatorValue.objects.visible_to(user)
+        if not profile.is_admin:
+            values = values.filter(reported_by=user)
+
+        total_projects, total_indicators, total_submissions = await run_concurrently(
+            projects.count, indicators.count, values.count
+        )
+        return {
+            'total_projects': total_projects,
+            'total_indicators': total_indicators,
+            'total_submissions': total_submissions,
+            # The recent activity lists show at most 10 entries
+            'recent_submissions': min(total_submissions, 10),
+        }
+
+    return JsonResponse(await _acached(request, 'totals', build))
+
+
+@login_required
+@widget_cache
+async def widget_submission_counts(request):
+    """Submissions this month and this year (JSON)"""
+    async def build(user, profile):
+        now = timezone.now()
+        values = IndicatorValue.objects.visible_to(user)
+        if not profile.is_admin:
+            values = values.filter(reported_by=user)
+
+        this_month, this_year = await run_concurrently(
+            values.filter(created_at__month=now.month, created_at__year=now.year).count,
+            values.filter(created_at__year=now.year).count,
+        )
+        return {
+            'submissions_this_month': this_month,
+            'submissions_this_year': this_year,
+        }
+
+    return JsonResponse(await _acached(request, 'submission_counts', build))
+
+
+@api_admin_required
+@widget_cache
+def widget_recent_values(request, layout):
+    """Latest submissions across all projects (HTML partial)"""
+    if layout not in RECENT_VALUE_LAYOUTS:
+        return JsonResponse({'error': 'Unknown layout'}, status=404)
+
+    def build():
+        recent_values = IndicatorValue.objects.visible_to(request.user).select_related(
+            'indicator', 'project', 'reported_by'
+        ).order_by('-created_at')[:10]
+        return render_to_string(RECENT_VALUE_LAYOUTS[layout], {'recent_values': recent_values})
+
+    return HttpResponse(_cached(request, f'recent_values:{layout}', build))
+
+
+@login_required
+@widget_cache
+def widget_my_submissions(request):
+    """Latest submissions reported by the current user (HTML partial)"""
+    def build():
+        recent_submissions = IndicatorValue.objects.visible_to(request.user).filter(
+            reported_by=request.user
+        ).select_related('indicator', 'project', 'project__cluster').order_by('-created_at')[:10]
+        return render_to_string('dashboard/partials/widgets/my_submissions.html', {
+            'recent_submissions': recent_submissions,
+        })
+
+    return HttpResponse(_cached(request, 'my_submissions', build))
+
+
+@api_project_user_required
+@widget_cache
+def widget_my_projects(request):
+    """Projects owned by the current user (HTML partial)"""
+    def build():
+        projects = Project.objects.visible_to(request.user).filter(is_active=True).select_related('cluster')
+        return render_to_string('dashboard/partials/widgets/my_projects.html', {
+            'assigned_projects': projects,
+        })
+
+    return HttpResponse(_cached(request, 'my_projects', build))
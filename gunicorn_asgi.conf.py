@@ -0,0 +1,20 @@
+"""
+Gunicorn configuration for serving the ASGI application with Uvicorn workers.
+
+    gunicorn me_dashboard.asgi:application -c gunicorn_asgi.conf.py
+
+Async views (reports, analytics, submission details) no longer hold a worker
+while they wait on the database; sync views keep working and run in a
+thread per request.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = 'uvicorn_worker.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
@@ -15,6 +15,12 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Initialize notifications
     initializeNotifications();
+    
+    // Load lazy dashboard widgets
+    initializeWidgets();
+    
+    // Follow background jobs
+    initializeJobProgress();
 });
 
 // Tooltip functionality
@@ -205,6 +211,82 @@ function initializeNotifications() {
     });
 }
 
+// Lazy dashboard widgets
+// Elements carrying data-widget-url are filled in after the page shell has
+// rendered. All widget requests are started at once so they load in parallel.
+// HTML responses replace the element's content; JSON responses fill every
+// [data-widget-field] element on the page whose name matches a key.
+function initializeWidgets() {
+    const containers = document.querySelectorAll('[data-widget-url]');
+    const requests = {};
+    
+    containers.forEach(container => {
+        const url = container.getAttribute('data-widget-url');
+        if (!requests[url]) {
+            requests[url] = fetch(url, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                credentials: 'same-origin'
+            }).then(response => {
+                if (!response.ok) {
+                    throw new Error('Widget request failed: ' + url);
+                }
+                const contentType = response.headers.get('Content-Type') || '';
+                return contentType.includes('application/json') ? response.json() : response.text();
+            });
+        }
+        
+        requests[url].then(payload => {
+            if (typeof payload === 'string') {
+                container.innerHTML = payload;
+                return;
+            }
+            Object.entries(payload).forEach(([field, value]) => {
+                document.querySelectorAll(`[data-widget-field="${field}"]`).forEach(element => {
+                    element.textContent = typeof value === 'number' ? formatNumber(value) : value;
+                });
+            });
+        }).catch(error => {
+            console.error(error);
+            container.querySelectorAll('.fa-spinner').forEach(spinner => {
+                spinner.className = 'fas fa-exclamation-triangle text-2xl';
+            });
+        });
+    });
+    
+    return Promise.allSettled(Object.values(requests));
+}
+
+// Background job progress
+// Elements carrying data-job-url poll the job status endpoint, update their
+// [data-job-progress] bar and [data-job-message] text, and reload the page
+// once the job has finished so the server can render the outcome.
+function initializeJobProgress() {
+    document.querySelectorAll('[data-job-url]').forEach(container => {
+        const url = container.getAttribute('data-job-url');
+        const bar = container.querySelector('[data-job-progress]');
+        const message = container.querySelector('[data-job-message]');
+        
+        const poll = () => {
+            fetch(url, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                credentials: 'same-origin'
+            }).then(response => response.json()).then(job => {
+                if (job.status === 'succeeded' || job.status === 'failed') {
+                    window.location.reload();
+                    return;
+                }
+                if (bar) bar.style.width = job.progress + '%';
+                if (message && job.message) message.textContent = job.message;
+                setTimeout(poll, 1500);
+            }).catch(error => {
+                console.error(error);
+                setTimeout(poll, 5000);
+            });
+        };
+        poll();
+    });
+}
+
 // Utility functions
 function formatNumber(number) {
     return new Intl.NumberFormat().format(number);
@@ -300,8 +382,7 @@ function downloadFile(content, filename, mimeType) {
 
 // Dashboard specific functions
 function updateDashboardStats() {
-    // This function would fetch and update dashboard statistics
-    console.log('Updating dashboard stats...');
+    return initializeWidgets();
 }
 
 function refreshCharts() {